@@ -1,19 +1,30 @@
-import os
-import google.generativeai as genai
+import re
+import threading
 from dotenv import load_dotenv
 import json
 
+from config import LLM_PROVIDER
+from services.llm_client import LLMClient, PROVIDERS
+
 load_dotenv()
 
-genai.configure(api_key=os.getenv("API_KEY"))
+_client = None
+_client_lock = threading.Lock()
 
 
-def analyze_task(task_description):
-    # Use the standard flash model (fast & cheap)
-    model = genai.GenerativeModel("gemini-2.5-flash")
+def get_llm_client():
+    """One shared client (and provider connection) per process."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(PROVIDERS[LLM_PROVIDER]())
+    return _client
 
+
+def build_breakdown_prompt(task_description):
     # NEW PROMPT: Focus ONLY on breakdown
-    prompt = f"""
+    return f"""
     You are an expert ADHD Coach. 
     The user is feeling overwhelmed by this task: "{task_description}"
     1. Break this task down into 3-5 concrete, actionable sub-goals (MVP first).
@@ -35,12 +46,81 @@ def analyze_task(task_description):
     Do not use markdown. Just raw JSON.
     """
 
+
+def analyze_task(task_description):
+    prompt = build_breakdown_prompt(task_description)
+
     try:
-        response = model.generate_content(prompt)
-        text = response.text.replace("```json", "").replace("```", "").strip()
+        # Timeouts, retries, concurrency cap and circuit breaker live in the client
+        text = get_llm_client().generate(prompt)
+        text = text.replace("```json", "").replace("```", "").strip()
         return json.loads(text)
 
     except Exception as e:
         print(f"AI Breakdown Error: {e}")
         # Fallback: Return an empty list if AI fails, so the app doesn't crash
         return {"breakdown": []}
+
+
+def build_streaming_prompt(task_description):
+    # Same coaching brief, but one line per item so each step can be
+    # parsed (and shown) the moment its line is complete.
+    return f"""
+    You are an expert ADHD Coach. 
+    The user is feeling overwhelmed by this task: "{task_description}"
+    1. Break this task down into 3-5 concrete, actionable sub-goals (MVP first).
+    2. Estimate the "Cognitive Load" (Difficulty) on a scale of 1-10.
+       - 1 = Trivial (Buy milk)
+       - 10 = Herculean (Write a thesis in 2 hours)
+       RULES:
+    1. Respect the user's intelligence. Do NOT include steps like "Open laptop", "Turn on screen", or "Type in search bar".
+    2. Focus on "Cognitive Chunks" (logical units of work) rather than mechanical actions.
+    3. The first step must be the "MVP" (Minimum Viable Progress) to get them started.
+    Return plain text, one item per line, in this exact format:
+    STEP: Quickly skim the entire assignment prompt to understand the overall goal and key deliverables.
+    STEP: Outline the high-level logic or main components required for the solution.
+    DIFFICULTY: 3
+    Steps first, DIFFICULTY last. No JSON, no markdown, no numbering.
+    """
+
+
+def _parse_stream_line(line):
+    line = line.strip().strip("`").strip()
+    head, _, rest = line.partition(":")
+    head = head.strip().upper()
+    rest = rest.strip()
+
+    if head == "STEP" and rest:
+        return ("step", rest)
+    if head == "DIFFICULTY":
+        match = re.search(r"\d+", rest)
+        if match:
+            return ("difficulty", int(match.group()))
+    return None
+
+
+def stream_breakdown(task_description):
+    """
+    Yields ("step", text) as soon as each step's line is complete,
+    then ("difficulty", n). Raises if the AI fails mid-way: the steps
+    already yielded are an incomplete breakdown.
+    """
+    prompt = build_streaming_prompt(task_description)
+    buffer = ""
+
+    try:
+        for chunk in get_llm_client().stream(prompt):
+            buffer += chunk
+            *complete_lines, buffer = buffer.split("\n")
+            for line in complete_lines:
+                item = _parse_stream_line(line)
+                if item:
+                    yield item
+
+        item = _parse_stream_line(buffer)
+        if item:
+            yield item
+
+    except Exception as e:
+        print(f"AI Breakdown Stream Error: {e}")
+        raise
@@ -7,17 +7,69 @@ from flask import (
     jsonify,
     session,
     flash,
+    Response,
+    stream_with_context,
 )
-from extensions import db
+from extensions import check_dialect, db
 from flask_migrate import Migrate
 import models
-from config import SQLALCHEMY_DATABASE_URI, SQLALCHEMY_TRACK_MODIFICATIONS
-from datetime import datetime, timezone  # <--- CHANGED: Added timezone
+from config import (
+    SQLALCHEMY_DATABASE_URI,
+    SQLALCHEMY_TRACK_MODIFICATIONS,
+    LOG_LEVEL,
+    PREDICT_BATCH_MAX,
+    NLP_PRELOAD,
+    BREAKDOWN_MODE,
+    TASK_PAGE_SIZE,
+    TASK_PAGE_MAX,
+    RECOMMEND_MAX_K,
+    METRICS_TOKEN,
+)
+from datetime import datetime, timedelta, timezone  # <--- CHANGED: Added timezone
+import hmac
+import json
+import logging
 import os
+import click
+
+# this for the subtask generation (runs in the background)
+from ai_service import get_llm_client
+from services.breakdown_jobs import breakdown_pipeline
+from services.breakdown_memo import breakdown_memo
+from services.recommendations import recommendation_index
+from services import task_transitions
+from services.session_log import session_log, sessions_in_range
+from services import analytics
+from services.event_broker import event_broker
+from services import task_import
+from services import task_factory
+from services import reprioritize
+from services.page_cache import bump_data_version, page_cache
+from services.identity import current_identity
+from services import fast_scorer
+from services.admission import Overloaded, nlp_admission
+from services.scoring_service import (
+    predict_task_metrics,
+    predict_task_metrics_batch,
+    compute_final_priority,
+)
+from services.nlp_services import nlp_engine
+from services.inference_server import InferenceUnavailable
+from services.task_serializer import (
+    OPEN_STATUSES,
+    TASK_STATUSES,
+    decode_cursor,
+    load_active_task,
+    load_task_page,
+    load_user_task_or_404,
+    serialize_session,
+    serialize_task,
+    serialize_subtask,
+)
 
-# this for the subtask generation
-from ai_service import analyze_task
-from services.scoring_service import predict_task_metrics, calculate_tmt_score
+logging.basicConfig(
+    level=LOG_LEVEL, format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+)
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "octo_command_secret_key_999")
@@ -26,6 +78,17 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = SQLALCHEMY_TRACK_MODIFICATIONS
 
 db.init_app(app)
 migrate = Migrate(app, db)
+with app.app_context():
+    check_dialect(db.engine)
+
+# MiniLM loads in the background: pages are served right away and
+# /api/predict answers with a flagged heuristic score until it is ready.
+if NLP_PRELOAD:
+    nlp_engine.start_background_load()
+
+breakdown_pipeline.init_app(app)
+session_log.init_app(app)
+page_cache.init_app(app)
 
 # --- AUTH ROUTES ---
 
@@ -81,99 +144,218 @@ def logout():
     return redirect(url_for("login"))
 
 
+def _slider_values(form):
+    # 1. GET SLIDER VALUES
+    try:
+        urgency = float(form.get("urgency", 5.0))
+        fear = float(form.get("fear", 5.0))
+        interest = float(form.get("interest", 5.0))
+    except (TypeError, ValueError):
+        urgency, fear, interest = 5.0, 5.0, 5.0
+    return urgency, fear, interest
+
+
+def create_task(user_id, task_title, form):
+    urgency, fear, interest = _slider_values(form)
+
+    # 4. SAVE TASK + ANALYSIS: one transaction (the AI breakdown comes later).
+    # Difficulty starts at the user's Fear score; the breakdown job
+    # overwrites it if the AI returns a usable estimate.
+    task_id = task_factory.create_task(
+        user_id,
+        title=task_title,
+        priority_score=compute_final_priority(urgency, fear, interest),
+        urgency=urgency,
+        fear=fear,
+        interest=interest,
+    )
+    recommendation_index.refresh_task(user_id, task_id)
+    event_broker.publish_task(user_id, task_id)
+
+    # 5. GET SUBTASKS (background worker pool, or streamed to the
+    # focus view over SSE when BREAKDOWN_MODE=stream)
+    if BREAKDOWN_MODE == "async":
+        breakdown_pipeline.submit(task_id, task_title, user_id)
+    return task_id
+
+
 @app.route("/", methods=["POST", "GET"])
 def index():
     if "user_id" not in session:
         return redirect(url_for("login"))
 
-    user = models.User.query.get(session["user_id"])
+    # One primary-key lookup: header fields + the data version
+    user = current_identity()
     if not user:
         session.pop("user_id", None)
         return redirect(url_for("login"))
     if request.method == "POST":
+        # No-JS fallback; script.js posts to /api/tasks instead
         task_title = request.form.get("task_title")
-
-        # 1. GET SLIDER VALUES
-        try:
-            urgency = float(request.form.get("urgency", 5.0))
-            fear = float(request.form.get("fear", 5.0))
-            interest = float(request.form.get("interest", 5.0))
-        except ValueError:
-            urgency, fear, interest = 5.0, 5.0, 5.0
-
         if task_title:
-            priority_score = compute_final_priority(urgency, fear, interest)
-
-            # 4. SAVE TASK
-            task = models.Task(
-                user_id=user.id,
-                title=task_title,
-                priority_score=priority_score,
-                status="pending",
-                time_spent=0,
-            )
-            db.session.add(task)
-            db.session.commit()
-
-            # 5. GET SUBTASKS
-            ai_data = analyze_task(task_title)
-            breakdown_steps = ai_data.get("breakdown", [])
-            ai_difficulty = ai_data.get("difficulty", 0)
-
-            # 2. If AI returns 0 (unsure), fallback to the user's Fear score
-            final_difficulty = ai_difficulty if ai_difficulty > 0 else fear
-
-            for index, step_text in enumerate(breakdown_steps):
-                subtask = models.Subtask(
-                    task_id=task.id,
-                    title=step_text,
-                    order_index=index,
-                    status="pending",
-                    created_by="gemini",
-                )
-                db.session.add(subtask)
-
-            # 6. SAVE ANALYSIS
-            analysis = models.TaskAnalysis(
-                task_id=task.id,
-                urgency_score=urgency,
-                fear_score=fear,
-                interest_score=interest,
-                difficulty_score=final_difficulty,
-                confidence=1.0,
-                model_version="MiniLM-L6-v2",
-            )
-            db.session.add(analysis)
-            db.session.commit()
+            create_task(user.id, task_title, request.form)
 
         return redirect(url_for("index"))
 
-    #  GET Tasks (Filtered by User)
-    tasks = (
-        models.Task.query.filter_by(user_id=user.id)
-        .order_by(models.Task.priority_score.desc())
-        .all()
+    # Unchanged since the last load (same data_version): 304 or cached page
+    return page_cache.respond(
+        ("index", user.id), user.data_version, lambda: _render_index(user)
     )
-    tasks_data = []
-    for t in tasks:
-        tasks_data.append(
-            {
-                "id": t.id,
-                "title": t.title,
-                "priority": t.priority_score or 0,
-                "status": t.status,
-                "diff": t.analysis.difficulty_score if t.analysis else 5,
-                "subtasks": [
-                    {"id": s.id, "title": s.title, "status": s.status}
-                    for s in t.subtasks
-                ],
-                "start": t.last_started_at.isoformat() if t.last_started_at else None,
-                "accumulated": t.time_spent or 0,
-            }
-        )
+
+
+def _render_index(user):
+    #  GET Tasks: only the first page of open tasks is rendered here;
+    #  the reserve tank pulls the rest from /api/tasks on scroll.
+    tasks, next_cursor = load_task_page(user.id, OPEN_STATUSES, TASK_PAGE_SIZE)
+
+    # The running task must always be on the map, whatever its priority
+    if not any(t.status == "active" for t in tasks):
+        active_task = load_active_task(user.id)
+        if active_task:
+            tasks.append(active_task)
+
+    tasks_data = [serialize_task(t) for t in tasks]
 
     # 2. Pass the single clean list to the template
-    return render_template("index.html", tasks=tasks, tasks_json=tasks_data, user=user)
+    return render_template(
+        "index.html",
+        tasks=tasks,
+        tasks_json=tasks_data,
+        next_cursor=next_cursor,
+        user=user,
+    )
+
+
+@app.route("/api/tasks", methods=["POST"])
+def create_task_api():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    data = request.get_json(silent=True) or request.form
+    task_title = (data.get("task_title") or "").strip()
+    if not task_title:
+        return jsonify({"error": "task_title is required"}), 400
+
+    task_id = create_task(session["user_id"], task_title, data)
+    task = load_user_task_or_404(task_id, session["user_id"])
+    return jsonify(serialize_task(task)), 201
+
+
+@app.route("/api/tasks/import", methods=["POST"])
+def import_tasks_api():
+    """
+    Bulk import: CSV (title[,urgency,fear,interest]) or NDJSON, either as a
+    multipart "file" or as the raw request body.
+    ?breakdown=defer (default: broken down when first opened) | queue
+    """
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    user_id = session["user_id"]
+
+    # Imported tasks are scored once, on insert, by MiniLM itself: never
+    # store the neutral placeholder scores used until it is ready
+    if nlp_engine.state == "loading":
+        response = jsonify({"error": "Scoring model is still loading, retry shortly"})
+        response.headers["Retry-After"] = "10"
+        return response, 503
+    if not nlp_engine.is_ready:
+        # Idle (NLP_PRELOAD=0) or failed: nothing brings it up by itself
+        error = f"Scoring model is {nlp_engine.state}: imports are disabled until it loads"
+        return jsonify({"error": error}), 503
+
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get("format")
+    if not fmt:
+        name = (upload.filename if upload else "") or ""
+        kind = upload.mimetype if upload else request.mimetype
+        fmt = "ndjson" if name.endswith((".ndjson", ".jsonl")) or "json" in kind else "csv"
+    defer = request.args.get("breakdown", "defer") != "queue"
+
+    try:
+        stats = task_import.import_tasks(
+            user_id,
+            task_import.iter_records(stream, fmt),
+            defer_breakdown=defer,
+            on_created=lambda task_id, title: breakdown_pipeline.submit(
+                task_id, title, user_id
+            ),
+        )
+        status = 201
+    except task_import.TaskImportError as e:
+        stats, status = {"error": str(e)}, 400
+    except UnicodeDecodeError:
+        stats, status = {"error": "Upload must be UTF-8 text"}, 400
+    except InferenceUnavailable as e:
+        # Shared inference server went away (an OSError too, so caught first):
+        # chunks before this one are kept
+        app.logger.warning("Task import (user %s): %s", user_id, e)
+        stats, status = {"error": "Scoring is unavailable, retry shortly"}, 503
+    except OSError as e:
+        app.logger.warning("Task import (user %s): upload unreadable: %s", user_id, e)
+        stats, status = {"error": "Upload could not be read"}, 400
+
+    # Too many changes to patch in place: rebuild ranking, open tabs reload
+    recommendation_index.invalidate(user_id)
+    event_broker.publish(user_id, "resync", {})
+    app.logger.info("Task import (user %s): %s", user_id, stats)
+    response = jsonify(stats)
+    if status == 503:
+        response.headers["Retry-After"] = "10"
+    return response, status
+
+
+@app.route("/api/events", methods=["GET"])
+def event_stream():
+    """Per-user live updates (task / timer / subtask) for every open tab."""
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    user_id = session["user_id"]
+
+    q = event_broker.subscribe(user_id)
+    if q is None:
+        # Too many open streams: 204 tells EventSource not to reconnect,
+        # and the page polls instead
+        return Response(status=204)
+
+    def generate_events():
+        yield "retry: 3000\n\n"
+        for item in event_broker.listen(user_id, q):
+            if item is None:
+                yield ": ping\n\n"  # keep-alive; also detects closed tabs
+                continue
+            event, data = item
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    response = Response(
+        generate_events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Also frees the slot if the tab closes before the stream starts
+    response.call_on_close(lambda: event_broker.unsubscribe(user_id, q))
+    return response
+
+
+@app.route("/api/tasks", methods=["GET"])
+def list_tasks():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+
+    statuses = request.args.get("status", ",".join(OPEN_STATUSES)).split(",")
+    if not statuses or any(s not in TASK_STATUSES for s in statuses):
+        return jsonify({"error": f"status must be one of {TASK_STATUSES}"}), 400
+
+    try:
+        limit = min(TASK_PAGE_MAX, max(1, int(request.args.get("limit", TASK_PAGE_SIZE))))
+        cursor = request.args.get("after")
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    tasks, next_cursor = load_task_page(session["user_id"], statuses, limit, after)
+    return jsonify(
+        {"tasks": [serialize_task(t) for t in tasks], "next_cursor": next_cursor}
+    )
 
 
 @app.route("/api/predict", methods=["POST"])
@@ -185,10 +367,81 @@ def predict():
     if not text:
         return jsonify({"error": "No text provided"}), 400
 
-    metrics = predict_task_metrics(text)
+    metrics = predict_task_metrics(text, admission=nlp_admission)
     return jsonify(metrics)
 
 
+@app.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    data = request.get_json(silent=True) or {}
+    titles = data.get("titles")
+    if not isinstance(titles, list) or not titles:
+        return jsonify({"error": "No titles provided"}), 400
+    if len(titles) > PREDICT_BATCH_MAX:
+        return jsonify({"error": f"Max {PREDICT_BATCH_MAX} titles per batch"}), 413
+    if not all(isinstance(t, str) and t for t in titles):
+        return jsonify({"error": "Titles must be non-empty strings"}), 400
+
+    results = predict_task_metrics_batch(titles, admission=nlp_admission)
+    return jsonify({"results": results})
+
+
+@app.errorhandler(Overloaded)
+def nlp_overloaded(e):
+    # NLP_SHED_MODE=reject: tell the client when to try again
+    response = jsonify({"error": "Scoring is busy, try again shortly"})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+@app.route("/api/tasks/<int:task_id>/breakdown", methods=["GET"])
+def breakdown_status(task_id):
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    task = load_user_task_or_404(task_id, session["user_id"])
+
+    status = task.breakdown_status or "done"
+    if breakdown_pipeline.is_claimable(task):
+        # Re-queue in case the worker that accepted it went away, or a
+        # failed attempt is due for a retry
+        breakdown_pipeline.submit(task.id, task.title, task.user_id)
+        if status == "failed":
+            status = "pending"
+
+    return jsonify(
+        {
+            "task_id": task.id,
+            "status": status,
+            "difficulty": task.analysis.difficulty_score if task.analysis else 5,
+            "subtasks": [serialize_subtask(s) for s in task.subtasks],
+        }
+    )
+
+
+@app.route("/api/tasks/<int:task_id>/breakdown/stream", methods=["GET"])
+def breakdown_stream(task_id):
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    task = models.Task.query.filter_by(
+        id=task_id, user_id=session["user_id"]
+    ).first_or_404()
+
+    def generate_events():
+        for event, data in breakdown_pipeline.stream_events(
+            task.id, task.title, task.user_id
+        ):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/calculate_score", methods=["POST"])
 def api_calculate_score():
     if "user_id" not in session:
@@ -204,65 +457,61 @@ def api_calculate_score():
     return jsonify({"priority_score": priority_score})
 
 
-# --- HELPER FUNCTIONS ---
-
-
-def compute_final_priority(urgency, fear, interest):
-    """
-    Centralizes the priority score math.
-    Change the formula here, and it updates everywhere.
-    """
-    impulsiveness = 1.5
-    tmt_score = calculate_tmt_score(urgency, fear, interest, impulsiveness)
-
-    priority_pressure = urgency * 2 + fear
-    # Weight: 60% Pressure, 40% Procrastination (TMT)
-    final_priority = priority_pressure * 0.6 + tmt_score * 0.4
-    return final_priority
-
-
-def update_task_timer(task):
-    """Updates time_spent based on last_started_at."""
-    if task.status == "active" and task.last_started_at:
-        now_utc = datetime.now(timezone.utc)
-        start_time = task.last_started_at
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the process is up and serving requests
+    return jsonify({"status": "ok"})
 
-        # Ensure UTC consistency
-        if start_time.tzinfo is None:
-            start_time = start_time.replace(tzinfo=timezone.utc)
 
-        delta = (now_utc - start_time).total_seconds()
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    # Readiness: the scoring model is loaded
+    nlp_status = nlp_engine.status()
+    code = 200 if nlp_engine.is_ready else 503
+    return jsonify({"ready": nlp_engine.is_ready, "nlp": nlp_status}), code
 
-        # Update time
-        current_time = task.time_spent or 0
-        task.time_spent = current_time + int(delta)
 
-        # Reset start time
-        task.last_started_at = None
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Internal only: for the scraper holding METRICS_TOKEN, not for users
+    if not METRICS_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    supplied = request.headers.get("Authorization", "").encode("utf-8")
+    if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}".encode("utf-8")):
+        response = jsonify({"error": "Unauthorized"})
+        response.status_code = 401
+        response.headers["WWW-Authenticate"] = "Bearer"
+        return response
+    return jsonify(
+        {
+            "embedding_cache": nlp_engine.cache.stats(),
+            "inference": nlp_engine.inference_stats(),
+            "fast_scorer": fast_scorer.fast_scorer.stats(),
+            "admission": nlp_admission.stats(),
+            "breakdown_jobs": breakdown_pipeline.stats(),
+            "breakdown_memo": breakdown_memo.stats(),
+            "recommendations": recommendation_index.stats(),
+            "session_log": session_log.stats(),
+            "events": event_broker.stats(),
+            "page_cache": page_cache.stats(),
+            "llm_client": get_llm_client().stats(),
+        }
+    )
 
 
 @app.route("/start_task/<int:task_id>", methods=["POST"])
 def start_task(task_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
-    # 1. STOP EVERYTHING ELSE
-    user_id = session["user_id"]
-    active_task = models.Task.query.filter_by(status="active", user_id=user_id).first()
-
-    # Current UTC time (Aware)
-    now_utc = datetime.now(timezone.utc)
-
-    if active_task and active_task.id != task_id:
-        update_task_timer(active_task)
-
-        active_task.status = "paused"
-
-    # 2. START THE NEW TASK
-    task = models.Task.query.get_or_404(task_id)
-    task.status = "active"
-    task.last_started_at = now_utc
-
-    db.session.commit()
+    # Pause whatever else is running + start this one, timers banked in SQL
+    try:
+        paused_ids = task_transitions.start_task(session["user_id"], task_id)
+    except task_transitions.TransitionError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status_code
+
+    for changed_id in paused_ids + [task_id]:
+        recommendation_index.refresh_task(session["user_id"], changed_id)
+        event_broker.publish_task(session["user_id"], changed_id, "timer")
     return jsonify({"success": True, "status": "active"})
 
 
@@ -270,62 +519,38 @@ def start_task(task_id):
 def pause_task(task_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
-    task = models.Task.query.get_or_404(task_id)
-    update_task_timer(task)
-    task.status = "paused"
+    try:
+        time_spent = task_transitions.pause_task(session["user_id"], task_id)
+    except task_transitions.TransitionError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status_code
 
-    db.session.commit()
-    return jsonify({"success": True, "status": "paused", "time_spent": task.time_spent})
+    recommendation_index.refresh_task(session["user_id"], task_id)
+    event_broker.publish_task(session["user_id"], task_id, "timer")
+    return jsonify({"success": True, "status": "paused", "time_spent": time_spent})
 
 
 @app.route("/complete_task/<int:task_id>", methods=["POST"])
 def complete_task(task_id):
-    task = models.Task.query.get_or_404(task_id)
-    user = models.User.query.get(task.user_id)  # Get the user
-    now_utc = datetime.now(timezone.utc)
-
-    # 1. Final Timer Update
-    update_task_timer(task)
-
-    # 2. Status Update
-    task.status = "completed"
-    task.completed_at = now_utc
-
-    # 3. --- NEW: CALCULATE XP ---
-    # Formula: 10 XP per minute of focus + Bonus for Priority
-    minutes_focused = (task.time_spent or 0) / 60
-    base_xp = minutes_focused * 10
-
-    # Priority Multiplier: Higher priority = More XP (Max 2x multiplier)
-    multiplier = 1 + (task.priority_score / 100)
-
-    xp_gained = int(base_xp * multiplier) + 50  # +50 flat bonus for finishing
-
-    # Save to User (Assuming you added total_xp to User model previously)
-    if not user.total_xp:
-        user.total_xp = 0
-    user.total_xp += xp_gained
-
-    # Save to Task for history
-    task.xp_earned = xp_gained
-
-    # Check for Level Up (Simple logic: Level = sqrt(XP)/10 or similar)
-    # For hackathon: Just strict thresholds
-    old_level = user.level or 1
-    new_level = int(1 + (user.total_xp / 1000))  # Level up every 1000 XP
-    leveled_up = new_level > old_level
-    user.level = new_level
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    # Final timer update, status, XP on the task and the user's total:
+    # all computed by the database (see services/task_transitions.py)
+    try:
+        result = task_transitions.complete_task(session["user_id"], task_id)
+    except task_transitions.TransitionError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status_code
 
-    db.session.commit()
+    recommendation_index.refresh_task(session["user_id"], task_id)
+    event_broker.publish_task(session["user_id"], task_id)
 
     return jsonify(
         {
             "success": True,
             "status": "completed",
-            "xp_gained": xp_gained,
-            "total_xp": user.total_xp,
-            "leveled_up": leveled_up,
-            "new_level": new_level,
+            "xp_gained": result["xp_gained"],
+            "total_xp": result["total_xp"],
+            "leveled_up": result["leveled_up"],
+            "new_level": result["new_level"],
         }
     )
 
@@ -334,7 +559,13 @@ def complete_task(task_id):
 def toggle_subtask(subtask_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
-    sub = models.Subtask.query.get_or_404(subtask_id)
+    user_id = session["user_id"]
+    # Only the task's owner may toggle its steps (404 otherwise, like tasks)
+    sub = (
+        models.Subtask.query.join(models.Task, models.Task.id == models.Subtask.task_id)
+        .filter(models.Subtask.id == subtask_id, models.Task.user_id == user_id)
+        .first_or_404()
+    )
 
     # Toggle status
     if sub.status == "completed":
@@ -344,7 +575,14 @@ def toggle_subtask(subtask_id):
         sub.status = "completed"
         sub.completed_at = datetime.now(timezone.utc)
 
+    bump_data_version(user_id)
     db.session.commit()
+    recommendation_index.refresh_task(user_id, sub.task_id)
+    event_broker.publish(
+        user_id,
+        "subtask",
+        {"task_id": sub.task_id, "subtask": serialize_subtask(sub)},
+    )
     return jsonify({"success": True, "status": sub.status})
 
 
@@ -352,29 +590,23 @@ def toggle_subtask(subtask_id):
 def recommend_switch(current_task_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
-    # Query for BOTH Task and TaskAnalysis
-    result = (
-        db.session.query(models.Task, models.TaskAnalysis)  # Select both
-        .join(models.TaskAnalysis, models.Task.id == models.TaskAnalysis.task_id)
-        .filter(
-            models.Task.id != current_task_id,
-            models.Task.status.in_(["pending", "paused", "active"]),
-            models.TaskAnalysis.difficulty_score <= 6,
-        )
-        .order_by(models.TaskAnalysis.interest_score.desc())
-        .first()
-    )
+    try:
+        k = min(RECOMMEND_MAX_K, max(1, int(request.args.get("k", 1))))
+    except ValueError:
+        k = 1
+
+    # Ranked per-user candidate set, kept up to date by the task routes
+    candidates = recommendation_index.recommend(session["user_id"], current_task_id, k)
 
-    if result:
-        # Unpack the tuple (Task, TaskAnalysis)
-        task, analysis = result
+    if candidates:
+        best = candidates[0]
 
         return jsonify(
             {
                 "found": True,
-                # Now use 'task' for title and 'analysis' for score
-                "message": f"How about '{task.title}'? It's fairly easy (Diff: {analysis.difficulty_score}) and might help you reset.",
-                "task_id": task.id,
+                "message": f"How about '{best['title']}'? It's fairly easy (Diff: {best['difficulty']}) and might help you reset.",
+                "task_id": best["task_id"],
+                "alternatives": candidates,
             }
         )
     else:
@@ -382,31 +614,114 @@ def recommend_switch(current_task_id):
             {
                 "found": False,
                 "message": "No suitable tasks found. Time for a break?",
+                "alternatives": [],
             }
         )
 
 
+def _parse_utc(value, default):
+    """ISO-8601 query param -> naive UTC datetime (how timestamps are stored)."""
+    if not value:
+        return default
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+@app.route("/api/sessions", methods=["GET"])
+def list_sessions():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    try:
+        end = _parse_utc(request.args.get("to"), now)
+        start = _parse_utc(request.args.get("from"), end - timedelta(days=7))
+        task_id = request.args.get("task_id", type=int)
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO-8601 timestamps"}), 400
+
+    # Make this worker's freshly buffered intervals visible to the read
+    session_log.flush()
+    sessions = sessions_in_range(session["user_id"], start, end, task_id)
+    return jsonify(
+        {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "sessions": [serialize_session(s) for s in sessions],
+        }
+    )
+
+
+@app.route("/api/analytics", methods=["GET"])
+def analytics_dashboard():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    days = min(365, max(1, request.args.get("days", 30, type=int)))
+
+    # Reads the rollup tables only; this worker's buffered activity first
+    session_log.flush()
+    return jsonify(analytics.dashboard(session["user_id"], days))
+
+
+@app.cli.command("rebuild-rollups")
+@click.option("--user-id", type=int, default=None, help="Only rebuild one user.")
+@click.option("--chunk-size", type=int, default=analytics.BACKFILL_CHUNK)
+def rebuild_rollups_command(user_id, chunk_size):
+    """Recompute analytics rollups from task_sessions and completed tasks."""
+    # One transaction: live session flushes wait for it (see rebuild_rollups)
+    sessions, completions = analytics.rebuild_rollups(user_id, chunk_size)
+    click.echo(f"Rebuilt rollups from {sessions} sessions, {completions} completions.")
+
+
+@app.cli.command("reprioritize")
+@click.option("--user-id", type=int, default=None, help="Only rescore one user.")
+@click.option("--chunk-size", type=int, default=reprioritize.REPRIORITIZE_CHUNK)
+@click.option("--dry-run", is_flag=True, help="Count changes without writing.")
+def reprioritize_command(user_id, chunk_size, dry_run):
+    """Recompute open tasks' priority_score after changing the scoring constants."""
+    stats = reprioritize.reprioritize(user_id, chunk_size, dry_run)
+    click.echo(
+        f"Scanned {stats['scanned']} tasks, "
+        f"{'would update' if dry_run else 'updated'} {stats['updated']} "
+        f"in {stats['seconds']}s ({stats['rows_per_sec']} rows/s)."
+    )
+
+
+@app.cli.command("train-fast-scorer")
+@click.option("--out", default=None, help="Artifact path (default: FAST_SCORER_PATH).")
+@click.option("--synthetic", type=int, default=20000, help="Template titles to add.")
+@click.option("--history", type=int, default=50000, help="Max distinct titles from tasks.")
+@click.option("--seed", type=int, default=0)
+def train_fast_scorer_command(out, synthetic, history, seed):
+    """Distill MiniLM's scores into the /api/predict fast-path scorer."""
+    try:
+        report = fast_scorer.distill(out, synthetic, history, seed, log=click.echo)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(json.dumps(report, indent=2))
+    click.echo("Restart the web workers to pick up the new artifact.")
+
+
 @app.route("/focus/<int:task_id>")
 def focus_view(task_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
-    task = models.Task.query.get_or_404(task_id)
-
-    # Serialize just this SINGLE task for the JavaScript
-    task_data = {
-        "id": task.id,
-        "title": task.title,
-        "priority": task.priority_score or 0,
-        "status": task.status,
-        "diff": task.analysis.difficulty_score if task.analysis else 5,
-        "subtasks": [
-            {"id": s.id, "title": s.title, "status": s.status} for s in task.subtasks
-        ],
-        "start": task.last_started_at.isoformat() if task.last_started_at else None,
-        "accumulated": task.time_spent or 0,
-    }
-
-    return render_template("focus.html", task_json=task_data)
+    user_id = session["user_id"]
+
+    def render():
+        task = load_user_task_or_404(task_id, user_id)
+
+        # Serialize just this SINGLE task for the JavaScript
+        task_data = serialize_task(task)
+
+        return render_template("focus.html", task_json=task_data)
+
+    identity = current_identity()
+    if identity is None:
+        return render()
+    return page_cache.respond(("focus", user_id, task_id), identity.data_version, render)
 
 
 # ... existing imports ...
@@ -0,0 +1,97 @@
+"""
+Per-request MiniLM encoding vs the shared micro-batching inference server.
+Run: python bench_inference.py [--clients 32] [--requests 2000] [--wait-ms 5]
+
+"per-request" is what each worker does without the server: every request
+thread calls model.encode([title]) on its own. "micro-batched" sends the
+same calls through services.inference_server over a Unix socket.
+Titles are all distinct, so the embedding cache never helps either side.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from services.inference_server import InferenceServer, MicroBatcher, RemoteEncoder
+from services.nlp_services import VectorScorer
+
+VERBS = ["write", "fix", "email", "plan", "review", "clean", "call", "study", "buy", "ship"]
+OBJECTS = ["report", "bug", "landlord", "trip", "thesis", "kitchen", "dentist", "exam", "milk", "release"]
+
+
+def titles(n):
+    return [f"{VERBS[i % 10]} the {OBJECTS[(i // 10) % 10]} #{i}" for i in range(n)]
+
+
+def run(label, encode_one, texts, clients):
+    latencies = []
+    lock = threading.Lock()
+    cursor = iter(texts)
+
+    def client():
+        while True:
+            with lock:
+                text = next(cursor, None)
+            if text is None:
+                return
+            started = time.perf_counter()
+            encode_one(text)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - started
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(
+        f"{label:>14}: {len(texts) / seconds:8.1f} req/s   "
+        f"p50 {p50:7.1f} ms   p99 {p99:7.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    # NLP_BACKEND picks the encoder, as in the app
+    model = VectorScorer().load_model()
+
+    def encode(texts):
+        return model.encode(
+            texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=True
+        )
+
+    encode(["warm up"])
+    print(f"{args.requests} requests, {args.clients} concurrent clients")
+
+    run("per-request", lambda t: encode([t]), titles(args.requests), args.clients)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    server = InferenceServer(path, MicroBatcher(encode, args.max_batch, args.wait_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    remote = RemoteEncoder(path)
+    # Same titles shifted, so nothing is a repeat of the first run
+    run(
+        "micro-batched",
+        lambda t: remote.encode([t]),
+        [t + " (b)" for t in titles(args.requests)],
+        args.clients,
+    )
+
+    batch_size = server.batcher.stats()["batch_size"]
+    print(f"{'':>14}  mean batch {batch_size['mean']}, p99 batch {batch_size['p99']}")
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,95 @@
+"""
+Latency and memory per encoder backend (NLP_BACKEND).
+Run: python bench_nlp_backends.py [--backends torch,onnx,onnx-int8] [--n 500]
+
+Each backend runs in a fresh process, so RSS is what one worker would pay:
+imports + model weights + a warmed-up session. Titles are all distinct and
+go straight to the encoder (no embedding cache).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def child(backend, n):
+    baseline = rss_mb()
+    started = time.perf_counter()
+
+    from services.nlp_services import VectorScorer
+
+    model = VectorScorer(backend).load_model()
+    load_seconds = time.perf_counter() - started
+
+    def encode(texts):
+        return model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+    encode(["warm up"])
+    titles = [f"task number {i}: write the quarterly report draft" for i in range(n)]
+
+    single = []
+    for title in titles:
+        t = time.perf_counter()
+        encode([title])
+        single.append((time.perf_counter() - t) * 1000)
+
+    t = time.perf_counter()
+    for start in range(0, n, 32):
+        encode(titles[start : start + 32])
+    batched = n / (time.perf_counter() - t)
+
+    p50, p99 = np.percentile(single, [50, 99])
+    print(
+        json.dumps(
+            {
+                "backend": backend,
+                "load_s": round(load_seconds, 2),
+                "rss_mb": round(rss_mb() - baseline, 1),
+                "p50_ms": round(float(p50), 2),
+                "p99_ms": round(float(p99), 2),
+                "batch32_per_s": round(batched, 1),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--n", type=int, default=500)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.n)
+        sys.exit(0)
+
+    env = dict(os.environ, NLP_PRELOAD="0")
+    print(f"{'backend':>10} {'load s':>7} {'RSS MB':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch32/s':>10}")
+    for backend in args.backends.split(","):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--n", str(args.n)],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        if out.returncode != 0:
+            print(f"{backend:>10}  failed: {out.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{r['backend']:>10} {r['load_s']:>7} {r['rss_mb']:>8} "
+            f"{r['p50_ms']:>8} {r['p99_ms']:>8} {r['batch32_per_s']:>10}"
+        )
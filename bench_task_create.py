@@ -0,0 +1,102 @@
+"""
+Task creation throughput: the old per-row ORM path vs services.task_factory.
+Run: python bench_task_create.py [n_tasks] [subtasks_per_task]
+
+"legacy" is what task creation used to do: add the Task, flush for its id,
+add the analysis, commit, then add each subtask and commit again.
+"bulk" is task_factory.create_tasks: one multi-row INSERT per table.
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault(
+    "SQLALCHEMY_DATABASE_URI", "sqlite:///" + tempfile.mktemp(suffix=".db")
+)
+os.environ.setdefault("NLP_PRELOAD", "0")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+from app import app
+from extensions import db
+import models
+from services.task_factory import create_task, create_tasks
+
+
+def make_specs(n, n_subtasks):
+    return [
+        {
+            "title": f"Task {i}",
+            "priority_score": float(i % 100),
+            "urgency": 5.0,
+            "fear": 4.0,
+            "interest": 6.0,
+            "subtasks": [f"Step {j}" for j in range(n_subtasks)],
+        }
+        for i in range(n)
+    ]
+
+
+def legacy(user_id, specs):
+    for spec in specs:
+        task = models.Task(
+            user_id=user_id,
+            title=spec["title"],
+            priority_score=spec["priority_score"],
+            status="pending",
+            time_spent=0,
+        )
+        db.session.add(task)
+        db.session.flush()
+        db.session.add(
+            models.TaskAnalysis(
+                task_id=task.id,
+                urgency_score=spec["urgency"],
+                fear_score=spec["fear"],
+                interest_score=spec["interest"],
+                difficulty_score=spec["fear"],
+            )
+        )
+        db.session.commit()
+        for index, step in enumerate(spec["subtasks"]):
+            db.session.add(
+                models.Subtask(task_id=task.id, title=step, order_index=index)
+            )
+        db.session.commit()
+
+
+def one_by_one(user_id, specs):
+    # Form POST / API shape: one transaction per task
+    for spec in specs:
+        create_task(user_id, **spec)
+
+
+def bulk(user_id, specs, chunk=500):
+    # Importer shape: one transaction per chunk
+    for start in range(0, len(specs), chunk):
+        create_tasks(user_id, specs[start : start + chunk])
+
+
+def run(label, fn, user_id, specs):
+    started = time.perf_counter()
+    fn(user_id, specs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>10}: {len(specs) / elapsed:10.0f} tasks/s  ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_subtasks = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with app.app_context():
+        db.create_all()
+        user = models.User(username="bench")
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.commit()
+
+        specs = make_specs(n, n_subtasks)
+        print(f"{n} tasks x {n_subtasks} subtasks, {db.engine.url.get_backend_name()}")
+        run("legacy", legacy, user.id, specs)
+        run("per-task", one_by_one, user.id, specs)
+        run("bulk", bulk, user.id, specs)
@@ -1,7 +1,159 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI")
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Level for the app's and the services' loggers (background workers report
+# errors through logging, to stderr)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# --- NLP CACHE ---
+# Directory shared by every gunicorn worker on the host (embedding store, etc.)
+NLP_CACHE_DIR = os.getenv(
+    "NLP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "octo_nlp_cache")
+)
+# Start loading MiniLM in a background thread when the app is imported.
+# Set to 0 for one-off CLI runs (e.g. `flask db upgrade`).
+NLP_PRELOAD = os.getenv("NLP_PRELOAD", "1") == "1"
+# Pin the Hugging Face revision (commit hash) of the MiniLM weights.
+# Part of every cache key, so changing it invalidates cached vectors.
+NLP_MODEL_REVISION = os.getenv("NLP_MODEL_REVISION") or None
+# Max embeddings kept in each worker's in-process LRU (384 floats each)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 2048))
+# Max rows in the shared on-disk embedding store (~1.6 KB each); the
+# oldest-written are pruned past this
+EMBEDDING_DISK_MAX_ENTRIES = int(os.getenv("EMBEDDING_DISK_MAX_ENTRIES", 100_000))
+# Encoder backend: "torch" (sentence-transformers), or ONNX Runtime without
+# torch: "onnx" (fp32 export) / "onnx-int8" (dynamically quantized).
+# Needs `pip install -r requirements-onnx.txt` for the ONNX backends.
+NLP_BACKEND = os.getenv("NLP_BACKEND", "torch")
+# Override the ONNX graph picked from the model's Hub repo, e.g.
+# onnx/model_qint8_avx512_vnni.onnx on CPUs with VNNI
+NLP_ONNX_FILE = os.getenv("NLP_ONNX_FILE") or None
+# ONNX Runtime intra-op threads per process (0 = one per core)
+NLP_ONNX_THREADS = int(os.getenv("NLP_ONNX_THREADS", 0))
+
+# Max titles accepted by POST /api/predict/batch
+PREDICT_BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", 1000))
+
+# --- SHARED INFERENCE SERVER ---
+# Unix socket of `python -m services.inference_server`. When set, workers
+# don't load MiniLM themselves: embedding cache misses go to the server,
+# which runs concurrent requests from every worker as one forward pass.
+# Empty = each worker loads its own model.
+NLP_SERVER_SOCKET = os.getenv("NLP_SERVER_SOCKET", "")
+# Server side: after the first request, wait up to NLP_BATCH_WAIT_MS for
+# others to join, with at most NLP_BATCH_MAX titles per forward pass
+NLP_BATCH_MAX = int(os.getenv("NLP_BATCH_MAX", 64))
+NLP_BATCH_WAIT_MS = float(os.getenv("NLP_BATCH_WAIT_MS", 5))
+# Client side: seconds to wait for vectors before degrading to the heuristic
+NLP_SERVER_TIMEOUT = float(os.getenv("NLP_SERVER_TIMEOUT", 5))
+
+# --- NLP ADMISSION CONTROL ---
+# Per worker: at most NLP_MAX_CONCURRENCY /api/predict model calls run at
+# once (raise it with NLP_SERVER_SOCKET so the server can batch them) and at
+# most NLP_MAX_QUEUE wait. A request that can't start within
+# NLP_QUEUE_DEADLINE_MS is shed: "degrade" answers with the flagged
+# heuristic score, "reject" with 429 + Retry-After.
+NLP_MAX_CONCURRENCY = int(os.getenv("NLP_MAX_CONCURRENCY", 2))
+NLP_MAX_QUEUE = int(os.getenv("NLP_MAX_QUEUE", 4))
+NLP_QUEUE_DEADLINE_MS = float(os.getenv("NLP_QUEUE_DEADLINE_MS", 750))
+NLP_SHED_MODE = os.getenv("NLP_SHED_MODE", "degrade")
+
+# --- AI BREAKDOWN JOBS ---
+# (provider: LLM_PROVIDER below)
+# "async": background worker pool right after creation
+# "stream": generated when the focus view opens, pushed step by step over SSE
+BREAKDOWN_MODE = os.getenv("BREAKDOWN_MODE", "async")
+# Background threads per gunicorn worker calling the breakdown provider
+BREAKDOWN_WORKERS = int(os.getenv("BREAKDOWN_WORKERS", 4))
+# Seconds after which a "running" breakdown is presumed orphaned (its worker
+# died) and may be claimed again. Keep it well above LLM_TIMEOUT.
+BREAKDOWN_CLAIM_TIMEOUT = int(os.getenv("BREAKDOWN_CLAIM_TIMEOUT", 120))
+# Reuse a previous breakdown when the new title is at least this similar (cosine)
+BREAKDOWN_REUSE_THRESHOLD = float(os.getenv("BREAKDOWN_REUSE_THRESHOLD", 0.85))
+# Also search other users' breakdowns (off by default: subtasks may be personal)
+BREAKDOWN_REUSE_GLOBAL = os.getenv("BREAKDOWN_REUSE_GLOBAL", "0") == "1"
+# Seconds before a worker rebuilds its breakdown index from the database
+BREAKDOWN_MEMO_TTL = int(os.getenv("BREAKDOWN_MEMO_TTL", 600))
+# Per-user breakdown indexes kept per worker (LRU; up to ~750 KB each)
+BREAKDOWN_MEMO_USERS = int(os.getenv("BREAKDOWN_MEMO_USERS", 128))
+
+# --- LLM CLIENT ---
+# "gemini" in production, "fake" for tests / offline development /
+# load and failure experiments (also the AI breakdown provider)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.5-flash")
+# Total latency budget per call in seconds (queueing + retries included)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 20))
+# Concurrent provider calls per process; extra callers queue...
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 4))
+# ...for at most this many seconds before failing over to the fallback
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 5))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+# Circuit breaker: open after N consecutive failures, probe again after M seconds
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", 30))
+
+# --- TASK LIST PAGINATION ---
+# Tasks rendered with the dashboard / returned per /api/tasks page
+TASK_PAGE_SIZE = int(os.getenv("TASK_PAGE_SIZE", 24))
+TASK_PAGE_MAX = int(os.getenv("TASK_PAGE_MAX", 100))
+
+# --- SWITCH RECOMMENDATIONS ---
+# "I'm Stuck" only suggests tasks at or below this difficulty
+RECOMMEND_MAX_DIFFICULTY = int(os.getenv("RECOMMEND_MAX_DIFFICULTY", 6))
+# Per-user rankings are rebuilt from the DB after this many seconds so
+# changes made by other workers show up
+RECOMMEND_TTL = int(os.getenv("RECOMMEND_TTL", 300))
+# Per-user rankings kept per worker (LRU)
+RECOMMEND_MAX_USERS = int(os.getenv("RECOMMEND_MAX_USERS", 1024))
+RECOMMEND_MAX_K = 10
+
+# --- FOCUS SESSION LOG ---
+# Finished focus intervals are buffered in memory and bulk-inserted into
+# task_sessions once SESSION_LOG_BATCH rows pile up or every
+# SESSION_LOG_FLUSH_INTERVAL seconds, whichever comes first.
+SESSION_LOG_BATCH = int(os.getenv("SESSION_LOG_BATCH", 200))
+SESSION_LOG_FLUSH_INTERVAL = float(os.getenv("SESSION_LOG_FLUSH_INTERVAL", 2.0))
+
+# --- LIVE UPDATES (SSE) ---
+# Events queued per open tab before it is considered stuck and dropped
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 100))
+# Keep-alive comment interval, and max stream age before the browser's
+# EventSource reconnects (frees the worker thread now and then)
+EVENT_HEARTBEAT = int(os.getenv("EVENT_HEARTBEAT", 15))
+EVENT_STREAM_MAX_AGE = int(os.getenv("EVENT_STREAM_MAX_AGE", 300))
+# Each open stream holds a worker thread (32 per gunicorn worker): past
+# these caps, per process and per user, new streams get a 204 and the page
+# polls /api/tasks instead
+EVENT_MAX_STREAMS = int(os.getenv("EVENT_MAX_STREAMS", 16))
+EVENT_MAX_STREAMS_PER_USER = int(os.getenv("EVENT_MAX_STREAMS_PER_USER", 3))
+
+# --- BULK IMPORT ---
+# Rows scored + inserted per transaction, and the cap per upload
+IMPORT_CHUNK = int(os.getenv("IMPORT_CHUNK", 500))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", 20000))
+
+# --- PAGE CACHE ---
+# Rendered dashboard / focus pages kept per user at their current data
+# version (see services/page_cache.py); evicted LRU past this many bytes
+PAGE_CACHE_BYTES = int(os.getenv("PAGE_CACHE_BYTES", 32 * 1024 * 1024))
+
+# --- DISTILLED FAST SCORER ---
+# /api/predict first asks a tiny hashed n-gram model distilled from MiniLM
+# (`flask train-fast-scorer`); unsure titles still go to MiniLM.
+# Off, or no artifact at FAST_SCORER_PATH = MiniLM for everything.
+FAST_SCORER_ENABLED = os.getenv("FAST_SCORER", "1") == "1"
+FAST_SCORER_PATH = os.getenv(
+    "FAST_SCORER_PATH", os.path.join(NLP_CACHE_DIR, "fast_scorer.npz")
+)
+
+# --- OPS ENDPOINTS ---
+# /metrics (per-process internals) needs "Authorization: Bearer <token>"
+# with this token; unset, the endpoint is off (404)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
@@ -0,0 +1,29 @@
+"""
+Shared test setup. pytest imports this before any test module, and config
+reads the environment once per run, so the defaults all live here: a
+throwaway SQLite DB and cache dir, and no model / LLM work at import time.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+# Scripts that need the real model, not pytest tests
+collect_ignore = ["test_ai.py"]
+
+
+def pytest_configure(config):
+    scratch = tempfile.mkdtemp(prefix="octo-tests-")
+    # Registered before the app is imported: atexit runs it last, after the
+    # session log's final flush
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+
+    os.environ.setdefault(
+        "SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(scratch, "test.db")
+    )
+    os.environ.setdefault("NLP_CACHE_DIR", os.path.join(scratch, "nlp_cache"))
+    os.environ.setdefault("NLP_PRELOAD", "0")
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    # Never pick up a locally trained fast-scorer artifact
+    os.environ.setdefault("FAST_SCORER", "0")
+
@@ -2,4 +2,17 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# The task transitions and analytics rollups are written in these dialects'
+# SQL (date arithmetic, ON CONFLICT upserts)
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+
+
+def check_dialect(engine):
+    """Raises RuntimeError at startup instead of on the first timer click."""
+    if engine.dialect.name not in SUPPORTED_DIALECTS:
+        raise RuntimeError(
+            f"Unsupported database {engine.dialect.name!r}: "
+            f"use one of {', '.join(SUPPORTED_DIALECTS)}"
+        )
+
 
@@ -12,6 +12,9 @@ class User(db.Model):
 
     level = db.Column(db.Integer, default=1)
     total_xp = db.Column(db.Integer, default=0)
+    # Bumped in the same transaction as every change to the user's tasks,
+    # XP or subtasks; page ETags are derived from it
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
 
@@ -26,6 +29,12 @@ class User(db.Model):
 
 class Task(db.Model):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Dashboard / keyset pages: WHERE user_id = ? ORDER BY priority_score, id
+        db.Index("ix_tasks_user_priority", "user_id", "priority_score", "id"),
+        # "Which task is active?" on start/pause
+        db.Index("ix_tasks_user_status", "user_id", "status"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -40,6 +49,7 @@ class Task(db.Model):
 
     # Time Tracking
     time_spent = db.Column(db.Integer, default=0)  # Total seconds focused
+    # Start of the latest focus interval; only running while status == "active"
     last_started_at = db.Column(db.DateTime, nullable=True)
 
     # --- ADDED XP HISTORY FIELD ---
@@ -47,6 +57,15 @@ class Task(db.Model):
 
     current_order = db.Column(db.Integer)
 
+    # AI breakdown job: pending, running, done, failed (NULL = legacy, done)
+    breakdown_status = db.Column(db.String(20), nullable=True)
+    # When a worker took the job (pending -> running); a "running" row older
+    # than BREAKDOWN_CLAIM_TIMEOUT belongs to a worker that died
+    breakdown_claimed_at = db.Column(db.DateTime, nullable=True)
+    # Difficulty the AI gave with its breakdown (NULL: none / unsure, so
+    # TaskAnalysis.difficulty_score may still be the user's Fear fallback)
+    breakdown_difficulty = db.Column(db.Integer, nullable=True)
+
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
     updated_at = db.Column(
         db.DateTime,
@@ -55,7 +74,9 @@ class Task(db.Model):
     )
     completed_at = db.Column(db.DateTime)
 
-    subtasks = db.relationship("Subtask", backref="task", lazy=True)
+    subtasks = db.relationship(
+        "Subtask", backref="task", lazy=True, order_by="Subtask.order_index"
+    )
 
     # --- ADDED RELATIONSHIP FOR TASK ANALYSIS ---
     # This allows `task.analysis.difficulty_score` to work
@@ -64,6 +85,9 @@ class Task(db.Model):
 
 class TaskAnalysis(db.Model):
     __tablename__ = "task_analysis"
+    __table_args__ = (
+        db.Index("uq_task_analysis_task_id", "task_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey("tasks.id"), nullable=False)
@@ -82,6 +106,7 @@ class TaskAnalysis(db.Model):
 
 class Subtask(db.Model):
     __tablename__ = "subtasks"
+    __table_args__ = (db.Index("ix_subtasks_task_order", "task_id", "order_index"),)
 
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey("tasks.id"), nullable=False)
@@ -93,7 +118,7 @@ class Subtask(db.Model):
     status = db.Column(db.String(20), default="pending")
 
     estimated_effort = db.Column(db.Integer)
-    created_by = db.Column(db.String(20))  # system / user / ai
+    created_by = db.Column(db.String(20))  # system / user / gemini / reuse
 
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
     completed_at = db.Column(db.DateTime)
@@ -101,6 +126,11 @@ class Subtask(db.Model):
 
 class TaskSession(db.Model):
     __tablename__ = "task_sessions"
+    __table_args__ = (
+        # Per-user range queries: WHERE user_id = ? AND ended_at > ?
+        db.Index("ix_task_sessions_user_ended", "user_id", "ended_at"),
+        db.Index("ix_task_sessions_task", "task_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey("tasks.id"), nullable=False)
@@ -110,3 +140,27 @@ class TaskSession(db.Model):
     ended_at = db.Column(db.DateTime)
 
     active = db.Column(db.Boolean, default=True)
+
+
+# --- ANALYTICS ROLLUPS ---
+# Maintained incrementally by services/analytics.py (never edited by hand);
+# `flask rebuild-rollups` recomputes them from task_sessions / tasks.
+
+
+class FocusHourRollup(db.Model):
+    __tablename__ = "focus_hour_rollups"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    hour = db.Column(db.DateTime, primary_key=True)  # UTC, truncated to the hour
+
+    focus_seconds = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyRollup(db.Model):
+    __tablename__ = "daily_rollups"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # UTC
+
+    completions = db.Column(db.Integer, nullable=False, default=0)
+    xp_earned = db.Column(db.Integer, nullable=False, default=0)
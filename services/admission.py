@@ -0,0 +1,148 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from config import (
+    NLP_MAX_CONCURRENCY,
+    NLP_MAX_QUEUE,
+    NLP_QUEUE_DEADLINE_MS,
+    NLP_SHED_MODE,
+)
+from services.inference_server import LATENCY_BUCKETS_MS, Histogram
+
+SHED_MODES = ("degrade", "reject")
+
+# Weight of the newest call in the moving average of model time per title
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """Shed by admission control. retry_after: seconds until a slot is likely free."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"NLP overloaded ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded admission for the CPU-bound model calls behind /api/predict.
+
+    At most `concurrency` calls run at once and at most `max_queue` wait for
+    a slot; anything else is shed right away instead of tying up another
+    worker thread (timer and subtask requests share those threads). A
+    waiting call is also shed once it has waited `deadline_ms`, or
+    immediately if the titles ahead of it (at the recent average time per
+    title) can't drain before then. Calls say how many titles they encode,
+    so one big batch costs what it weighs instead of skewing the average
+    every single-title call is judged by.
+
+    Only call sites that can afford a degraded answer should go through it:
+    imports and background jobs call the model directly.
+    """
+
+    def __init__(self, concurrency=None, max_queue=None, deadline_ms=None, shed_mode=None):
+        self.concurrency = concurrency or NLP_MAX_CONCURRENCY
+        self.max_queue = NLP_MAX_QUEUE if max_queue is None else max_queue
+        self.deadline_ms = deadline_ms or NLP_QUEUE_DEADLINE_MS
+        self.shed_mode = shed_mode or NLP_SHED_MODE
+        if self.shed_mode not in SHED_MODES:
+            raise ValueError(f"NLP_SHED_MODE must be one of {SHED_MODES}, not {self.shed_mode!r}")
+
+        self._cond = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+        # Titles in the running / waiting calls
+        self.running_titles = 0
+        self.waiting_titles = 0
+        self.title_ms = None  # moving average of model time per title
+
+        # Histograms + counters
+        self.wait_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "deadline": 0, "predicted_wait": 0}
+
+    @property
+    def reject(self):
+        return self.shed_mode == "reject"
+
+    def _expected_wait_ms(self, titles_ahead):
+        # Titles ahead of us (queued + running) drain `concurrency` calls at a time
+        if self.title_ms is None:
+            return 0.0
+        return titles_ahead * self.title_ms / self.concurrency
+
+    def _shed(self, reason, titles):
+        # Caller holds self._cond
+        self.shed[reason] += 1
+        ahead = self.waiting_titles + self.running_titles
+        retry_after = max(1, math.ceil(self._expected_wait_ms(ahead + titles) / 1000))
+        raise Overloaded(reason, retry_after)
+
+    @contextmanager
+    def slot(self, deadline_ms=None, titles=1):
+        """Runs a model call on `titles` titles in a slot, or raises Overloaded."""
+        budget_ms = deadline_ms or self.deadline_ms
+        titles = max(1, titles)
+        started = time.monotonic()
+        with self._cond:
+            if self.running >= self.concurrency:
+                if self.waiting >= self.max_queue:
+                    self._shed("queue_full", titles)
+                ahead = self.waiting_titles + self.running_titles
+                if self._expected_wait_ms(ahead) > budget_ms:
+                    self._shed("predicted_wait", titles)
+
+                self.waiting += 1
+                self.waiting_titles += titles
+                try:
+                    deadline = started + budget_ms / 1000
+                    while self.running >= self.concurrency:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._shed("deadline", titles)
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                    self.waiting_titles -= titles
+
+            self.running += 1
+            self.running_titles += titles
+            self.admitted += 1
+            self.wait_ms.observe((time.monotonic() - started) * 1000)
+
+        admitted_at = time.monotonic()
+        try:
+            yield
+        finally:
+            per_title_ms = (time.monotonic() - admitted_at) * 1000 / titles
+            with self._cond:
+                self.running -= 1
+                self.running_titles -= titles
+                if self.title_ms is None:
+                    self.title_ms = per_title_ms
+                else:
+                    self.title_ms += SERVICE_TIME_ALPHA * (per_title_ms - self.title_ms)
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "deadline_ms": self.deadline_ms,
+                "shed_mode": self.shed_mode,
+                "running": self.running,
+                "queued": self.waiting,
+                "running_titles": self.running_titles,
+                "queued_titles": self.waiting_titles,
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "title_ms": None if self.title_ms is None else round(self.title_ms, 2),
+                "wait_ms": self.wait_ms.snapshot(),
+            }
+
+
+nlp_admission = AdmissionController()
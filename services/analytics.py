@@ -0,0 +1,230 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+import models
+
+# Rows per chunk when rebuilding rollups from history
+BACKFILL_CHUNK = 5000
+
+HOUR = timedelta(hours=1)
+
+
+def _hour_floor(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def split_by_hour(started_at, ended_at):
+    """Yields (hour bucket, seconds) for the part of the interval in each hour."""
+    cursor = started_at
+    while cursor < ended_at:
+        bucket = _hour_floor(cursor)
+        boundary = min(bucket + HOUR, ended_at)
+        yield bucket, (boundary - cursor).total_seconds()
+        cursor = boundary
+
+
+def _upsert_add(model, keys, rows):
+    """INSERT ... ON CONFLICT (keys) DO UPDATE SET col = col + excluded.col"""
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        # Rejected at startup (extensions.check_dialect)
+        raise NotImplementedError(f"rollup upserts not supported on {dialect}")
+
+    stmt = insert(model)
+    counters = [c for c in rows[0] if c not in keys]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in counters},
+    )
+    db.session.execute(stmt, rows)
+
+
+def _sum_focus(sessions, focus):
+    """Adds each interval's seconds to focus[(user_id, hour)]."""
+    for s in sessions:
+        for hour, seconds in split_by_hour(s["started_at"], s["ended_at"]):
+            focus[(s["user_id"], hour)] += seconds
+
+
+def _sum_daily(completions, daily):
+    """Adds completions and XP to daily[(user_id, day)] = [count, xp]."""
+    for c in completions:
+        totals = daily[(c["user_id"], c["completed_at"].date())]
+        totals[0] += 1
+        totals[1] += c["xp"] or 0
+
+
+def _write_rollups(focus, daily):
+    _upsert_add(
+        models.FocusHourRollup,
+        ["user_id", "hour"],
+        [
+            {"user_id": user_id, "hour": hour, "focus_seconds": round(seconds)}
+            for (user_id, hour), seconds in focus.items()
+        ],
+    )
+    _upsert_add(
+        models.DailyRollup,
+        ["user_id", "day"],
+        [
+            {"user_id": user_id, "day": day, "completions": n, "xp_earned": xp}
+            for (user_id, day), (n, xp) in daily.items()
+        ],
+    )
+
+
+def apply_rollups(sessions=(), completions=()):
+    """
+    Folds a batch of focus intervals ({user_id, started_at, ended_at}) and
+    completions ({user_id, completed_at, xp}) into the rollup tables.
+    Deltas are summed in Python first, so each rollup row is written once
+    per batch. Runs in the caller's transaction (no commit).
+    """
+    focus, daily = defaultdict(float), defaultdict(lambda: [0, 0])
+    _sum_focus(sessions, focus)
+    _sum_daily(completions, daily)
+    _write_rollups(focus, daily)
+
+
+def rebuild_rollups(user_id=None, chunk_size=BACKFILL_CHUNK, log=print):
+    """
+    Recomputes the rollups from task_sessions and completed tasks.
+
+    The history is streamed in chunks, but the totals are only written (and
+    focus seconds rounded) once at the end, all in ONE transaction with the
+    delete: a live session_log flush waits for it instead of landing between
+    chunks and then being read back in as history (counted twice). Memory
+    grows with the number of rollup rows, not with the history.
+    """
+    try:
+        if db.engine.dialect.name == "postgresql":
+            # SQLite's delete below already takes the database write lock;
+            # EXCLUSIVE still lets dashboards read the old rollups meanwhile
+            db.session.execute(
+                db.text("LOCK TABLE focus_hour_rollups, daily_rollups IN EXCLUSIVE MODE")
+            )
+        for model in (models.FocusHourRollup, models.DailyRollup):
+            query = model.query
+            if user_id is not None:
+                query = query.filter_by(user_id=user_id)
+            query.delete(synchronize_session=False)
+
+        def stream(select, to_row):
+            # Keyset over the primary key: each chunk is an index range scan
+            last_id, total = 0, 0
+            while True:
+                rows = db.session.execute(
+                    select.where(select.selected_columns[0] > last_id)
+                    .order_by(select.selected_columns[0])
+                    .limit(chunk_size)
+                ).all()
+                if not rows:
+                    return
+                last_id = rows[-1][0]
+                total += len(rows)
+                yield [to_row(r) for r in rows], total
+
+        sessions = db.select(
+            models.TaskSession.id,
+            models.TaskSession.user_id,
+            models.TaskSession.started_at,
+            models.TaskSession.ended_at,
+        ).where(models.TaskSession.ended_at.isnot(None))
+        completions = db.select(
+            models.Task.id, models.Task.user_id, models.Task.completed_at, models.Task.xp_earned
+        ).where(models.Task.status == "completed", models.Task.completed_at.isnot(None))
+        if user_id is not None:
+            sessions = sessions.where(models.TaskSession.user_id == user_id)
+            completions = completions.where(models.Task.user_id == user_id)
+
+        focus, daily = defaultdict(float), defaultdict(lambda: [0, 0])
+        n_sessions = n_completions = 0
+        for chunk, n_sessions in stream(
+            sessions,
+            lambda r: {"user_id": r.user_id, "started_at": r.started_at, "ended_at": r.ended_at},
+        ):
+            _sum_focus(chunk, focus)
+            log(f"  sessions: {n_sessions}")
+
+        for chunk, n_completions in stream(
+            completions,
+            lambda r: {"user_id": r.user_id, "completed_at": r.completed_at, "xp": r.xp_earned},
+        ):
+            _sum_daily(chunk, daily)
+            log(f"  completions: {n_completions}")
+
+        _write_rollups(focus, daily)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return n_sessions, n_completions
+
+
+def dashboard(user_id, days=30, today=None):
+    """Everything the analytics dashboard shows, read from the rollups only."""
+    today = today or datetime.now(timezone.utc).date()
+    first_day = today - timedelta(days=days - 1)
+    since = datetime.combine(first_day, datetime.min.time())
+
+    hours = (
+        models.FocusHourRollup.query.filter(
+            models.FocusHourRollup.user_id == user_id,
+            models.FocusHourRollup.hour >= since,
+        )
+        .order_by(models.FocusHourRollup.hour)
+        .all()
+    )
+    daily = {
+        r.day: r
+        for r in models.DailyRollup.query.filter(
+            models.DailyRollup.user_id == user_id, models.DailyRollup.day >= first_day
+        )
+    }
+
+    focus_by_day = defaultdict(int)
+    by_hour_of_day = [0] * 24
+    for r in hours:
+        focus_by_day[r.hour.date()] += r.focus_seconds
+        by_hour_of_day[r.hour.hour] += r.focus_seconds
+
+    day_rows = []
+    for i in range(days):
+        day = first_day + timedelta(days=i)
+        stats = daily.get(day)
+        day_rows.append(
+            {
+                "day": day.isoformat(),
+                "focus_seconds": focus_by_day[day],
+                "completions": stats.completions if stats else 0,
+                "xp_earned": stats.xp_earned if stats else 0,
+            }
+        )
+
+    # "Dopamine spikes": days whose XP clearly beats the period's average
+    xp_values = [d["xp_earned"] for d in day_rows]
+    mean_xp = sum(xp_values) / len(xp_values) if xp_values else 0
+    spikes = [d["day"] for d in day_rows if d["xp_earned"] and d["xp_earned"] >= 2 * mean_xp]
+
+    return {
+        "days": day_rows,
+        "productive_hours": [
+            {"hour": h, "focus_seconds": s} for h, s in enumerate(by_hour_of_day)
+        ],
+        "dopamine_spikes": spikes,
+        "totals": {
+            "focus_seconds": sum(focus_by_day.values()),
+            "completions": sum(d["completions"] for d in day_rows),
+            "xp_earned": sum(xp_values),
+        },
+    }
@@ -0,0 +1,338 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from extensions import db
+import models
+import ai_service
+from config import BREAKDOWN_CLAIM_TIMEOUT, BREAKDOWN_WORKERS
+from services.breakdown_memo import breakdown_memo
+from services.recommendations import recommendation_index
+from services.event_broker import event_broker
+from services.page_cache import bump_data_version
+
+log = logging.getLogger(__name__)
+
+
+# --- PROVIDERS ---
+# The LLM behind them is picked by LLM_PROVIDER ("fake" for tests / offline).
+# provider(title) -> {"breakdown": [str], "difficulty": int} (empty: AI failed)
+# stream_provider(title) yields ("step", text) items, then ("difficulty", n),
+# and raises if the AI fails mid-way.
+
+
+def _utcnow():
+    # Naive UTC, like every other DateTime column
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BreakdownPipeline:
+    """
+    Runs AI subtask breakdowns off the request thread.
+
+    Task creation commits with breakdown_status="pending" and returns.
+    A worker thread then claims the task, reuses a near-duplicate breakdown
+    (see BreakdownMemo) or calls the provider, bulk-inserts the Subtask rows
+    and updates TaskAnalysis.difficulty_score.
+
+    A breakdown the AI failed on ends "failed" and may be claimed again
+    once claim_timeout has passed since that attempt.
+    """
+
+    def __init__(
+        self, provider=None, stream_provider=None, max_workers=None, claim_timeout=None
+    ):
+        self.provider = provider or ai_service.analyze_task
+        self.stream_provider = stream_provider or ai_service.stream_breakdown
+        self.max_workers = max_workers or BREAKDOWN_WORKERS
+        self.claim_timeout = timedelta(seconds=claim_timeout or BREAKDOWN_CLAIM_TIMEOUT)
+        self.app = None
+
+        self._executor = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.completed = 0
+        self.failed = 0
+
+    def init_app(self, app):
+        self.app = app
+
+    def _get_executor(self):
+        # Created lazily so it is never shared across a fork
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="breakdown"
+            )
+        return self._executor
+
+    def submit(self, task_id, task_title, user_id):
+        """Queues a breakdown. No-op if this process already has it queued."""
+        with self._lock:
+            if task_id in self._in_flight:
+                return None
+            self._in_flight.add(task_id)
+            return self._get_executor().submit(
+                self._run, task_id, task_title, user_id
+            )
+
+    def _claimable(self, now):
+        # Pending, "running" on behalf of a worker that died mid-job (NULL
+        # claim time: claimed before the column existed), or a failed
+        # attempt that is due for a retry
+        Task = models.Task
+        return db.or_(
+            Task.breakdown_status == "pending",
+            db.and_(
+                Task.breakdown_status.in_(("running", "failed")),
+                db.or_(
+                    Task.breakdown_claimed_at.is_(None),
+                    Task.breakdown_claimed_at < now - self.claim_timeout,
+                ),
+            ),
+        )
+
+    def is_claimable(self, task, now=None):
+        """Whether a poll should (re)queue this task's breakdown."""
+        now = now or _utcnow()
+        if task.breakdown_status == "pending":
+            return True
+        return task.breakdown_status in ("running", "failed") and (
+            task.breakdown_claimed_at is None
+            or task.breakdown_claimed_at < now - self.claim_timeout
+        )
+
+    def _claim(self, task_id, user_id):
+        # Atomic pending -> running, so a task resubmitted by another
+        # worker (or a poll) is only ever broken down once.
+        now = _utcnow()
+        claimed = db.session.execute(
+            db.update(models.Task)
+            .where(models.Task.id == task_id, self._claimable(now))
+            .values(breakdown_status="running", breakdown_claimed_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed:
+            bump_data_version(user_id)
+        db.session.commit()
+        return claimed == 1
+
+    def _run(self, task_id, task_title, user_id):
+        try:
+            with self.app.app_context():
+                if not self._claim(task_id, user_id):
+                    return None
+
+                # Near-duplicate of a previous task? Reuse its breakdown.
+                reused = breakdown_memo.lookup(user_id, task_title)
+                if reused:
+                    return self._save(task_id, user_id, reused, created_by="reuse")
+
+                breakdown_memo.record_llm_call()
+                try:
+                    ai_data = self.provider(task_title)
+                except Exception as e:
+                    log.warning("AI breakdown error: %s", e)
+                    ai_data = None
+                # Anything but {"breakdown": [...], ...} (None, a list from a
+                # bad parse) fails now instead of waiting out claim_timeout
+                if not isinstance(ai_data, dict) or not ai_data.get("breakdown"):
+                    return self._mark_failed(task_id, user_id)
+
+                result = self._save(task_id, user_id, ai_data)
+                if result == "done":
+                    breakdown_memo.remember(
+                        user_id,
+                        task_title,
+                        ai_data.get("breakdown", []),
+                        ai_data.get("difficulty", 0),
+                    )
+                return result
+        finally:
+            with self._lock:
+                self._in_flight.discard(task_id)
+
+    def _save(self, task_id, user_id, ai_data, created_by="gemini"):
+        breakdown_steps = ai_data.get("breakdown", [])
+        ai_difficulty = ai_data.get("difficulty", 0)
+
+        try:
+            if breakdown_steps:
+                db.session.execute(
+                    db.insert(models.Subtask),
+                    [
+                        {
+                            "task_id": task_id,
+                            "title": step_text,
+                            "order_index": index,
+                            "status": "pending",
+                            "created_by": created_by,
+                        }
+                        for index, step_text in enumerate(breakdown_steps)
+                    ],
+                )
+
+            # If AI returns 0 (unsure), keep the user's Fear score saved at creation
+            if ai_difficulty > 0:
+                models.TaskAnalysis.query.filter_by(task_id=task_id).update(
+                    {"difficulty_score": ai_difficulty}, synchronize_session=False
+                )
+
+            models.Task.query.filter_by(id=task_id).update(
+                {
+                    "breakdown_status": "done",
+                    "breakdown_difficulty": ai_difficulty or None,
+                },
+                synchronize_session=False,
+            )
+            bump_data_version(user_id)
+            db.session.commit()
+        except Exception:
+            log.exception("Breakdown save error (task %s)", task_id)
+            db.session.rollback()
+            return self._mark_failed(task_id, user_id)
+
+        with self._lock:
+            self.completed += 1
+        recommendation_index.refresh_task(user_id, task_id)
+        event_broker.publish_task(user_id, task_id)
+        return "done"
+
+    def _mark_failed(self, task_id, user_id):
+        # Keeps breakdown_claimed_at, so the retry waits out claim_timeout
+        models.Task.query.filter_by(id=task_id).update(
+            {"breakdown_status": "failed"}, synchronize_session=False
+        )
+        bump_data_version(user_id)
+        db.session.commit()
+        with self._lock:
+            self.failed += 1
+        event_broker.publish_task(user_id, task_id)
+        return "failed"
+
+    # --- STREAMING MODE ---
+
+    def stream_events(self, task_id, task_title, user_id):
+        """
+        Streaming alternative to submit(), run inside the SSE request.
+        Yields ("subtask", row) as soon as each step is parsed and committed,
+        then ("done", ...). If someone else already owns the breakdown,
+        yields a single ("status", ...) so the page falls back to polling.
+        """
+        if not self._claim(task_id, user_id):
+            task = db.session.get(models.Task, task_id)
+            yield "status", {"status": task.breakdown_status or "done"}
+            return
+
+        reused = breakdown_memo.lookup(user_id, task_title)
+        if reused:
+            status = self._save(task_id, user_id, reused, created_by="reuse")
+            for sub in (
+                models.Subtask.query.filter_by(task_id=task_id)
+                .order_by(models.Subtask.order_index)
+                .all()
+            ):
+                yield "subtask", {"id": sub.id, "title": sub.title, "status": sub.status}
+            yield "done", {"status": status, "difficulty": reused["difficulty"]}
+            return
+
+        breakdown_memo.record_llm_call()
+        progress = {"steps": [], "subtask_ids": [], "difficulty": 0}
+        items = self.stream_provider(task_title)
+
+        try:
+            for kind, value in items:
+                row = self._save_stream_item(task_id, user_id, progress, kind, value)
+                if row:
+                    yield "subtask", row
+        except GeneratorExit:
+            # Browser went away mid-stream: a background worker finishes it
+            # (close() must not wait for the rest of the LLM response)
+            self._get_executor().submit(
+                self._drain_stream, task_id, task_title, user_id, items, progress
+            )
+            raise
+        except Exception as e:
+            log.warning("AI breakdown stream error (task %s): %s", task_id, e)
+            status = self._fail_stream(task_id, user_id, progress)
+        else:
+            status = self._finish_stream(task_id, task_title, user_id, progress)
+
+        yield "done", {"status": status, "difficulty": progress["difficulty"] or None}
+
+    def _save_stream_item(self, task_id, user_id, progress, kind, value):
+        """Commits one streamed item. Returns the new subtask's row, if any."""
+        if kind == "difficulty":
+            progress["difficulty"] = value
+            return None
+        sub = models.Subtask(
+            task_id=task_id,
+            title=value,
+            order_index=len(progress["steps"]),
+            status="pending",
+            created_by="gemini",
+        )
+        db.session.add(sub)
+        bump_data_version(user_id)
+        db.session.commit()
+        progress["steps"].append(value)
+        progress["subtask_ids"].append(sub.id)
+        return {"id": sub.id, "title": sub.title, "status": sub.status}
+
+    def _drain_stream(self, task_id, task_title, user_id, items, progress):
+        # Runs on the pool: the rest of a stream whose browser disconnected
+        with self.app.app_context():
+            try:
+                for kind, value in items:
+                    self._save_stream_item(task_id, user_id, progress, kind, value)
+            except Exception as e:
+                log.warning("AI breakdown stream error (task %s): %s", task_id, e)
+                self._fail_stream(task_id, user_id, progress)
+            else:
+                self._finish_stream(task_id, task_title, user_id, progress)
+
+    def _fail_stream(self, task_id, user_id, progress):
+        # Half a breakdown isn't kept: the retry starts from scratch
+        db.session.rollback()
+        if progress["subtask_ids"]:
+            models.Subtask.query.filter(
+                models.Subtask.id.in_(progress["subtask_ids"])
+            ).delete(synchronize_session=False)
+        return self._mark_failed(task_id, user_id)
+
+    def _finish_stream(self, task_id, task_title, user_id, progress):
+        steps, difficulty = progress["steps"], progress["difficulty"]
+        if not steps:
+            return self._fail_stream(task_id, user_id, progress)
+        # If AI returns 0 (unsure), keep the user's Fear score saved at creation
+        if difficulty > 0:
+            models.TaskAnalysis.query.filter_by(task_id=task_id).update(
+                {"difficulty_score": difficulty}, synchronize_session=False
+            )
+        models.Task.query.filter_by(id=task_id).update(
+            {"breakdown_status": "done", "breakdown_difficulty": difficulty or None},
+            synchronize_session=False,
+        )
+        bump_data_version(user_id)
+        db.session.commit()
+        with self._lock:
+            self.completed += 1
+        recommendation_index.refresh_task(user_id, task_id)
+        event_broker.publish_task(user_id, task_id)
+        breakdown_memo.remember(user_id, task_title, steps, difficulty)
+        return "done"
+
+    def stats(self):
+        with self._lock:
+            return {
+                "provider": getattr(self.provider, "__name__", repr(self.provider)),
+                "workers": self.max_workers,
+                "in_flight": len(self._in_flight),
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+breakdown_pipeline = BreakdownPipeline()
@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from extensions import db
+import models
+from config import (
+    BREAKDOWN_REUSE_THRESHOLD,
+    BREAKDOWN_REUSE_GLOBAL,
+    BREAKDOWN_MEMO_TTL,
+    BREAKDOWN_MEMO_USERS,
+)
+from services.inference_server import InferenceUnavailable
+from services.nlp_services import nlp_engine
+
+# --- TUNING CONFIGURATION ---
+
+# How many past breakdowns we keep searchable per user / in the shared index.
+MAX_ENTRIES_PER_USER = 500
+MAX_ENTRIES_GLOBAL = 5000
+
+GLOBAL_SCOPE = "global"
+
+
+class _VectorIndex:
+    """Brute-force cosine index (a few hundred rows: one matmul is plenty)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.vectors = []
+        self.payloads = []
+        self.built_at = time.monotonic()
+        self._matrix = None
+
+    def add(self, vec, payload):
+        self.vectors.append(np.asarray(vec, dtype=np.float32))
+        self.payloads.append(payload)
+        if len(self.vectors) > self.max_entries:
+            del self.vectors[0]
+            del self.payloads[0]
+        self._matrix = None
+
+    def nearest(self, vec):
+        if not self.vectors:
+            return None, 0.0
+        if self._matrix is None:
+            self._matrix = np.stack(self.vectors)
+        # Vectors are unit-normalized, so the dot product IS the cosine similarity
+        sims = self._matrix @ np.asarray(vec, dtype=np.float32)
+        best = int(np.argmax(sims))
+        return self.payloads[best], float(sims[best])
+
+
+class BreakdownMemo:
+    """
+    Reuses a previous AI breakdown when a new task title is a near-duplicate
+    ("Do laundry" vs "do the laundry tonight") instead of calling the LLM.
+
+    Per-user index by default; optional shared index across all users
+    (BREAKDOWN_REUSE_GLOBAL). Indexes are built lazily from the database
+    and rebuilt after BREAKDOWN_MEMO_TTL seconds so other workers'
+    breakdowns show up too.
+    """
+
+    def __init__(self, threshold=None, use_global=None, ttl=None, max_scopes=None):
+        self.threshold = BREAKDOWN_REUSE_THRESHOLD if threshold is None else threshold
+        self.use_global = BREAKDOWN_REUSE_GLOBAL if use_global is None else use_global
+        self.ttl = BREAKDOWN_MEMO_TTL if ttl is None else ttl
+        self.max_scopes = max_scopes or BREAKDOWN_MEMO_USERS
+
+        # scope (user id / GLOBAL_SCOPE) -> _VectorIndex, least recently used first
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.evictions = 0
+        self.lookups = 0
+        self.hits = 0
+        self.skipped = 0  # model not ready yet
+        self.llm_calls = 0
+
+    # --- INDEX BUILDING ---
+
+    def _load_rows(self, user_id):
+        """(title, difficulty, [subtask titles]) for recent AI breakdowns."""
+        # The AI's own difficulty, not TaskAnalysis.difficulty_score: that is
+        # still the user's Fear fallback when the AI didn't give one
+        query = db.session.query(
+            models.Task.id, models.Task.title, models.Task.breakdown_difficulty
+        ).filter(models.Task.breakdown_status == "done")
+        if user_id == GLOBAL_SCOPE:
+            limit = MAX_ENTRIES_GLOBAL
+        else:
+            query = query.filter(models.Task.user_id == user_id)
+            limit = MAX_ENTRIES_PER_USER
+        tasks = query.order_by(models.Task.id.desc()).limit(limit).all()
+        if not tasks:
+            return []
+
+        steps = {}
+        for task_id, title in (
+            db.session.query(models.Subtask.task_id, models.Subtask.title)
+            .filter(
+                models.Subtask.task_id.in_([t.id for t in tasks]),
+                models.Subtask.created_by == "gemini",
+            )
+            .order_by(models.Subtask.task_id, models.Subtask.order_index)
+        ):
+            steps.setdefault(task_id, []).append(title)
+
+        # Oldest first, so the newest breakdown wins on ties
+        return [
+            (t.title, t.breakdown_difficulty, steps[t.id])
+            for t in reversed(tasks)
+            if t.id in steps
+        ]
+
+    def _index_for(self, scope):
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is not None and time.monotonic() - index.built_at < self.ttl:
+                self._indexes.move_to_end(scope)
+                return index
+
+        rows = self._load_rows(scope)
+        limit = MAX_ENTRIES_GLOBAL if scope == GLOBAL_SCOPE else MAX_ENTRIES_PER_USER
+        index = _VectorIndex(limit)
+        if rows:
+            vectors = nlp_engine.encode([title for title, _, _ in rows])
+            for vec, (title, difficulty, breakdown) in zip(vectors, rows):
+                index.add(
+                    vec,
+                    {"title": title, "breakdown": breakdown, "difficulty": difficulty},
+                )
+
+        with self._lock:
+            self._indexes[scope] = index
+            self._indexes.move_to_end(scope)
+            while len(self._indexes) > self.max_scopes:
+                self._indexes.popitem(last=False)
+                self.evictions += 1
+        return index
+
+    # --- PUBLIC API ---
+
+    def lookup(self, user_id, task_title):
+        """
+        Returns {"breakdown", "difficulty", "source_title", "similarity"}
+        for the closest previous breakdown above the threshold, else None.
+        """
+        if not nlp_engine.is_ready:
+            with self._lock:
+                self.skipped += 1
+            return None
+
+        scopes = [user_id] + ([GLOBAL_SCOPE] if self.use_global else [])
+        best, best_sim = None, 0.0
+        try:
+            vec = nlp_engine.encode([task_title])[0]
+            for scope in scopes:
+                index = self._index_for(scope)
+                with self._lock:
+                    payload, sim = index.nearest(vec)
+                if payload is not None and sim > best_sim:
+                    best, best_sim = payload, sim
+        except InferenceUnavailable:
+            # Shared inference server down: just ask the LLM
+            with self._lock:
+                self.skipped += 1
+            return None
+
+        with self._lock:
+            self.lookups += 1
+            if best is None or best_sim < self.threshold:
+                return None
+            self.hits += 1
+
+        return {
+            "breakdown": list(best["breakdown"]),
+            "difficulty": best["difficulty"] or 0,
+            "source_title": best["title"],
+            "similarity": round(best_sim, 3),
+        }
+
+    def remember(self, user_id, task_title, breakdown, difficulty):
+        """Adds a fresh LLM breakdown to the already-built indexes."""
+        if not breakdown or not nlp_engine.is_ready:
+            return
+        try:
+            vec = nlp_engine.encode([task_title])[0]
+        except InferenceUnavailable:
+            return
+        payload = {"title": task_title, "breakdown": breakdown, "difficulty": difficulty}
+        with self._lock:
+            for scope in (user_id, GLOBAL_SCOPE):
+                index = self._indexes.get(scope)
+                if index is not None:
+                    index.add(vec, payload)
+
+    def record_llm_call(self):
+        with self._lock:
+            self.llm_calls += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "global": self.use_global,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+                "skipped_model_not_ready": self.skipped,
+                "llm_calls": self.llm_calls,
+                "llm_calls_saved": self.hits,
+                "indexed_scopes": len(self._indexes),
+                "max_scopes": self.max_scopes,
+                "evictions": self.evictions,
+            }
+
+
+breakdown_memo = BreakdownMemo()
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import NLP_CACHE_DIR, EMBEDDING_CACHE_SIZE, EMBEDDING_DISK_MAX_ENTRIES
+
+log = logging.getLogger(__name__)
+
+# The disk tier is trimmed back to max_disk_entries once every this many writes
+DISK_PRUNE_EVERY = 256
+
+
+def normalize_text(text):
+    """
+    Cache key normalization.
+    MiniLM's tokenizer is uncased and ignores runs of whitespace,
+    so "Buy  Milk" and "buy milk" produce the exact same vector.
+    """
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache that sits in front of model.encode().
+
+    Tier 1: Bounded in-process LRU (per gunicorn worker).
+    Tier 2: SQLite file on disk, shared by every worker and kept across
+    restarts. Bounded too: the oldest-written rows are pruned past
+    max_disk_entries.
+    """
+
+    def __init__(
+        self, model_name, max_entries=None, cache_dir=None, max_disk_entries=None
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries or EMBEDDING_CACHE_SIZE
+        self.max_disk_entries = max_disk_entries or EMBEDDING_DISK_MAX_ENTRIES
+        self.db_path = os.path.join(cache_dir or NLP_CACHE_DIR, "embeddings.sqlite3")
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()  # sqlite connections are per-thread
+        self._inherited = []  # see reset_after_fork()
+        self._disk_enabled = True
+
+        # Counters (exposed via stats())
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_writes = 0
+        self.disk_evictions = 0
+
+    # --- DISK TIER ---
+
+    def _connect(self):
+        # Opened on first use by each thread, never at import time, so a
+        # gunicorn --preload parent doesn't hand its connection to workers
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                conn = sqlite3.connect(self.db_path, timeout=5)
+                # WAL lets readers in other workers proceed while one worker writes
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    " key TEXT PRIMARY KEY,"
+                    " model TEXT NOT NULL,"
+                    " vec BLOB NOT NULL)"
+                )
+                conn.commit()
+            except (OSError, sqlite3.Error) as e:
+                log.warning("Embedding disk cache disabled: %s", e)
+                self._disk_enabled = False
+                return None
+            self._local.conn = conn
+        return conn
+
+    def reset_after_fork(self):
+        """
+        Called in a forked child. SQLite connections must not cross fork():
+        the child opens its own. The inherited ones stay referenced, because
+        closing them here could checkpoint the parent's WAL under it.
+        """
+        self._inherited.append(self._local)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _disk_get(self, key):
+        if not self._disk_enabled:
+            return None
+        conn = self._connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT vec FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            log.warning("Embedding disk cache read error: %s", e)
+            return None
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).copy()
+
+    def _disk_put(self, key, vec):
+        if not self._disk_enabled:
+            return
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model, vec) VALUES (?, ?, ?)",
+                (key, self.model_name, vec.tobytes()),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            log.warning("Embedding disk cache write error: %s", e)
+            return
+
+        with self._lock:
+            self.disk_writes += 1
+            prune = self.disk_writes % DISK_PRUNE_EVERY == 0
+        if prune:
+            self._disk_prune(conn)
+
+    def _disk_prune(self, conn):
+        # REPLACE gives a rewritten row a new rowid, so rowid order is write
+        # order: keep the newest max_disk_entries rows, whichever worker
+        # wrote them
+        try:
+            deleted = conn.execute(
+                "DELETE FROM embeddings WHERE rowid <= ("
+                " SELECT rowid FROM embeddings ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                (self.max_disk_entries,),
+            ).rowcount
+            conn.commit()
+        except sqlite3.Error as e:
+            log.warning("Embedding disk cache prune error: %s", e)
+            return
+        with self._lock:
+            self.disk_evictions += deleted
+
+    # --- MEMORY TIER ---
+
+    def _key(self, text):
+        raw = f"{self.model_name}\x00{normalize_text(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vec):
+        # Caller must hold self._lock
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # --- PUBLIC API ---
+
+    def get(self, text):
+        """Returns the cached vector for `text`, or None on a miss."""
+        key = self._key(text)
+
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vec
+
+        vec = self._disk_get(key)
+
+        with self._lock:
+            if vec is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, vec)
+        return vec
+
+    def put(self, text, vec):
+        key = self._key(text)
+        vec = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vec)
+        self._disk_put(key, vec)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "model": self.model_name,
+                "size": len(self._memory),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "max_disk_entries": self.max_disk_entries,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3)
+                if lookups
+                else 0.0,
+                "disk_enabled": self._disk_enabled,
+            }
+
+
+def anchor_cache_path(model_id, anchors, cache_dir=None):
+    """
+    File name is a hash of the model identifier and every (name, text) pair,
+    so editing one anchor sentence or swapping the model picks a new file.
+    """
+    payload = json.dumps([model_id, list(anchors.items())], ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir or NLP_CACHE_DIR, f"anchors-{digest}.npy")
+
+
+def load_anchor_matrix(model_id, anchors, encode_fn, cache_dir=None):
+    """
+    Returns the (n_anchors, dim) anchor matrix as a read-only memmap.
+    encode_fn(list_of_texts) is only called when no file exists for this key.
+    """
+    path = anchor_cache_path(model_id, anchors, cache_dir)
+
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        pass  # Missing or corrupt: regenerate below
+
+    matrix = np.asarray(encode_fn(list(anchors.values())), dtype=np.float32)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file then rename, so concurrent workers never
+        # observe a half-written array.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode="r")
+    except OSError as e:
+        log.warning("Anchor cache write error: %s", e)
+        return matrix
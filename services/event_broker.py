@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+
+import models
+from config import (
+    EVENT_QUEUE_SIZE,
+    EVENT_HEARTBEAT,
+    EVENT_STREAM_MAX_AGE,
+    EVENT_MAX_STREAMS,
+    EVENT_MAX_STREAMS_PER_USER,
+)
+from services.task_serializer import TASK_LOAD_OPTIONS, serialize_task
+
+
+class EventBroker:
+    """
+    In-process pub/sub for per-user live updates (task, subtask, timer).
+
+    Each open tab subscribes with its own bounded queue. publish() never
+    blocks a request: a tab that stops draining its queue is sent a
+    "resync" and dropped, and its EventSource reconnects with fresh state.
+    Only reaches tabs connected to this process (run one worker with
+    threads, or put a shared broker behind the same interface).
+
+    Every stream pins a worker thread, so subscribe() refuses new ones past
+    max_streams (this process) or max_per_user.
+    """
+
+    def __init__(
+        self,
+        queue_size=None,
+        heartbeat=None,
+        max_age=None,
+        max_streams=None,
+        max_per_user=None,
+    ):
+        self.queue_size = queue_size or EVENT_QUEUE_SIZE
+        self.heartbeat = heartbeat or EVENT_HEARTBEAT
+        self.max_age = max_age or EVENT_STREAM_MAX_AGE
+        self.max_streams = max_streams or EVENT_MAX_STREAMS
+        self.max_per_user = max_per_user or EVENT_MAX_STREAMS_PER_USER
+
+        self._subscribers = {}
+        self._streams = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.refused = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id):
+        """A new queue for one tab, or None if a stream cap is reached."""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            subs = self._subscribers.get(user_id, ())
+            if self._streams >= self.max_streams or len(subs) >= self.max_per_user:
+                self.refused += 1
+                return None
+            self._subscribers.setdefault(user_id, set()).add(q)
+            self._streams += 1
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if subs is not None and q in subs:
+                subs.discard(q)
+                self._streams -= 1
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return bool(self._subscribers.get(user_id))
+
+    def publish(self, user_id, event, data):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+            self.published += 1
+
+        for q in subs:
+            try:
+                q.put_nowait((event, data))
+                with self._lock:
+                    self.delivered += 1
+            except queue.Full:
+                # Stuck tab: make room for one last "resync" and cut it off
+                self.unsubscribe(user_id, q)
+                with self._lock:
+                    self.dropped += 1
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(("resync", {}))
+
+    def publish_task(self, user_id, task_id, event="task"):
+        """Re-serializes one task and publishes it (skipped if nobody listens)."""
+        if not self.has_subscribers(user_id):
+            return
+        task = (
+            models.Task.query.options(*TASK_LOAD_OPTIONS)
+            .filter_by(id=task_id, user_id=user_id)
+            .first()
+        )
+        if task is not None:
+            self.publish(user_id, event, serialize_task(task))
+
+    def listen(self, user_id, q):
+        """
+        Yields (event, data) for one tab (its subscribe() queue), or None as
+        a keep-alive tick. Ends after max_age seconds or after a "resync".
+        """
+        deadline = time.monotonic() + self.max_age
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    item = q.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield None
+                    continue
+                yield item
+                if item[0] == "resync":
+                    return
+        finally:
+            self.unsubscribe(user_id, q)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._subscribers),
+                "streams": self._streams,
+                "max_streams": self.max_streams,
+                "refused_streams": self.refused,
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped_streams": self.dropped,
+            }
+
+
+event_broker = EventBroker()
@@ -0,0 +1,489 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config import FAST_SCORER_ENABLED, FAST_SCORER_PATH
+from services.embedding_cache import normalize_text
+from services.nlp_services import nlp_engine
+
+log = logging.getLogger(__name__)
+
+# --- ARTIFACT FORMAT ---
+# .npz with: format_version, meta (JSON string), W (members, dim, outputs),
+# b (members, outputs), seen (packed bitmap of features seen in training).
+# Bump FORMAT_VERSION whenever featurize() or the layout changes.
+FORMAT_VERSION = 1
+
+OUTPUTS = ("urgency", "fear", "interest", "triviality")
+SCORE_AXES = ("urgency", "fear", "interest")
+
+# --- TRAINING DEFAULTS ---
+HASH_DIM = 2**12  # hashed feature buckets
+ENSEMBLE = 4  # ridge heads, each trained without one fold (spread = uncertainty)
+L2 = 1.0
+HOLDOUT = 0.1
+# Calibrate the gate so titles it lets through are within this much of
+# MiniLM on every 1-10 axis, for 95% of held-out titles
+TARGET_ERROR = 1.0
+# Escalate when fewer than this share of a title's features were seen in training
+MIN_COVERAGE = 0.6
+
+
+def _grams(text):
+    words = normalize_text(text).split()
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        for n in (3, 4):
+            grams += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+    return grams
+
+
+def featurize(text, dim=HASH_DIM):
+    """Signed hashed word / bigram / char n-gram counts, L2-normalized: (idx, vals)."""
+    buckets = {}
+    for gram in _grams(text):
+        # crc32: stable across processes (unlike hash())
+        h = zlib.crc32(gram.encode("utf-8"))
+        idx = h & (dim - 1)
+        buckets[idx] = buckets.get(idx, 0.0) + (1.0 if h >> 31 else -1.0)
+
+    idx = np.fromiter(buckets.keys(), dtype=np.int64, count=len(buckets))
+    vals = np.fromiter(buckets.values(), dtype=np.float64, count=len(buckets))
+    norm = np.linalg.norm(vals)
+    if norm > 0:
+        vals /= norm
+    return idx, vals
+
+
+def teacher_fingerprint(scorer=None):
+    """Changes whenever the MiniLM scorer's model, anchors or constants do."""
+    scorer = scorer or nlp_engine
+    constants = {
+        name: getattr(scorer, name)
+        for name in dir(type(scorer))
+        if name.isupper() and isinstance(getattr(scorer, name), (int, float))
+    }
+    payload = json.dumps(
+        [scorer.model_id, scorer.RAW_ANCHORS, constants], sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class FastScorer:
+    """
+    Distilled stand-in for VectorScorer.analyze_task: hashed n-gram features
+    and a small ensemble of linear heads trained offline on MiniLM's own
+    outputs (see train()). Scores a title in microseconds.
+
+    score() returns None ("not sure") when the title's features were mostly
+    unseen in training or the heads disagree more than the calibrated
+    threshold; the caller then escalates to the full model.
+    """
+
+    def __init__(self, path=None, enabled=None):
+        self.path = path or FAST_SCORER_PATH
+        self.enabled = FAST_SCORER_ENABLED if enabled is None else enabled
+        self.meta = None
+        self.error = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        # Counters
+        self.served = 0
+        self.escalated = 0
+        self.total_us = 0.0
+
+    # --- ARTIFACT ---
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.enabled or not os.path.exists(self.path):
+                return
+            try:
+                artifact = load_artifact(self.path)
+            except (OSError, ValueError, KeyError) as e:
+                self.error = f"unreadable artifact: {e}"
+                log.warning("Fast scorer load error: %s", self.error)
+                return
+
+            meta = artifact["meta"]
+            if meta["teacher"] != teacher_fingerprint():
+                # Distilled from a different model / anchor set: scores would drift
+                self.error = "artifact was trained for a different teacher; retrain it"
+                log.warning("Fast scorer disabled: %s", self.error)
+                return
+
+            self.meta = meta
+            self.W = artifact["W"]
+            self.b = artifact["b"]
+            self.seen = artifact["seen"]
+            log.info(
+                "Fast scorer v%s loaded (%s)", meta["format_version"], meta["created_at"]
+            )
+
+    def use(self, W, b, seen, meta):
+        """Installs in-memory heads (training / tests) instead of the artifact."""
+        with self._lock:
+            self._loaded = True
+            self.W, self.b, self.seen, self.meta = W, b, seen, meta
+
+    @property
+    def is_ready(self):
+        self._load()
+        return self.meta is not None
+
+    # --- SCORING ---
+
+    def predict(self, text):
+        """(mean outputs, per-output spread across heads, feature coverage)."""
+        idx, vals = featurize(text, self.meta["dim"])
+        if not len(idx):
+            return None, None, 0.0
+        per_head = np.einsum("f,mfo->mo", vals, self.W[:, idx, :]) + self.b
+        coverage = float(self.seen[idx].mean())
+        return per_head.mean(axis=0), per_head.std(axis=0), coverage
+
+    def _finish(self, text, outputs):
+        # Same bounds, regex overrides and rounding as VectorScorer._score_row
+        urgency, fear, interest, triviality = (float(x) for x in outputs)
+        urgency, fear, interest = (min(10, max(1, v)) for v in (urgency, fear, interest))
+        urgency, fear = nlp_engine._apply_regex_modifiers(text, urgency, fear)
+        return {
+            "urgency": round(urgency, 1),
+            "interest": round(interest, 1),
+            "fear": round(fear, 1),
+            "triviality": round(triviality, 2),
+            "distilled": True,
+        }
+
+    def score(self, text):
+        """analyze_task-shaped dict, or None when the full model should decide."""
+        if not self.is_ready:
+            return None
+        started = time.perf_counter()
+        outputs, spread, coverage = self.predict(text)
+        gate = self.meta["gate"]
+        sure = (
+            outputs is not None
+            and coverage >= gate["min_coverage"]
+            and float(spread[: len(SCORE_AXES)].max()) <= gate["max_spread"]
+        )
+        result = self._finish(text, outputs) if sure else None
+
+        with self._lock:
+            self.total_us += (time.perf_counter() - started) * 1e6
+            if sure:
+                self.served += 1
+            else:
+                self.escalated += 1
+        return result
+
+    def stats(self):
+        self._load()
+        with self._lock:
+            calls = self.served + self.escalated
+            return {
+                "enabled": self.enabled,
+                "loaded": self.meta is not None,
+                "path": self.path,
+                "error": self.error,
+                "created_at": self.meta["created_at"] if self.meta else None,
+                "report": self.meta["report"] if self.meta else None,
+                "served": self.served,
+                "escalated": self.escalated,
+                "mean_us": round(self.total_us / calls, 1) if calls else None,
+            }
+
+
+fast_scorer = FastScorer()
+
+
+def save_artifact(path, W, b, seen, meta):
+    meta = dict(meta, format_version=FORMAT_VERSION)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Temp file + rename, so running workers never read half a file
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        format_version=np.array(FORMAT_VERSION),
+        meta=np.array(json.dumps(meta)),
+        W=W.astype(np.float32),
+        b=b.astype(np.float32),
+        seen=np.packbits(seen),
+    )
+    os.replace(tmp_path, path)
+
+
+def load_artifact(path):
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"format v{version}, this code reads v{FORMAT_VERSION}")
+        meta = json.loads(str(data["meta"]))
+        W = data["W"]
+        return {
+            "meta": meta,
+            "W": W,
+            "b": data["b"],
+            "seen": np.unpackbits(data["seen"])[: W.shape[1]].astype(bool),
+        }
+
+
+# --- TRAINING ---
+
+_VERBS = [
+    "write", "finish", "fix", "email", "call", "plan", "review", "clean", "buy",
+    "book", "pay", "study for", "prepare", "submit", "organize", "practice",
+    "read", "cook", "wash", "renew", "cancel", "schedule", "draft", "update",
+    "learn", "build", "play", "design", "apply for", "reply to", "file",
+]
+_OBJECTS = [
+    "the report", "the tax return", "my thesis", "the landlord", "the dentist",
+    "groceries", "milk", "the kitchen", "my room", "the dishes", "laundry",
+    "the presentation", "the exam", "the bug in checkout", "the car insurance",
+    "the passport", "the gym membership", "a birthday gift", "the budget",
+    "the slides", "the guitar piece", "a side project", "the garden",
+    "the client proposal", "the job application", "the invoice", "the flight",
+    "the team retro", "mom", "the bank", "the production outage", "a new game",
+]
+_WHEN = [
+    "", "", "today", "tonight", "tomorrow", "asap", "by friday", "next week",
+    "someday", "this weekend", "in 2 hours", "in 30 mins", "before the deadline",
+    "now!", "urgent", "in 24 hours", "eventually", "this month",
+]
+_TONE = [
+    "", "", "", "finally ", "quickly ", "try to ", "have to ", "want to ",
+    "really need to ", "maybe ",
+]
+_EXTRA = [
+    "", "", "", " for fun", " for the boss", " before it's too late",
+    " with friends", " or I'm in trouble", " (small)", " - scary",
+]
+
+
+def synthetic_titles(n, seed=0):
+    """Template titles spanning the urgency / fear / interest vocabulary."""
+    rng = random.Random(seed)
+    titles = set()
+    while len(titles) < n:
+        title = (
+            f"{rng.choice(_TONE)}{rng.choice(_VERBS)} {rng.choice(_OBJECTS)}"
+            f"{rng.choice(_EXTRA)} {rng.choice(_WHEN)}"
+        ).strip()
+        titles.add(title[0].upper() + title[1:])
+    return sorted(titles)
+
+
+def _sparse(rows, dim):
+    from scipy import sparse
+
+    indptr = np.cumsum([0] + [len(idx) for idx, _ in rows])
+    indices = np.concatenate([idx for idx, _ in rows]) if rows else np.zeros(0, np.int64)
+    data = np.concatenate([vals for _, vals in rows]) if rows else np.zeros(0)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), dim))
+
+
+def _overridden(text):
+    return nlp_engine._apply_regex_modifiers(text, 0, 11) != (0, 11)
+
+
+def _moments(X, Y):
+    return (X.T @ X).toarray(), X.T @ Y, np.asarray(X.sum(axis=0)).ravel(), Y.sum(axis=0), X.shape[0]
+
+
+def _fit(X, Y, folds, members, l2):
+    """
+    Ridge heads (unpenalized intercept) from the normal equations. Head k
+    leaves out fold k: its moments are the totals minus fold k's.
+    """
+    dim = X.shape[1]
+    total = _moments(X, Y)
+    W = np.zeros((members, dim, Y.shape[1]))
+    b = np.zeros((members, Y.shape[1]))
+    for k in range(members):
+        held_out = np.flatnonzero(folds == k)
+        xx, xy, sx, sy, n = (t - f for t, f in zip(total, _moments(X[held_out], Y[held_out])))
+        mean_x, mean_y = sx / n, sy / n
+        xx -= n * np.outer(mean_x, mean_x)
+        xx[np.diag_indices(dim)] += l2
+        W[k] = np.linalg.solve(xx, xy - n * np.outer(mean_x, mean_y))
+        b[k] = mean_y - mean_x @ W[k]
+    return W, b
+
+
+def _evaluate(scorer, titles, labels):
+    """Per held-out title: max 1-10 axis error, head spread, feature coverage."""
+    errors, spreads, coverages, axis_errors = [], [], [], []
+    for title, label in zip(titles, labels):
+        outputs, spread, coverage = scorer.predict(title)
+        if outputs is None:
+            errors.append(np.inf)
+            spreads.append(np.inf)
+            coverages.append(0.0)
+            axis_errors.append([np.inf] * len(SCORE_AXES))
+            continue
+        result = scorer._finish(title, outputs)
+        diffs = [abs(result[a] - label[a]) for a in SCORE_AXES]
+        axis_errors.append(diffs)
+        errors.append(max(diffs))
+        spreads.append(float(spread[: len(SCORE_AXES)].max()))
+        coverages.append(coverage)
+    return (np.array(v, dtype=np.float64) for v in (errors, spreads, coverages, axis_errors))
+
+
+def _calibrate(errors, spreads, coverages, min_coverage, target_error):
+    """Largest spread threshold whose accepted titles meet target_error at p95."""
+    eligible = np.flatnonzero((coverages >= min_coverage) & np.isfinite(spreads))
+    best = 0.0
+    for threshold in np.unique(np.quantile(spreads[eligible], np.linspace(0.05, 1, 96))) if len(eligible) else []:
+        accepted = eligible[spreads[eligible] <= threshold]
+        if len(accepted) and np.percentile(errors[accepted], 95) <= target_error:
+            best = float(threshold)
+    return best
+
+
+def train(
+    titles,
+    labels,
+    dim=HASH_DIM,
+    members=ENSEMBLE,
+    l2=L2,
+    holdout=HOLDOUT,
+    target_error=TARGET_ERROR,
+    min_coverage=MIN_COVERAGE,
+    seed=0,
+):
+    """
+    Fits the heads on (title, analyze_task output) pairs and calibrates the
+    confidence gate on a held-out split. Returns a FastScorer using them
+    (save with save_artifact(path, scorer.W, scorer.b, scorer.seen, scorer.meta)).
+    """
+    order = np.random.default_rng(seed).permutation(len(titles))
+    n_holdout = max(1, int(len(titles) * holdout))
+    held, fit = order[:n_holdout], order[n_holdout:]
+    # Regex-overridden labels are floors / caps, not what the model said.
+    # Don't fit to them: _finish() re-applies the same overrides exactly.
+    fit = np.array([i for i in fit if not _overridden(titles[i])], dtype=np.int64)
+
+    rows = [featurize(titles[i], dim) for i in fit]
+    Y = np.array([[labels[i][o] for o in OUTPUTS] for i in fit], dtype=np.float64)
+    X = _sparse(rows, dim)
+    W, b = _fit(X, Y, np.arange(len(fit)) % members, members, l2)
+    seen = np.asarray((abs(X).sum(axis=0) > 0)).ravel()
+
+    scorer = FastScorer(enabled=True)
+    meta = {
+        "dim": dim,
+        "members": members,
+        "l2": l2,
+        "teacher": teacher_fingerprint(),
+        "teacher_model": nlp_engine.model_id,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "gate": {"min_coverage": min_coverage, "max_spread": float("inf")},
+    }
+    scorer.use(W, b, seen, meta)
+
+    held_titles = [titles[i] for i in held]
+    held_labels = [labels[i] for i in held]
+    errors, spreads, coverages, axis_errors = _evaluate(scorer, held_titles, held_labels)
+    max_spread = _calibrate(errors, spreads, coverages, min_coverage, target_error)
+    meta["gate"]["max_spread"] = max_spread
+
+    accepted = (coverages >= min_coverage) & (spreads <= max_spread)
+    finite = np.isfinite(errors)
+    meta["report"] = {
+        "titles": len(titles),
+        "train": len(fit),
+        "holdout": len(held),
+        "target_p95_error": target_error,
+        "all": {
+            "mae": dict(zip(SCORE_AXES, np.round(axis_errors[finite].mean(axis=0), 3).tolist())),
+            "p95_error": round(float(np.percentile(errors[finite], 95)), 3) if finite.any() else None,
+        },
+        "fast_path": {
+            "share": round(float(accepted.mean()), 3),
+            "mae": dict(
+                zip(SCORE_AXES, np.round(axis_errors[accepted].mean(axis=0), 3).tolist())
+            )
+            if accepted.any()
+            else None,
+            "p95_error": round(float(np.percentile(errors[accepted], 95)), 3)
+            if accepted.any()
+            else None,
+        },
+    }
+    return scorer
+
+
+def latency_report(scorer, titles):
+    """p50/p99 per-title latency: fast path vs an uncached MiniLM forward pass."""
+    fast, full = [], []
+    for title in titles:
+        started = time.perf_counter()
+        scorer.predict(title)
+        fast.append((time.perf_counter() - started) * 1e6)
+
+        if nlp_engine.is_ready:
+            started = time.perf_counter()
+            vec = nlp_engine.model.encode([title], convert_to_numpy=True, normalize_embeddings=True)
+            sims = vec.astype(np.float64) @ nlp_engine.anchor_matrix.astype(np.float64).T
+            nlp_engine._score_row(title, sims[0])
+            full.append((time.perf_counter() - started) * 1e6)
+
+    def pct(values):
+        if not values:
+            return None
+        p50, p99 = np.percentile(values, [50, 99])
+        return {"p50": round(float(p50), 1), "p99": round(float(p99), 1)}
+
+    return {"fast_us": pct(fast), "minilm_us": pct(full)}
+
+
+def distill(out=None, n_synthetic=20000, n_history=50000, seed=0, log=print):
+    """
+    Trains the fast scorer against the loaded MiniLM scorer on synthetic
+    plus historical task titles, saves the artifact and returns its report.
+    Needs an app context (historical titles come from the tasks table).
+    """
+    from extensions import db
+    import models
+
+    out = out or FAST_SCORER_PATH
+    nlp_engine.load()
+    if not nlp_engine.is_ready:
+        raise RuntimeError(f"MiniLM is not available to distill from: {nlp_engine.error}")
+
+    history = db.session.execute(
+        db.select(models.Task.title).distinct().limit(n_history)
+    ).scalars().all()
+    titles = sorted(set(synthetic_titles(n_synthetic, seed)) | {t for t in history if t})
+    log(f"Labelling {len(titles)} titles with {nlp_engine.model_id} ({len(history)} historical)...")
+
+    labels = []
+    for start in range(0, len(titles), 256):
+        labels += nlp_engine.analyze_batch(titles[start : start + 256])
+        if start % 5120 == 0:
+            log(f"  {start + min(256, len(titles) - start)}/{len(titles)}")
+
+    log("Fitting heads...")
+    scorer = train(titles, labels, seed=seed)
+    rng = random.Random(seed)
+    sample = rng.sample(titles, min(500, len(titles)))
+    scorer.meta["report"]["latency"] = latency_report(scorer, [t + " x" for t in sample])
+
+    save_artifact(out, scorer.W, scorer.b, scorer.seen, scorer.meta)
+    log(f"Saved {out}")
+    return scorer.meta["report"]
@@ -0,0 +1,35 @@
+from collections import namedtuple
+
+from flask import g, session
+
+from extensions import db
+import models
+
+# What the pages need to know about the logged-in user
+Identity = namedtuple("Identity", "id username level total_xp data_version")
+
+
+def load_identity(user_id):
+    """Identity for user_id (one primary-key lookup), or None if no such user."""
+    row = db.session.execute(
+        db.select(
+            models.User.id,
+            models.User.username,
+            models.User.level,
+            models.User.total_xp,
+            models.User.data_version,
+        ).where(models.User.id == user_id)
+    ).first()
+    return Identity(*row) if row is not None else None
+
+
+def current_identity():
+    """
+    The logged-in user's Identity, read once per request (or None).
+    Always from the database, never a per-process cache: pages serve by its
+    data_version, and any worker may have made the last write.
+    """
+    if "identity" not in g:
+        user_id = session.get("user_id")
+        g.identity = None if user_id is None else load_identity(user_id)
+    return g.identity
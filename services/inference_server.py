@@ -0,0 +1,376 @@
+"""
+Shared MiniLM inference server.
+
+One process holds the model; every gunicorn worker sends its embedding
+cache misses over a Unix socket (RemoteEncoder). Requests that arrive
+within NLP_BATCH_WAIT_MS of each other are encoded as one micro-batch.
+
+Run next to the web workers and point them at it:
+    python -m services.inference_server [--socket PATH]
+    NLP_SERVER_SOCKET=PATH gunicorn ...
+"""
+import argparse
+import bisect
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from config import (
+    LOG_LEVEL,
+    NLP_BATCH_MAX,
+    NLP_BATCH_WAIT_MS,
+    NLP_CACHE_DIR,
+    NLP_SERVER_SOCKET,
+    NLP_SERVER_TIMEOUT,
+)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = os.path.join(NLP_CACHE_DIR, "inference.sock")
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# Wire format: 4-byte length + JSON header, then header["nbytes"] raw bytes
+_LENGTH = struct.Struct("!I")
+
+
+class InferenceUnavailable(ConnectionError):
+    """The inference server can't be reached or didn't answer in time."""
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _send(sock, header, payload=b""):
+    head = json.dumps(header).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(head)) + head + payload)
+
+
+def _recv(sock):
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    header = json.loads(_recv_exact(sock, size))
+    return header, _recv_exact(sock, header.get("nbytes", 0))
+
+
+class Histogram:
+    """Cumulative bucket counts + a window of recent samples for percentiles."""
+
+    def __init__(self, buckets, window=10000):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.samples = deque(maxlen=window)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.samples.append(value)
+        self.total += value
+
+    def snapshot(self):
+        n = sum(self.counts)
+        p50, p99 = (
+            np.percentile(self.samples, [50, 99]).tolist() if self.samples else (None, None)
+        )
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "count": n,
+            "mean": round(self.total / n, 3) if n else None,
+            "p50": None if p50 is None else round(p50, 3),
+            "p99": None if p99 is None else round(p99, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class _Pending:
+    def __init__(self, texts):
+        self.texts = texts
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.vectors = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Collects concurrent encode requests into micro-batches.
+
+    A single thread takes the first waiting request, then keeps pulling more
+    for up to `wait_ms` or until `max_batch` titles are queued, and runs ONE
+    encode() call for the lot (duplicate titles encoded once). Each caller
+    gets its own rows back.
+    """
+
+    def __init__(self, encode, max_batch=None, wait_ms=None):
+        self.encode = encode
+        self.max_batch = max_batch or NLP_BATCH_MAX
+        self.wait = (NLP_BATCH_WAIT_MS if wait_ms is None else wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Histograms + counters
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.requests = 0
+        self.errors = 0
+
+    def _ensure_thread(self):
+        # Started lazily so it is never shared across a fork
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name="nlp-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def encode_many(self, texts, timeout=None):
+        """(len(texts), dim) float32 vectors; blocks until its batch has run."""
+        pending = _Pending(list(texts))
+        self._ensure_thread()
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError("inference batch timed out")
+        if pending.error is not None:
+            raise pending.error
+        return pending.vectors
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            n_texts = len(batch[0].texts)
+            deadline = time.perf_counter() + self.wait
+            while n_texts < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                n_texts += len(pending.texts)
+            self._run(batch)
+
+    def _run(self, batch):
+        unique = list(dict.fromkeys(t for pending in batch for t in pending.texts))
+        try:
+            matrix = np.asarray(self.encode(unique), dtype=np.float32) if unique else None
+            error = None
+        except Exception as e:
+            log.exception("Inference batch error")
+            matrix, error = None, e
+
+        row = {text: i for i, text in enumerate(unique)}
+        finished = time.perf_counter()
+        with self._lock:
+            self.batch_size.observe(len(unique))
+            for pending in batch:
+                self.requests += 1
+                if error is not None:
+                    self.errors += 1
+                self.latency_ms.observe((finished - pending.enqueued_at) * 1000)
+
+        for pending in batch:
+            if error is not None:
+                pending.error = error
+            elif pending.texts:
+                pending.vectors = matrix[[row[t] for t in pending.texts]]
+            else:
+                pending.vectors = np.zeros((0, 0), dtype=np.float32)
+            pending.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "wait_ms": self.wait * 1000,
+                "queued": self._queue.qsize(),
+                "requests": self.requests,
+                "errors": self.errors,
+                "latency_ms": self.latency_ms.snapshot(),
+                "batch_size": self.batch_size.snapshot(),
+            }
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One connection per client thread, kept open across requests
+        batcher = self.server.batcher
+        while True:
+            try:
+                header, _ = _recv(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+
+            if header.get("op") == "stats":
+                _send(self.request, {"stats": batcher.stats()})
+                continue
+            try:
+                vectors = batcher.encode_many(header["texts"], NLP_SERVER_TIMEOUT)
+            except Exception as e:
+                _send(self.request, {"error": str(e)})
+                continue
+            _send(
+                self.request,
+                {"shape": list(vectors.shape), "nbytes": vectors.nbytes},
+                vectors.tobytes(),
+            )
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Every worker thread connects once; a full backlog fails connect() (EAGAIN)
+    request_queue_size = 256
+
+    def __init__(self, socket_path, batcher):
+        if os.path.exists(socket_path):
+            # Refuse to steal the socket of a server that is still running
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                os.unlink(socket_path)
+            else:
+                raise RuntimeError(f"inference server already running on {socket_path}")
+            finally:
+                probe.close()
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        super().__init__(socket_path, _Handler)
+        self.batcher = batcher
+
+
+class RemoteEncoder:
+    """
+    Client side: a stand-in for SentenceTransformer in VectorScorer.
+    Each thread keeps its own connection; any socket error or timeout is
+    raised as InferenceUnavailable (callers fall back to the heuristic).
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout or NLP_SERVER_TIMEOUT
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.requests = 0
+        self.failures = 0
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _call(self, header):
+        try:
+            sock = self._connection()
+            _send(sock, header)
+            reply, payload = _recv(sock)
+        except (ConnectionError, OSError, ValueError) as e:
+            # Half-read replies can't be resynced: start a fresh connection
+            sock = getattr(self._local, "sock", None)
+            if sock is not None:
+                sock.close()
+                self._local.sock = None
+            with self._lock:
+                self.failures += 1
+            raise InferenceUnavailable(f"inference server: {e}") from e
+
+        with self._lock:
+            self.requests += 1
+        if "error" in reply:
+            raise InferenceUnavailable(f"inference server: {reply['error']}")
+        return reply, payload
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        if not normalize_embeddings:
+            raise ValueError("the inference server only returns normalized vectors")
+        reply, payload = self._call({"op": "encode", "texts": list(texts)})
+        return np.frombuffer(payload, dtype=np.float32).reshape(reply["shape"])
+
+    def ping(self):
+        """The server's batcher stats (raises InferenceUnavailable if down)."""
+        return self._call({"op": "stats"})[0]["stats"]
+
+    def reset(self):
+        # After fork: never share the parent's sockets
+        self._local = threading.local()
+
+    def stats(self):
+        try:
+            server = self.ping()
+        except InferenceUnavailable:
+            server = None
+        with self._lock:
+            return {
+                "socket": self.socket_path,
+                "requests": self.requests,
+                "failures": self.failures,
+                "server": server,
+            }
+
+
+def serve(socket_path=None, max_batch=None, wait_ms=None):
+    """Loads MiniLM once (NLP_BACKEND) and serves it on a Unix socket until interrupted."""
+    from services.nlp_services import VectorScorer
+
+    socket_path = socket_path or NLP_SERVER_SOCKET or DEFAULT_SOCKET
+    model = VectorScorer().load_model()
+    batcher = MicroBatcher(
+        lambda texts: model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ),
+        max_batch,
+        wait_ms,
+    )
+
+    server = InferenceServer(socket_path, batcher)
+    print(
+        f"Inference server on {socket_path} "
+        f"(max batch {batcher.max_batch}, wait {batcher.wait * 1000:g} ms)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--socket", default=None, help=f"default: {DEFAULT_SOCKET}")
+    parser.add_argument("--max-batch", type=int, default=None)
+    parser.add_argument("--wait-ms", type=float, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=LOG_LEVEL, format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+    )
+    serve(args.socket, args.max_batch, args.wait_ms)
@@ -0,0 +1,362 @@
+import json
+import os
+import random
+import threading
+import time
+
+from config import (
+    LLM_MODEL_NAME,
+    LLM_TIMEOUT,
+    LLM_MAX_IN_FLIGHT,
+    LLM_QUEUE_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET,
+)
+
+# --- TUNING CONFIGURATION ---
+
+# RETRY BACKOFF: "Full jitter" exponential backoff, in seconds.
+# Sleep is random(0, min(CAP, BASE * 2^attempt)) so retries from many
+# workers don't hit the provider in lockstep.
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 4.0
+
+
+class LLMError(Exception):
+    """Base class: callers catch this and use their fallback."""
+
+
+class LLMTimeoutError(LLMError):
+    pass
+
+
+class LLMBusyError(LLMError):
+    """Every in-flight slot stayed taken for the whole queue wait."""
+
+
+class CircuitOpenError(LLMError):
+    """The breaker is open: fail fast without touching the provider."""
+
+
+class CircuitBreaker:
+    """
+    closed -> (N consecutive failures) -> open -> (reset timeout) -> half_open
+    half_open lets ONE probe call through: success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or LLM_BREAKER_FAILURES
+        self.reset_timeout = reset_timeout or LLM_BREAKER_RESET
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._probe_in_flight = False
+            # half_open: a single probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def release_probe(self):
+        """The probe never reached the provider (e.g. no free slot)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+# --- PROVIDERS ---
+# A provider exposes generate(prompt, timeout) -> str and
+# stream(prompt, timeout) -> iterator of str chunks, and raises on failure.
+
+
+class GeminiProvider:
+    """One shared GenerativeModel per process (not one per call)."""
+
+    def __init__(self, model_name=None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=os.getenv("API_KEY"))
+        self.model_name = model_name or LLM_MODEL_NAME
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def generate(self, prompt, timeout):
+        response = self.model.generate_content(
+            prompt, request_options={"timeout": timeout}
+        )
+        return response.text
+
+    def stream(self, prompt, timeout):
+        response = self.model.generate_content(
+            prompt, stream=True, request_options={"timeout": timeout}
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeLLMProvider:
+    """
+    Local stand-in for tests and load experiments.
+    Injects latency (`delay` seconds) and failures (`error_rate` 0-1).
+    stream() replays `stream_response` in `chunk_size` pieces, one every
+    `chunk_delay` seconds, like tokens arriving from the real API, and
+    raises after `fail_after_chunks` pieces if set (a mid-stream failure).
+    """
+
+    DEFAULT_RESPONSE = json.dumps(
+        {
+            "breakdown": [
+                "Define the smallest useful outcome",
+                "Do the first focused chunk",
+                "Review and wrap up",
+            ],
+            "difficulty": 4,
+        }
+    )
+    DEFAULT_STREAM_RESPONSE = (
+        "STEP: Define the smallest useful outcome\n"
+        "STEP: Do the first focused chunk\n"
+        "STEP: Review and wrap up\n"
+        "DIFFICULTY: 4\n"
+    )
+
+    def __init__(
+        self,
+        response=None,
+        delay=0.0,
+        error_rate=0.0,
+        seed=None,
+        stream_response=None,
+        chunk_size=8,
+        chunk_delay=0.0,
+        fail_after_chunks=None,
+    ):
+        self.response = response or self.DEFAULT_RESPONSE
+        self.stream_response = stream_response or self.DEFAULT_STREAM_RESPONSE
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.fail_after_chunks = fail_after_chunks
+        self.delay = delay
+        self.error_rate = error_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _start_call(self, timeout):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.error_rate
+
+        if self.delay > timeout:
+            time.sleep(timeout)
+            raise LLMTimeoutError(f"fake provider exceeded {timeout:.2f}s")
+        time.sleep(self.delay)
+        if fail:
+            raise RuntimeError("fake provider injected error")
+
+    def generate(self, prompt, timeout):
+        self._start_call(timeout)
+        return self.response
+
+    def stream(self, prompt, timeout):
+        self._start_call(timeout)
+        text = self.stream_response
+        for n, i in enumerate(range(0, len(text), self.chunk_size)):
+            if n == self.fail_after_chunks:
+                raise RuntimeError("fake provider failed mid-stream")
+            if i:
+                time.sleep(self.chunk_delay)
+            yield text[i : i + self.chunk_size]
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "fake": FakeLLMProvider,
+}
+
+
+class LLMClient:
+    """
+    Shared provider client with:
+      - a per-call latency budget (covers queueing, retries and backoff),
+      - bounded in-flight concurrency (callers queue up to LLM_QUEUE_TIMEOUT),
+      - jittered retries,
+      - a circuit breaker that fails fast while the provider is down.
+    """
+
+    def __init__(
+        self,
+        provider,
+        timeout=None,
+        max_in_flight=None,
+        queue_timeout=None,
+        max_retries=None,
+        breaker=None,
+    ):
+        self.provider = provider
+        self.timeout = timeout or LLM_TIMEOUT
+        self.max_in_flight = max_in_flight or LLM_MAX_IN_FLIGHT
+        self.queue_timeout = LLM_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.breaker = breaker or CircuitBreaker()
+
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected_open = 0
+        self.rejected_busy = 0
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def _backoff(self, attempt, remaining):
+        sleep_for = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+        time.sleep(max(0.0, min(sleep_for, remaining)))
+
+    def _admit(self, deadline):
+        """Breaker check + wait for an in-flight slot (raises if refused)."""
+        self._count("calls")
+
+        if not self.breaker.allow():
+            self._count("rejected_open")
+            raise CircuitOpenError("LLM circuit open")
+
+        self._count("waiting")
+        acquired = self._slots.acquire(
+            timeout=max(0.0, min(self.queue_timeout, deadline - time.monotonic()))
+        )
+        self._count("waiting", -1)
+        if not acquired:
+            self._count("rejected_busy")
+            # Not a provider failure: give back the half-open probe, if we held it
+            self.breaker.release_probe()
+            raise LLMBusyError("LLM concurrency limit reached")
+
+        self._count("in_flight")
+
+    def _release(self):
+        self._count("in_flight", -1)
+        self._slots.release()
+
+    def generate(self, prompt, budget=None):
+        """Returns the provider's text or raises an LLMError subclass."""
+        deadline = time.monotonic() + (budget or self.timeout)
+        self._admit(deadline)
+        try:
+            last_error = None
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if attempt > 0:
+                    if not self.breaker.allow():
+                        self._count("rejected_open")
+                        raise CircuitOpenError("LLM circuit opened during retries")
+                    self._count("retries")
+
+                try:
+                    text = self.provider.generate(prompt, timeout=remaining)
+                except Exception as e:
+                    last_error = e
+                    self.breaker.record_failure()
+                    if attempt < self.max_retries and self.breaker.state != "open":
+                        self._backoff(attempt, deadline - time.monotonic())
+                    continue
+
+                self.breaker.record_success()
+                self._count("successes")
+                return text
+
+            self._count("failures")
+            if isinstance(last_error, LLMError):
+                raise last_error
+            if last_error is None:
+                raise LLMTimeoutError("LLM latency budget exhausted")
+            raise LLMError(str(last_error)) from last_error
+        finally:
+            self._release()
+
+    def stream(self, prompt, budget=None):
+        """
+        Yields text chunks as the provider produces them.
+        The budget covers the whole stream. No retries: chunks already
+        handed to the caller can't be taken back.
+        """
+        deadline = time.monotonic() + (budget or self.timeout)
+        self._admit(deadline)
+        try:
+            for chunk in self.provider.stream(
+                prompt, timeout=max(0.0, deadline - time.monotonic())
+            ):
+                if time.monotonic() > deadline:
+                    raise LLMTimeoutError("LLM stream exceeded its latency budget")
+                yield chunk
+        except GeneratorExit:
+            # Consumer went away (e.g. browser closed the SSE connection)
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            self._count("failures")
+            if isinstance(e, LLMError):
+                raise
+            raise LLMError(str(e)) from e
+        else:
+            self.breaker.record_success()
+            self._count("successes")
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "provider": type(self.provider).__name__,
+                "breaker": self.breaker.state,
+                "breaker_opened": self.breaker.times_opened,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rejected_circuit_open": self.rejected_open,
+                "rejected_busy": self.rejected_busy,
+            }
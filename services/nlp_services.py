@@ -1,5 +1,22 @@
-from sentence_transformers import SentenceTransformer, util
+import logging
+import os
+import threading
+import time
+import numpy as np
 import re
+from contextlib import nullcontext
+
+from config import (
+    NLP_BACKEND,
+    NLP_MODEL_REVISION,
+    NLP_ONNX_FILE,
+    NLP_ONNX_THREADS,
+    NLP_SERVER_SOCKET,
+)
+from services.embedding_cache import EmbeddingCache, load_anchor_matrix
+from services.inference_server import InferenceUnavailable, RemoteEncoder
+
+log = logging.getLogger(__name__)
 
 
 class VectorScorer:
@@ -29,30 +46,198 @@ class VectorScorer:
     OVERRIDE_URGENCY_SOON = 8.5  # "Tomorrow"
     OVERRIDE_FEAR_MIN = 2.0  # Cap fear for trivial tasks
 
-    def __init__(self):
-        print("Loading MiniLM Vector Model...")
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-
-        # ANCHORS (No changes here, kept for context)
-        raw_anchors = {
-            "emotional_urgency": "I am under intense pressure and feel like time is running out right now",
-            "temporal_urgency": "This has a strict deadline and must be finished very soon",
-            "non_urgency": "This can wait indefinitely and there is absolutely no time pressure",
-            "interest": "I am genuinely excited and actively want to do this hobby gaming or project right now",
-            "boredom": "This feels painfully boring and I want to escape doing it",
-            "fear": "I am scared this will go badly and have serious negative consequences",
-            "comfort": "This feels completely safe familiar and low risk",
-            "trivial": "This is a quick simple errand like buying groceries or a small chore",
-        }
+    # DEGRADED MODE: Scores used while the model is still loading.
+    NEUTRAL_SCORE = 5.0
+
+    MODEL_NAME = "all-MiniLM-L6-v2"
+    MODEL_REPO = f"sentence-transformers/{MODEL_NAME}"
+
+    # ENCODER BACKENDS (NLP_BACKEND): graphs exported in the model's Hub repo.
+    # The int8 one is the dynamically quantized AVX2 build (any modern x86).
+    ONNX_FILES = {
+        "onnx": "onnx/model.onnx",
+        "onnx-int8": "onnx/model_quint8_avx2.onnx",
+    }
+    BACKENDS = ("torch",) + tuple(ONNX_FILES)
+
+    # How long load() waits for the shared inference server to come up
+    SERVER_CONNECT_TIMEOUT = 60
+
+    # ANCHORS (No changes here, kept for context)
+    RAW_ANCHORS = {
+        "emotional_urgency": "I am under intense pressure and feel like time is running out right now",
+        "temporal_urgency": "This has a strict deadline and must be finished very soon",
+        "non_urgency": "This can wait indefinitely and there is absolutely no time pressure",
+        "interest": "I am genuinely excited and actively want to do this hobby gaming or project right now",
+        "boredom": "This feels painfully boring and I want to escape doing it",
+        "fear": "I am scared this will go badly and have serious negative consequences",
+        "comfort": "This feels completely safe familiar and low risk",
+        "trivial": "This is a quick simple errand like buying groceries or a small chore",
+    }
+
+    def __init__(self, backend=None):
+        self.backend = backend or NLP_BACKEND
+        if self.backend not in self.BACKENDS:
+            raise ValueError(
+                f"Unknown NLP backend {self.backend!r} (expected one of {self.BACKENDS})"
+            )
+
+        # The model is NOT loaded here: importing the app must stay cheap.
+        # Call load() (blocking) or start_background_load() (non-blocking).
+        self.model = None
+        self.state = "idle"  # idle -> loading -> ready | failed
+        self.error = None
+        self.load_seconds = None
+        self._ready = threading.Event()
+        self._load_lock = threading.Lock()
+
+        # Repeated titles (debounced keyup, re-predicts) skip the forward pass
+        self.cache = EmbeddingCache(self.model_id)
+
+    @property
+    def model_id(self):
+        # Backends differ in the last digits: never share cached vectors
+        model_id = f"{self.MODEL_NAME}@{NLP_MODEL_REVISION or 'default'}"
+        if self.backend != "torch":
+            model_id += f"+{NLP_ONNX_FILE or self.backend}"
+        return model_id
+
+    # --- LIFECYCLE ---
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def load(self):
+        """Loads the model and anchors. Blocking, safe to call more than once."""
+        with self._load_lock:
+            if self.is_ready:
+                return
+            self.state = "loading"
+            started = time.perf_counter()
+            try:
+                if NLP_SERVER_SOCKET:
+                    model = self._connect_server(NLP_SERVER_SOCKET)
+                else:
+                    model = self.load_model()
+
+                # Stacked anchor matrix: one row per anchor, so a batch of task
+                # vectors is scored against every anchor with a single matmul.
+                # Memory-mapped from disk; only encoded when anchors/model change.
+                self.anchor_names = list(self.RAW_ANCHORS)
+                self.anchor_matrix = load_anchor_matrix(
+                    self.model_id,
+                    self.RAW_ANCHORS,
+                    lambda texts: model.encode(
+                        texts, convert_to_numpy=True, normalize_embeddings=True
+                    ),
+                )
+                self.anchor_index = {k: i for i, k in enumerate(self.anchor_names)}
+                self.model = model
+            except Exception as e:
+                log.exception("MiniLM load error")
+                self.state = "failed"
+                self.error = str(e)
+                return
+
+            self.load_seconds = round(time.perf_counter() - started, 2)
+            self.state = "ready"
+            self._ready.set()
+            log.info("MiniLM ready in %ss", self.load_seconds)
+
+    def load_model(self):
+        """The encoder for self.backend (anything with a SentenceTransformer-style encode)."""
+        log.info("Loading MiniLM vector model (%s)...", self.backend)
+        if self.backend == "torch":
+            # Heavy import (pulls in torch), so it only happens here
+            from sentence_transformers import SentenceTransformer
+
+            return SentenceTransformer(self.MODEL_NAME, revision=NLP_MODEL_REVISION)
+
+        from services.onnx_encoder import OnnxEncoder
+
+        return OnnxEncoder(
+            self.MODEL_REPO,
+            NLP_ONNX_FILE or self.ONNX_FILES[self.backend],
+            revision=NLP_MODEL_REVISION,
+            threads=NLP_ONNX_THREADS or None,
+        )
+
+    def _connect_server(self, socket_path):
+        # Workers may boot before the server has finished loading the model
+        remote = RemoteEncoder(socket_path)
+        deadline = time.monotonic() + self.SERVER_CONNECT_TIMEOUT
+        while True:
+            try:
+                remote.ping()
+                log.info("Using shared inference server at %s", socket_path)
+                return remote
+            except InferenceUnavailable:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def start_background_load(self):
+        if self.state != "idle":
+            return
+        self.state = "loading"
+        threading.Thread(target=self.load, name="nlp-loader", daemon=True).start()
 
-        self.anchors = {
-            k: self.model.encode(v, convert_to_numpy=True, normalize_embeddings=True)
-            for k, v in raw_anchors.items()
+    def wait_until_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def _reset_after_fork(self):
+        # Threads don't survive fork (gunicorn --preload): restart the load
+        # in the child instead of waiting forever on a dead loader thread.
+        self._load_lock = threading.Lock()
+        self.cache.reset_after_fork()
+        if isinstance(self.model, RemoteEncoder):
+            self.model.reset()
+        if not self.is_ready and self.state == "loading":
+            self.state = "idle"
+            self.start_background_load()
+
+    def status(self):
+        return {
+            "state": self.state,
+            "model": self.model_id,
+            "backend": "remote" if NLP_SERVER_SOCKET else self.backend,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
         }
 
-    def _calculate_axis_score(self, task_vec, pos_anchor, neg_anchor):
-        pos_sim = float(util.cos_sim(task_vec, self.anchors[pos_anchor]))
-        neg_sim = float(util.cos_sim(task_vec, self.anchors[neg_anchor]))
+    def inference_stats(self):
+        """Shared inference server stats, or None when the model is in-process."""
+        if isinstance(self.model, RemoteEncoder):
+            return self.model.stats()
+        return None
+
+    def encode(self, texts, admission=None):
+        """
+        Returns an (N, dim) matrix of normalized vectors.
+        Cached titles are reused; all misses go through ONE model.encode call,
+        inside an `admission` slot if given (raises Overloaded when shed).
+        Raises InferenceUnavailable if the shared inference server is down.
+        """
+        vectors = [self.cache.get(t) for t in texts]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+
+        if missing:
+            slot = nullcontext() if admission is None else admission.slot(titles=len(missing))
+            with slot:
+                encoded = self.model.encode(
+                    missing, convert_to_numpy=True, normalize_embeddings=True
+                )
+            fresh = dict(zip(missing, encoded))
+            for text, vec in fresh.items():
+                self.cache.put(text, vec)
+            vectors = [fresh[t] if v is None else v for t, v in zip(texts, vectors)]
+
+        return np.stack(vectors)
+
+    def _calculate_axis_score(self, sims, pos_anchor, neg_anchor):
+        pos_sim = float(sims[self.anchor_index[pos_anchor]])
+        neg_sim = float(sims[self.anchor_index[neg_anchor]])
 
         # Use the class constant for sensitivity
         diff = pos_sim - neg_sim
@@ -91,17 +276,14 @@ class VectorScorer:
 
         return urgency, fear
 
-    def analyze_task(self, text):
-        task_vec = self.model.encode(
-            text, convert_to_numpy=True, normalize_embeddings=True
-        )
-
+    def _score_row(self, text, sims):
+        """Turns one row of anchor similarities into the 1-10 metrics."""
         # --- 1. BASE AI SCORING ---
         emotional = self._calculate_axis_score(
-            task_vec, "emotional_urgency", "non_urgency"
+            sims, "emotional_urgency", "non_urgency"
         )
         temporal = self._calculate_axis_score(
-            task_vec, "temporal_urgency", "non_urgency"
+            sims, "temporal_urgency", "non_urgency"
         )
 
         # Weighted Average
@@ -112,14 +294,14 @@ class VectorScorer:
         )
         urgency = min(10, urgency)
 
-        fear = self._calculate_axis_score(task_vec, "fear", "comfort")
-        interest = self._calculate_axis_score(task_vec, "interest", "boredom")
+        fear = self._calculate_axis_score(sims, "fear", "comfort")
+        interest = self._calculate_axis_score(sims, "interest", "boredom")
 
         # Apply Interest Penalty
         interest = max(1, interest - fear * self.INTEREST_FEAR_PENALTY)
 
         # --- 2. TRIVIALITY CHECK ---
-        triviality_score = float(util.cos_sim(task_vec, self.anchors["trivial"]))
+        triviality_score = float(sims[self.anchor_index["trivial"]])
 
         if triviality_score > self.TRIVIALITY_THRESHOLD:
             # Drastically lower fear for simple tasks
@@ -135,6 +317,44 @@ class VectorScorer:
             "triviality": round(triviality_score, 2),
         }
 
+    def analyze_batch(self, texts, admission=None):
+        """
+        Scores N titles with one encode call and one (N x anchors) matmul.
+        Returns the same dicts as analyze_task, in input order.
+        """
+        if not texts:
+            return []
+
+        task_matrix = self.encode(texts, admission)
+
+        # Vectors are unit-normalized, so the dot product IS the cosine similarity
+        sims = task_matrix.astype(np.float64) @ self.anchor_matrix.astype(np.float64).T
 
-# Singleton instance
+        return [self._score_row(text, row) for text, row in zip(texts, sims)]
+
+    def analyze_task(self, text):
+        # Same code path as the batch API, so both always agree
+        return self.analyze_batch([text])[0]
+
+    def analyze_heuristic(self, text):
+        """
+        Fast fallback while the model is not ready:
+        neutral defaults + regex overrides only, flagged as degraded.
+        """
+        urgency, fear = self._apply_regex_modifiers(
+            text, self.NEUTRAL_SCORE, self.NEUTRAL_SCORE
+        )
+        return {
+            "urgency": round(urgency, 1),
+            "interest": self.NEUTRAL_SCORE,
+            "fear": round(fear, 1),
+            "triviality": 0.0,
+            "degraded": True,
+        }
+
+
+# Singleton instance (model loads on demand, see start_background_load)
 nlp_engine = VectorScorer()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=nlp_engine._reset_after_fork)
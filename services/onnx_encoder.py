@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class OnnxEncoder:
+    """
+    MiniLM on ONNX Runtime, no torch: the exported graph from the model's
+    Hub repo (fp32 or int8-quantized) plus its fast tokenizer, followed by
+    the same mean pooling + L2 normalization as the sentence-transformers
+    pipeline. encode() matches SentenceTransformer.encode for our calls.
+    """
+
+    # sentence-transformers' max_seq_length for all-MiniLM-L6-v2
+    MAX_SEQ_LENGTH = 256
+
+    def __init__(self, repo_id, file_name, revision=None, threads=None):
+        # Heavy imports, only when this backend is selected
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        self.file_name = file_name
+        self.tokenizer = Tokenizer.from_file(
+            hf_hub_download(repo_id, "tokenizer.json", revision=revision)
+        )
+        self.tokenizer.enable_truncation(self.MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            hf_hub_download(repo_id, file_name, revision=revision),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dim = self.session.get_outputs()[0].shape[-1]
+
+    def encode(
+        self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False
+    ):
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer.encode_batch(list(texts[start : start + batch_size]))
+            ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array(
+                    [e.type_ids for e in encoded], dtype=np.int64
+                )
+            hidden = self.session.run(None, feeds)[0]
+
+            # Mean over the real (non-padding) tokens
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(
+                weights.sum(axis=1), 1e-9, None
+            )
+            if normalize_embeddings:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            chunks.append(pooled.astype(np.float32))
+
+        if not chunks:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.concatenate(chunks)
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import make_response, request
+
+from extensions import db
+import models
+from config import PAGE_CACHE_BYTES
+
+
+def bump_data_version(*user_ids):
+    """Marks the users' pages stale. Runs in the caller's transaction (no commit)."""
+    if not user_ids:
+        return
+    db.session.execute(
+        db.update(models.User)
+        .where(models.User.id.in_(user_ids))
+        .values(data_version=models.User.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+class PageCache:
+    """
+    Conditional GETs + rendered-page cache for the dashboard and focus view.
+
+    Every write to a user's tasks bumps users.data_version in the same
+    transaction, so (page, user, version) identifies the page's content.
+    Read the version BEFORE loading anything else, and from the database
+    (current_identity()), not a per-process cache: the page can then only
+    be newer than its version, never older, whichever worker made the last
+    write.
+
+    - The ETag is derived from the version (and the deployed templates /
+      static files), so a matching If-None-Match is answered with a 304
+      without touching the tasks or rendering anything.
+    - Otherwise the rendered body is reused if this process already built
+      it at that version. One entry per page; a newer version replaces it.
+      Evicted LRU once the bodies pass max_bytes.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or PAGE_CACHE_BYTES
+        self._build = ""
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def init_app(self, app):
+        # A deploy that changes templates or script.js must not 304
+        digest = hashlib.sha1()
+        for folder in (app.template_folder, app.static_folder):
+            root = os.path.join(app.root_path, folder)
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    with open(os.path.join(dirpath, name), "rb") as f:
+                        digest.update(f.read())
+        self._build = digest.hexdigest()[:12]
+
+    def etag(self, key, version):
+        raw = f"{self._build}:{key!r}:{version}"
+        return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+    def _get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key, version, body):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            if len(body) > self.max_bytes:
+                return
+            self._entries[key] = (version, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def respond(self, key, version, render):
+        """
+        Response for the page `key` at `version`: 304 if the browser has it,
+        the cached body if we have it, else render() (and cache the result).
+        """
+        etag = self.etag(key, version)
+        if request.if_none_match.contains(etag):
+            with self._lock:
+                self.not_modified += 1
+            response = make_response("", 304)
+        else:
+            body = self._get(key, version)
+            if body is None:
+                body = render().encode("utf-8")
+                self._put(key, version, body)
+            response = make_response(body)
+
+        response.set_etag(etag)
+        # Per-user content: the browser may keep it but must revalidate
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Cookie")
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pages": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+page_cache = PageCache()
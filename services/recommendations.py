@@ -0,0 +1,205 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func
+
+from extensions import db
+import models
+from config import RECOMMEND_MAX_DIFFICULTY, RECOMMEND_MAX_USERS, RECOMMEND_TTL
+
+SWITCHABLE_STATUSES = ("pending", "paused", "active")
+
+
+class _UserRanking:
+    """
+    One user's switchable tasks, kept sorted by
+    (-interest, remaining steps, task id): most interesting first, and
+    among equals the one closest to done.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.entries = {}
+        self.built_at = time.monotonic()
+
+    def upsert(self, task_id, key, payload):
+        self.remove(task_id)
+        bisect.insort(self.keys, key)
+        self.entries[task_id] = (key, payload)
+
+    def remove(self, task_id):
+        old = self.entries.pop(task_id, None)
+        if old is not None:
+            i = bisect.bisect_left(self.keys, old[0])
+            del self.keys[i]
+
+    def top(self, k, exclude_id=None):
+        results = []
+        for key in self.keys:
+            task_id = key[2]
+            if task_id == exclude_id:
+                continue
+            results.append(self.entries[task_id][1])
+            if len(results) == k:
+                break
+        return results
+
+
+class RecommendationIndex:
+    """
+    Per-user ranked candidate set for recommend_switch.
+
+    Built lazily with one query per user, then maintained incrementally:
+    routes call refresh_task() after any change to a task's status, scores
+    or subtasks, so answering "I'm Stuck" never touches the database.
+    """
+
+    def __init__(self, max_difficulty=None, ttl=None, max_users=None):
+        self.max_difficulty = (
+            RECOMMEND_MAX_DIFFICULTY if max_difficulty is None else max_difficulty
+        )
+        self.ttl = RECOMMEND_TTL if ttl is None else ttl
+        self.max_users = max_users or RECOMMEND_MAX_USERS
+
+        # user_id -> _UserRanking, least recently used first
+        self._rankings = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.evictions = 0
+        self.skipped_refreshes = 0
+        self.builds = 0
+        self.updates = 0
+        self.queries = 0
+
+    # --- LOADING ---
+
+    def _rows_query(self):
+        # Correlated count: stays on the (task_id, order_index) index per task
+        remaining = (
+            db.select(func.count(models.Subtask.id))
+            .where(
+                models.Subtask.task_id == models.Task.id,
+                models.Subtask.status != "completed",
+            )
+            .correlate(models.Task)
+            .scalar_subquery()
+        )
+        return (
+            db.session.query(
+                models.Task.id,
+                models.Task.user_id,
+                models.Task.title,
+                models.Task.status,
+                models.TaskAnalysis.interest_score,
+                models.TaskAnalysis.difficulty_score,
+                remaining,
+            )
+            .join(models.TaskAnalysis, models.TaskAnalysis.task_id == models.Task.id)
+        )
+
+    def _entry(self, row):
+        """(key, payload) for a switchable task, else None."""
+        task_id, _, title, status, interest, difficulty, remaining = row
+        if status not in SWITCHABLE_STATUSES:
+            return None
+        if difficulty is None or difficulty > self.max_difficulty:
+            return None
+        interest = interest or 0.0
+        payload = {
+            "task_id": task_id,
+            "title": title,
+            "difficulty": difficulty,
+            "interest": interest,
+            "remaining_steps": remaining,
+        }
+        return (-interest, remaining, task_id), payload
+
+    def _ranking_for(self, user_id):
+        with self._lock:
+            ranking = self._rankings.get(user_id)
+            if ranking is not None and time.monotonic() - ranking.built_at < self.ttl:
+                self._rankings.move_to_end(user_id)
+                return ranking
+
+        ranking = _UserRanking()
+        rows = (
+            self._rows_query()
+            .filter(
+                models.Task.user_id == user_id,
+                models.Task.status.in_(SWITCHABLE_STATUSES),
+            )
+            .all()
+        )
+        for row in rows:
+            entry = self._entry(row)
+            if entry:
+                ranking.upsert(row[0], *entry)
+
+        with self._lock:
+            self._rankings[user_id] = ranking
+            self._rankings.move_to_end(user_id)
+            while len(self._rankings) > self.max_users:
+                self._rankings.popitem(last=False)
+                self.evictions += 1
+            self.builds += 1
+        return ranking
+
+    # --- PUBLIC API ---
+
+    def refresh_task(self, user_id, task_id):
+        """Re-reads one task and moves it in (or out of) its owner's ranking."""
+        with self._lock:
+            if user_id not in self._rankings:
+                # Not built (or evicted): the first lookup will load it
+                self.skipped_refreshes += 1
+                return
+        row = (
+            self._rows_query()
+            .filter(models.Task.id == task_id, models.Task.user_id == user_id)
+            .first()
+        )
+        with self._lock:
+            ranking = self._rankings.get(user_id)
+            if ranking is None:
+                return
+            if row is None:
+                # Deleted, or no analysis row
+                ranking.remove(task_id)
+                return
+            entry = self._entry(row)
+            if entry:
+                ranking.upsert(task_id, *entry)
+            else:
+                ranking.remove(task_id)
+            self.updates += 1
+
+    def invalidate(self, user_id):
+        """Drops a user's ranking (e.g. after a bulk import); rebuilt on next use."""
+        with self._lock:
+            self._rankings.pop(user_id, None)
+
+    def recommend(self, user_id, current_task_id=None, k=1):
+        """Top-k switchable tasks for the user, best first."""
+        ranking = self._ranking_for(user_id)
+        with self._lock:
+            self.queries += 1
+            return ranking.top(k, exclude_id=current_task_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._rankings),
+                "max_users": self.max_users,
+                "evictions": self.evictions,
+                "skipped_refreshes": self.skipped_refreshes,
+                "candidates": sum(len(r.keys) for r in self._rankings.values()),
+                "builds": self.builds,
+                "updates": self.updates,
+                "queries": self.queries,
+            }
+
+
+recommendation_index = RecommendationIndex()
@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+
+from extensions import db
+import models
+from services.page_cache import bump_data_version
+from services.scoring_service import compute_final_priorities, get_user_impulsiveness
+
+# Rows per chunk (one SELECT + one executemany UPDATE each)
+REPRIORITIZE_CHUNK = 5000
+
+
+def reprioritize(user_id=None, chunk_size=REPRIORITIZE_CHUNK, dry_run=False, log=print):
+    """
+    Recomputes priority_score for open tasks from their stored TaskAnalysis
+    sliders, after a change to the scoring constants. Streams the rows in
+    keyset chunks, scores each chunk with the vectorized formulas and writes
+    back only the scores that changed (one commit per chunk).
+    Completed tasks keep the score their XP was awarded with.
+
+    Returns {"scanned", "updated", "seconds", "rows_per_sec"}.
+    """
+    started = time.perf_counter()
+    impulsiveness = get_user_impulsiveness(user_id)
+
+    select = (
+        db.select(
+            models.TaskAnalysis.id,
+            models.Task.id,
+            models.Task.user_id,
+            models.Task.priority_score,
+            models.TaskAnalysis.urgency_score,
+            models.TaskAnalysis.fear_score,
+            models.TaskAnalysis.interest_score,
+        )
+        .join(models.Task, models.Task.id == models.TaskAnalysis.task_id)
+        .where(
+            models.Task.status != "completed",
+            models.TaskAnalysis.urgency_score.isnot(None),
+            models.TaskAnalysis.fear_score.isnot(None),
+            models.TaskAnalysis.interest_score.isnot(None),
+        )
+        .order_by(models.TaskAnalysis.id)
+        .limit(chunk_size)
+    )
+    if user_id is not None:
+        select = select.where(models.Task.user_id == user_id)
+
+    scanned = updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select.where(models.TaskAnalysis.id > last_id)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        scanned += len(rows)
+
+        _, task_ids, user_ids, old, urgency, fear, interest = zip(*rows)
+        new = compute_final_priorities(urgency, fear, interest, impulsiveness)
+        # NULL priority counts as changed
+        old = np.array([np.nan if p is None else p for p in old], dtype=np.float64)
+        changed = np.flatnonzero(old != new)
+
+        if len(changed) and not dry_run:
+            db.session.execute(
+                db.update(models.Task),
+                [
+                    {"id": task_ids[i], "priority_score": float(new[i])}
+                    for i in changed
+                ],
+            )
+            bump_data_version(*sorted({user_ids[i] for i in changed}))
+            db.session.commit()
+        updated += len(changed)
+        log(f"  scanned {scanned}, {'would update' if dry_run else 'updated'} {updated}")
+
+    seconds = time.perf_counter() - started
+    return {
+        "scanned": scanned,
+        "updated": updated,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(scanned / seconds, 1) if seconds else None,
+    }
@@ -1,5 +1,14 @@
+import logging
+
+import numpy as np
+
+from services.admission import Overloaded
+from services.fast_scorer import fast_scorer
+from services.inference_server import InferenceUnavailable
 from services.nlp_services import nlp_engine
 
+log = logging.getLogger(__name__)
+
 # --- TUNING CONFIGURATION (The "Physics" Constants) ---
 
 # SCORE BOUNDARIES: Keep inputs within the 1-10 scale.
@@ -30,6 +39,10 @@ DEFAULT_IMPULSIVENESS = 1.5
 # Prevents a score of 4000 if the math gets weird.
 UTILITY_CAP = 100
 
+# PRIORITY WEIGHTING: 60% Pressure (urgency * 2 + fear), 40% Procrastination (TMT).
+PRESSURE_WEIGHT = 0.6
+TMT_WEIGHT = 0.4
+
 
 def calculate_tmt_score(urgency, fear, interest, impulsiveness=None):
     """
@@ -72,25 +85,114 @@ def calculate_tmt_score(urgency, fear, interest, impulsiveness=None):
     return round(utility, 2)
 
 
+def compute_final_priority(urgency, fear, interest, impulsiveness=None):
+    """
+    Centralizes the priority score math.
+    Change the formula here, and it updates everywhere.
+    """
+    tmt_score = calculate_tmt_score(urgency, fear, interest, impulsiveness)
+
+    priority_pressure = urgency * 2 + fear
+    return priority_pressure * PRESSURE_WEIGHT + tmt_score * TMT_WEIGHT
+
+
+# --- VECTORIZED (bulk re-prioritization) ---
+# Same formulas on float64 arrays, operation for operation, so every element
+# matches the scalar functions above bit for bit.
+
+
+def _round2(values):
+    """Elementwise round(x, 2) with Python's (correctly rounded) semantics."""
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    # x * 100 can itself round across a .xx5 tie; redo those few exactly
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def calculate_tmt_scores(urgency, fear, interest, impulsiveness=None):
+    """Array version of calculate_tmt_score."""
+    if impulsiveness is None:
+        impulsiveness = DEFAULT_IMPULSIVENESS
+
+    urgency = np.clip(np.asarray(urgency, dtype=np.float64), SCORE_MIN, SCORE_MAX)
+    fear = np.clip(np.asarray(fear, dtype=np.float64), SCORE_MIN, SCORE_MAX)
+    interest = np.clip(np.asarray(interest, dtype=np.float64), SCORE_MIN, SCORE_MAX)
+
+    E = np.maximum(1, EXPECTANCY_BUFFER - fear)
+    V = interest
+    effective_urgency = np.minimum(SCORE_MAX, urgency + (fear * FEAR_ACCELERATOR))
+    D = np.maximum(MIN_DELAY, SCORE_MAX - effective_urgency)
+
+    denominator = 1 + (impulsiveness * D)
+    utility = np.minimum(UTILITY_CAP, (E * V) / denominator)
+    return _round2(utility)
+
+
+def compute_final_priorities(urgency, fear, interest, impulsiveness=None):
+    """Array version of compute_final_priority."""
+    urgency = np.asarray(urgency, dtype=np.float64)
+    fear = np.asarray(fear, dtype=np.float64)
+    tmt_scores = calculate_tmt_scores(urgency, fear, interest, impulsiveness)
+
+    priority_pressure = urgency * 2 + fear
+    return priority_pressure * PRESSURE_WEIGHT + tmt_scores * TMT_WEIGHT
+
+
 def get_user_impulsiveness(user_id=None):
     # Placeholder: In the future, fetch this from the User table
     return DEFAULT_IMPULSIVENESS
 
 
-def predict_task_metrics(task_text, user_id=None):
-    # 1. AI Analysis
-    metrics = nlp_engine.analyze_task(task_text)
-
+def _attach_scores(metrics, impulsiveness):
     # 2. Physics Calculation
-    impulsiveness = get_user_impulsiveness(user_id)
-
     final_score = calculate_tmt_score(
         metrics["urgency"], metrics["fear"], metrics["interest"], impulsiveness
     )
-    priority_pressure = metrics["urgency"] * 2 + metrics["fear"]
-    final_priority = priority_pressure * 0.6 + final_score * 0.4
+    final_priority = compute_final_priority(
+        metrics["urgency"], metrics["fear"], metrics["interest"], impulsiveness
+    )
 
     metrics["motivation_score"] = round(final_score, 2)
     metrics["priority_score"] = round(final_priority, 2)
 
     return metrics
+
+
+def _analyze(task_texts, admission=None):
+    # 1. AI Analysis (regex-only heuristic until the model finishes loading,
+    # while the shared inference server is unreachable, or when admission
+    # control sheds the request in "degrade" mode)
+    if nlp_engine.is_ready:
+        try:
+            return nlp_engine.analyze_batch(task_texts, admission)
+        except InferenceUnavailable as e:
+            log.warning("Inference unavailable: %s", e)
+        except Overloaded:
+            if admission.reject:
+                raise
+            return [dict(nlp_engine.analyze_heuristic(t), shed=True) for t in task_texts]
+    return [nlp_engine.analyze_heuristic(t) for t in task_texts]
+
+
+def predict_task_metrics(task_text, user_id=None, admission=None):
+    # Distilled fast path first; titles it isn't sure about go to MiniLM
+    metrics = fast_scorer.score(task_text) or _analyze([task_text], admission)[0]
+    return _attach_scores(metrics, get_user_impulsiveness(user_id))
+
+
+def predict_task_metrics_batch(task_texts, user_id=None, admission=None):
+    """
+    Batch version of predict_task_metrics: the titles the fast path isn't
+    sure about go to MiniLM together (one forward pass).
+    """
+    impulsiveness = get_user_impulsiveness(user_id)
+    results = [fast_scorer.score(text) for text in task_texts]
+    unsure = [i for i, metrics in enumerate(results) if metrics is None]
+    if unsure:
+        analyzed = _analyze([task_texts[i] for i in unsure], admission)
+        for i, metrics in zip(unsure, analyzed):
+            results[i] = metrics
+    return [_attach_scores(metrics, impulsiveness) for metrics in results]
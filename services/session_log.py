@@ -0,0 +1,155 @@
+import atexit
+import logging
+import threading
+
+from extensions import db
+import models
+from services.analytics import apply_rollups
+from config import SESSION_LOG_BATCH, SESSION_LOG_FLUSH_INTERVAL
+
+log = logging.getLogger(__name__)
+
+# Rows kept for a retry if a flush fails; beyond this the oldest are dropped
+MAX_BUFFERED = 50_000
+
+
+class SessionLog:
+    """
+    Append-only log of finished focus intervals (TaskSession rows).
+
+    record() only appends to an in-memory buffer, so the timer endpoints
+    don't pay for an extra commit. A background thread bulk-inserts the
+    buffer in one statement per batch and, in the same transaction, folds
+    the batch (plus buffered completions) into the analytics rollups.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or SESSION_LOG_BATCH
+        self.flush_interval = flush_interval or SESSION_LOG_FLUSH_INTERVAL
+        self.app = None
+
+        self._buffer = []
+        self._completions = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+        # Counters
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        self.app = app
+        # Don't lose the tail of the buffer on a clean shutdown
+        atexit.register(self._flush_in_app)
+
+    def _ensure_thread(self):
+        # Started lazily so it is never shared across a fork
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._flush_loop, name="session-log", daemon=True
+            )
+            self._thread.start()
+
+    def record(self, user_id, task_id, started_at, ended_at):
+        if started_at is None or ended_at <= started_at:
+            return
+        with self._lock:
+            self._buffer.append(
+                {
+                    "user_id": user_id,
+                    "task_id": task_id,
+                    "started_at": started_at,
+                    "ended_at": ended_at,
+                    "active": False,
+                }
+            )
+            self.recorded += 1
+            if len(self._buffer) >= self.batch_size:
+                self._wake.set()
+            self._ensure_thread()
+
+    def record_completion(self, user_id, completed_at, xp):
+        with self._lock:
+            self._completions.append(
+                {"user_id": user_id, "completed_at": completed_at, "xp": xp}
+            )
+            self._ensure_thread()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._flush_in_app()
+
+    def _flush_in_app(self):
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception:
+            log.exception("Session log flush error")
+
+    def flush(self):
+        """Writes everything buffered so far. Safe to call from any thread."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+                completions, self._completions = self._completions, []
+            if not rows and not completions:
+                return 0
+
+            try:
+                for i in range(0, len(rows), self.batch_size):
+                    db.session.execute(
+                        db.insert(models.TaskSession), rows[i : i + self.batch_size]
+                    )
+                apply_rollups(sessions=rows, completions=completions)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Put the rows back (ahead of newer ones) for the next attempt
+                with self._lock:
+                    self._completions = completions + self._completions
+                    self._buffer = rows + self._buffer
+                    overflow = len(self._buffer) - MAX_BUFFERED
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        self.dropped += overflow
+                raise
+
+            with self._lock:
+                self.flushed += len(rows)
+                self.flushes += 1
+            return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buffered": len(self._buffer),
+                "buffered_completions": len(self._completions),
+                "recorded": self.recorded,
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "dropped": self.dropped,
+            }
+
+
+def sessions_in_range(user_id, start, end, task_id=None):
+    """
+    A user's focus intervals overlapping [start, end), oldest first.
+    Served by ix_task_sessions_user_ended: the range scan starts at `start`.
+    """
+    query = models.TaskSession.query.filter(
+        models.TaskSession.user_id == user_id,
+        models.TaskSession.ended_at > start,
+        models.TaskSession.started_at < end,
+    )
+    if task_id is not None:
+        query = query.filter(models.TaskSession.task_id == task_id)
+    return query.order_by(models.TaskSession.ended_at).all()
+
+
+session_log = SessionLog()
@@ -0,0 +1,88 @@
+from extensions import db
+import models
+from services.page_cache import bump_data_version
+
+MODEL_VERSION = "MiniLM-L6-v2"
+
+
+def create_tasks(user_id, specs, commit=True):
+    """
+    Writes N tasks with their analyses and subtasks in one transaction:
+    one multi-row INSERT per table, task ids from INSERT ... RETURNING.
+
+    Each spec: {"title", "priority_score", "urgency", "fear", "interest",
+    optional "difficulty" (defaults to fear), "confidence", "subtasks"
+    (list of titles), "breakdown_status"}. Tasks that come with subtasks
+    don't need an AI breakdown, so they default to "done", else "pending".
+    Returns the new task ids, in spec order.
+    """
+    if not specs:
+        return []
+
+    on_sqlite = db.engine.dialect.name == "sqlite"
+    if on_sqlite:
+        # SQLAlchemy can't sort SQLite's RETURNING rows by parameter (it would
+        # fall back to one INSERT per row), but SQLite hands out rowids in
+        # VALUES order under the write lock, so ascending ids line up.
+        insert = db.insert(models.Task).returning(models.Task.id)
+    else:
+        insert = db.insert(models.Task).returning(
+            models.Task.id, sort_by_parameter_order=True
+        )
+    task_ids = db.session.execute(
+        insert,
+        [
+            {
+                "user_id": user_id,
+                "title": spec["title"],
+                "priority_score": spec["priority_score"],
+                "status": "pending",
+                "time_spent": 0,
+                "breakdown_status": spec.get("breakdown_status")
+                or ("done" if spec.get("subtasks") else "pending"),
+            }
+            for spec in specs
+        ],
+    ).scalars().all()
+    if on_sqlite:
+        task_ids = sorted(task_ids)
+
+    db.session.execute(
+        db.insert(models.TaskAnalysis),
+        [
+            {
+                "task_id": task_id,
+                "urgency_score": spec["urgency"],
+                "fear_score": spec["fear"],
+                "interest_score": spec["interest"],
+                "difficulty_score": round(spec.get("difficulty") or spec["fear"]),
+                "confidence": spec.get("confidence", 1.0),
+                "model_version": MODEL_VERSION,
+            }
+            for task_id, spec in zip(task_ids, specs)
+        ],
+    )
+
+    subtask_rows = [
+        {
+            "task_id": task_id,
+            "title": step,
+            "order_index": index,
+            "status": "pending",
+            "created_by": "user",
+        }
+        for task_id, spec in zip(task_ids, specs)
+        for index, step in enumerate(spec.get("subtasks") or [])
+    ]
+    if subtask_rows:
+        db.session.execute(db.insert(models.Subtask), subtask_rows)
+    bump_data_version(user_id)
+
+    if commit:
+        db.session.commit()
+    return task_ids
+
+
+def create_task(user_id, **spec):
+    """Single-task convenience wrapper; returns the new task id."""
+    return create_tasks(user_id, [spec])[0]
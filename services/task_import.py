@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from config import IMPORT_CHUNK, IMPORT_MAX_ROWS
+from services.task_factory import create_tasks
+from services.nlp_services import nlp_engine
+from services.scoring_service import _attach_scores, get_user_impulsiveness
+
+FORMATS = ("csv", "ndjson")
+SLIDERS = ("urgency", "fear", "interest")
+TITLE_MAX = 200  # Task.title is String(200)
+
+
+class TaskImportError(ValueError):
+    """Malformed upload (bad format, missing title column, too many rows)."""
+
+
+class _ReadableStream(io.RawIOBase):
+    """
+    Wraps anything with read(n) for TextIOWrapper. Upload streams don't all
+    implement readable() (SpooledTemporaryFile only has it from Python 3.11).
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def _text_lines(binary_stream):
+    # Incremental decode: never holds more than one line of the upload
+    return io.TextIOWrapper(
+        io.BufferedReader(_ReadableStream(binary_stream)),
+        encoding="utf-8-sig",
+        newline="",
+    )
+
+
+def iter_records(binary_stream, fmt):
+    """Yields {"title", [urgency, fear, interest]} dicts, parsed as they stream in."""
+    if fmt == "csv":
+        reader = csv.DictReader(_text_lines(binary_stream))
+        if not reader.fieldnames or "title" not in [
+            f.strip().lower() for f in reader.fieldnames
+        ]:
+            raise TaskImportError("CSV needs a 'title' column")
+        for row in reader:
+            yield {(k or "").strip().lower(): v for k, v in row.items()}
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(_text_lines(binary_stream), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise TaskImportError(f"Line {line_no} is not valid JSON")
+            if isinstance(record, str):
+                record = {"title": record}
+            yield record
+    else:
+        raise TaskImportError(f"format must be one of {FORMATS}")
+
+
+def _clean(record):
+    """(title, {slider: value}, [subtask titles]) or None for rows we skip."""
+    title = str(record.get("title") or "").strip()[:TITLE_MAX]
+    if not title:
+        return None
+    sliders = {}
+    for name in SLIDERS:
+        try:
+            if record.get(name) not in (None, ""):
+                sliders[name] = float(record[name])
+        except (TypeError, ValueError):
+            pass
+    # NDJSON may carry the steps from the old tool; CSV can't
+    subtasks = record.get("subtasks")
+    if not isinstance(subtasks, list):
+        subtasks = []
+    subtasks = [str(s).strip()[:500] for s in subtasks if str(s).strip()]
+    return title, sliders, subtasks
+
+
+def _insert_chunk(user_id, rows, impulsiveness):
+    titles = [title for title, _, _ in rows]
+    # One batched MiniLM pass for the whole chunk. Straight to the model, not
+    # the fast scorer: scores stored for good come from MiniLM itself. The
+    # caller checks that it is loaded (raises InferenceUnavailable if the
+    # shared inference server is down).
+    predictions = nlp_engine.analyze_batch(titles)
+
+    specs = []
+    for (title, sliders, subtasks), metrics in zip(rows, predictions):
+        # Values given in the file win over the model's guesses
+        metrics.update(sliders)
+        metrics = _attach_scores(metrics, impulsiveness)
+        specs.append(
+            {
+                "title": title,
+                "priority_score": metrics["priority_score"],
+                "urgency": metrics["urgency"],
+                "fear": metrics["fear"],
+                "interest": metrics["interest"],
+                "confidence": 1.0 if len(sliders) == len(SLIDERS) else 0.5,
+                "subtasks": subtasks,
+            }
+        )
+
+    # Tasks + analyses + subtasks: one transaction per chunk
+    task_ids = create_tasks(user_id, specs)
+    return [
+        (task_id, spec["title"])
+        for task_id, spec in zip(task_ids, specs)
+        if not spec["subtasks"]
+    ]
+
+
+def import_tasks(
+    user_id,
+    records,
+    defer_breakdown=True,
+    on_created=None,
+    chunk_size=None,
+    max_rows=None,
+):
+    """
+    Scores and bulk-inserts streamed records in chunks, one transaction per
+    chunk, so memory stays at one chunk regardless of file size.
+    With defer_breakdown the tasks stay "pending" and get broken down when
+    first opened; otherwise on_created(task_id, title) is called per task
+    (rows that brought their own subtasks skip the AI breakdown).
+    Returns counters including rows/sec. Chunks committed before a
+    TaskImportError stay imported.
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK
+    max_rows = max_rows or IMPORT_MAX_ROWS
+    impulsiveness = get_user_impulsiveness(user_id)
+
+    started = time.perf_counter()
+    imported = skipped = 0
+    records = iter(records)
+    while True:
+        raw = list(islice(records, chunk_size))
+        if not raw:
+            break
+        rows = []
+        for record in raw:
+            cleaned = _clean(record) if isinstance(record, dict) else None
+            if cleaned is None:
+                skipped += 1
+            else:
+                rows.append(cleaned)
+        if imported + len(rows) > max_rows:
+            raise TaskImportError(f"Max {max_rows} tasks per import ({imported} imported)")
+        if not rows:
+            continue
+
+        needs_breakdown = _insert_chunk(user_id, rows, impulsiveness)
+        imported += len(rows)
+        if not defer_breakdown and on_created:
+            for task_id, title in needs_breakdown:
+                on_created(task_id, title)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "imported": imported,
+        "skipped": skipped,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(imported / elapsed, 1) if elapsed else None,
+        "breakdown": "deferred" if defer_breakdown else "queued",
+    }
@@ -0,0 +1,103 @@
+from sqlalchemy import tuple_
+from sqlalchemy.orm import selectinload
+
+import models
+
+# Eager-load both relationships with one IN (...) query each, so serializing
+# N tasks costs 3 queries total instead of 1 + 2N lazy loads.
+TASK_LOAD_OPTIONS = (
+    selectinload(models.Task.analysis),
+    selectinload(models.Task.subtasks),
+)
+
+
+def serialize_subtask(sub):
+    return {"id": sub.id, "title": sub.title, "status": sub.status}
+
+
+def serialize_task(task):
+    """The JSON shape script.js expects (SERVER_TASKS / CURRENT_TASK)."""
+    return {
+        "id": task.id,
+        "title": task.title,
+        "priority": task.priority_score or 0,
+        "status": task.status,
+        "diff": task.analysis.difficulty_score if task.analysis else 5,
+        "subtasks": [serialize_subtask(s) for s in task.subtasks],
+        # last_started_at is kept after a pause; it only runs while active
+        "start": (
+            task.last_started_at.isoformat()
+            if task.status == "active" and task.last_started_at
+            else None
+        ),
+        "accumulated": task.time_spent or 0,
+        "breakdown": task.breakdown_status or "done",
+    }
+
+
+def serialize_session(s):
+    return {
+        "task_id": s.task_id,
+        "started_at": s.started_at.isoformat(),
+        "ended_at": s.ended_at.isoformat(),
+        "seconds": int((s.ended_at - s.started_at).total_seconds()),
+    }
+
+
+def load_active_task(user_id):
+    return (
+        models.Task.query.options(*TASK_LOAD_OPTIONS)
+        .filter_by(user_id=user_id, status="active")
+        .first()
+    )
+
+
+def load_user_task_or_404(task_id, user_id):
+    return (
+        models.Task.query.options(*TASK_LOAD_OPTIONS)
+        .filter_by(id=task_id, user_id=user_id)
+        .first_or_404()
+    )
+
+
+# --- KEYSET PAGINATION ---
+# Pages are ordered by (priority_score DESC, id DESC). The cursor is the
+# (priority, id) of the last row sent, so fetching page N costs the same
+# as page 1 (no OFFSET scan over the user's whole history).
+
+OPEN_STATUSES = ("pending", "active", "paused")
+TASK_STATUSES = OPEN_STATUSES + ("completed",)
+
+
+def encode_cursor(task):
+    return f"{task.priority_score or 0!r}:{task.id}"
+
+
+def decode_cursor(cursor):
+    """Returns (priority, id) or raises ValueError on a malformed cursor."""
+    priority, _, task_id = cursor.rpartition(":")
+    return float(priority), int(task_id)
+
+
+def load_task_page(user_id, statuses=OPEN_STATUSES, limit=24, after=None):
+    """
+    Returns (tasks, next_cursor). next_cursor is None on the last page.
+    `after` is a decoded cursor (priority, id).
+    """
+    query = models.Task.query.options(*TASK_LOAD_OPTIONS).filter(
+        models.Task.user_id == user_id, models.Task.status.in_(statuses)
+    )
+    if after is not None:
+        # Row-value comparison: one range seek on ix_tasks_user_priority
+        query = query.filter(tuple_(models.Task.priority_score, models.Task.id) < after)
+
+    # One extra row tells us whether another page exists
+    rows = (
+        query.order_by(models.Task.priority_score.desc(), models.Task.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
@@ -0,0 +1,218 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import case, cast, extract, func, literal
+
+from extensions import db
+import models
+from services.page_cache import bump_data_version
+from services.session_log import session_log
+
+# --- XP RULES ---
+# 10 XP per focused minute, scaled by priority (max 2x), +50 for finishing.
+XP_PER_MINUTE = 10
+XP_COMPLETION_BONUS = 50
+XP_PER_LEVEL = 1000
+
+
+class TransitionError(Exception):
+    """The task isn't the caller's, or can't make this transition."""
+
+    def __init__(self, message, status_code=404):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _utcnow():
+    # Stored timestamps are naive UTC wall-clock on both SQLite and Postgres
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _truncate(expr):
+    """int() semantics (toward zero) for non-negative floats, per dialect."""
+    if db.engine.dialect.name == "postgresql":
+        # CAST alone rounds on Postgres
+        return cast(func.floor(expr), db.Integer)
+    return cast(expr, db.Integer)
+
+
+def _elapsed_seconds(now):
+    """Whole seconds between Task.last_started_at and `now`, computed in SQL."""
+    dialect = db.engine.dialect.name
+    now = literal(now, db.DateTime)
+    if dialect == "sqlite":
+        # julianday() is a double: round to the millisecond before truncating
+        # so exactly-N-second intervals don't come out as N-1
+        seconds = func.round(
+            (func.julianday(now) - func.julianday(models.Task.last_started_at)) * 86400.0,
+            3,
+        )
+    elif dialect == "postgresql":
+        seconds = extract("epoch", now - models.Task.last_started_at)
+    else:
+        # Rejected at startup (extensions.check_dialect)
+        raise NotImplementedError(f"task transitions not supported on {dialect}")
+    return _truncate(seconds)
+
+
+def _banked_time(now):
+    """time_spent plus the running interval, if the task is active."""
+    return func.coalesce(models.Task.time_spent, 0) + case(
+        (
+            (models.Task.status == "active")
+            & models.Task.last_started_at.isnot(None),
+            _elapsed_seconds(now),
+        ),
+        else_=0,
+    )
+
+
+def _update_tasks(*where, **values):
+    return (
+        db.update(models.Task)
+        .where(*where)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _stop_running(where, returning, **values):
+    """
+    Runs the UPDATE against the task only while it is running, so RETURNING
+    can hand back the interval start (last_started_at is left in place: it
+    only counts while status == "active"). If the task wasn't running, a
+    second UPDATE applies the same values without logging anything.
+    Returns (row, started_at or None).
+    """
+    row = db.session.execute(
+        _update_tasks(
+            *where,
+            models.Task.status == "active",
+            models.Task.last_started_at.isnot(None),
+            **values,
+        ).returning(*returning, models.Task.last_started_at)
+    ).first()
+    if row is not None:
+        return row, row.last_started_at
+
+    row = db.session.execute(
+        _update_tasks(*where, models.Task.status != "completed", **values).returning(
+            *returning
+        )
+    ).first()
+    return row, None
+
+
+def start_task(user_id, task_id, now=None):
+    """
+    Pauses the user's other active task(s), banking their time, and starts
+    this one. Returns the ids of the tasks that were paused.
+    """
+    now = now or _utcnow()
+    paused = db.session.execute(
+        _update_tasks(
+            models.Task.user_id == user_id,
+            models.Task.id != task_id,
+            models.Task.status == "active",
+            time_spent=_banked_time(now),
+            status="paused",
+        ).returning(models.Task.id, models.Task.last_started_at)
+    ).all()
+
+    started = db.session.execute(
+        _update_tasks(
+            models.Task.id == task_id,
+            models.Task.user_id == user_id,
+            # Restarting an already-running task must not drop its interval
+            last_started_at=case(
+                (
+                    (models.Task.status == "active")
+                    & models.Task.last_started_at.isnot(None),
+                    models.Task.last_started_at,
+                ),
+                else_=literal(now, db.DateTime),
+            ),
+            status="active",
+        ).returning(models.Task.id)
+    ).first()
+
+    if started is None:
+        db.session.rollback()
+        raise TransitionError("Task not found")
+    bump_data_version(user_id)
+    db.session.commit()
+
+    for paused_id, started_at in paused:
+        session_log.record(user_id, paused_id, started_at, now)
+    return [paused_id for paused_id, _ in paused]
+
+
+def pause_task(user_id, task_id, now=None):
+    """Banks the running interval and pauses. Returns the new time_spent."""
+    now = now or _utcnow()
+    row, started_at = _stop_running(
+        (models.Task.id == task_id, models.Task.user_id == user_id),
+        (models.Task.time_spent,),
+        time_spent=_banked_time(now),
+        status="paused",
+    )
+
+    if row is None:
+        db.session.rollback()
+        raise TransitionError("Task not found or already completed")
+    bump_data_version(user_id)
+    db.session.commit()
+    session_log.record(user_id, task_id, started_at, now)
+    return row.time_spent
+
+
+def complete_task(user_id, task_id, now=None):
+    """
+    Banks the running interval, completes the task and awards XP: one UPDATE
+    on the task row (XP computed in SQL from the final time), then an atomic
+    increment on the user's total. A second concurrent completion matches
+    no row and awards nothing.
+    """
+    now = now or _utcnow()
+    banked = _banked_time(now)
+    multiplier = 1 + func.coalesce(models.Task.priority_score, 0) / 100.0
+    xp = (
+        _truncate((banked / 60.0 * XP_PER_MINUTE) * multiplier) + XP_COMPLETION_BONUS
+    )
+
+    task_row, started_at = _stop_running(
+        (models.Task.id == task_id, models.Task.user_id == user_id),
+        (models.Task.xp_earned, models.Task.time_spent),
+        time_spent=banked,
+        xp_earned=xp,
+        status="completed",
+        completed_at=literal(now, db.DateTime),
+    )
+
+    if task_row is None:
+        db.session.rollback()
+        raise TransitionError("Task not found or already completed", 409)
+
+    new_total = func.coalesce(models.User.total_xp, 0) + task_row.xp_earned
+    user_row = db.session.execute(
+        db.update(models.User)
+        .where(models.User.id == user_id)
+        .values(
+            total_xp=new_total,
+            level=1 + new_total // XP_PER_LEVEL,
+            data_version=models.User.data_version + 1,
+        )
+        .returning(models.User.total_xp, models.User.level)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.session.commit()
+    session_log.record(user_id, task_id, started_at, now)
+    session_log.record_completion(user_id, now, task_row.xp_earned)
+
+    old_level = 1 + (user_row.total_xp - task_row.xp_earned) // XP_PER_LEVEL
+    return {
+        "xp_gained": task_row.xp_earned,
+        "time_spent": task_row.time_spent,
+        "total_xp": user_row.total_xp,
+        "new_level": user_row.level,
+        "leveled_up": user_row.level > old_level,
+    }
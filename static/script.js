@@ -20,15 +20,134 @@ document.addEventListener('DOMContentLoaded', () => {
     if (document.getElementById('octopus-arms-container')) {
         initMap();
         initSliders();
+        initTaskForm();
+        initLiveUpdates();
     }
 
     // Only run Focus logic if the stage exists
     if (document.getElementById('active-task-stage')) {
         initFocusMode();
         initIdleDetector();
+        initLiveUpdates();
     }
 });
 
+// Create tasks without a full page reload; the new task comes back in the
+// response (and as a live event to any other open tab).
+function initTaskForm() {
+    const form = document.querySelector('.mission-control-panel form');
+    if (!form) return;
+
+    form.addEventListener('submit', async e => {
+        e.preventDefault();
+        const title = form.task_title.value.trim();
+        if (!title) return;
+
+        try {
+            const res = await fetch('/api/tasks', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    task_title: title,
+                    urgency: form.urgency.value,
+                    fear: form.fear.value,
+                    interest: form.interest.value
+                })
+            });
+            if (!res.ok) throw new Error(`HTTP ${res.status}`);
+            applyTaskToMap(await res.json());
+            form.task_title.value = '';
+        } catch (err) {
+            console.error('Task create error', err);
+            form.submit(); // plain POST fallback
+        }
+    });
+}
+
+/* =========================================
+   LIVE UPDATES (other tabs / devices)
+   ========================================= */
+
+// One EventSource per page: the server pushes every change to this user's
+// tasks, and each view patches itself in place instead of reloading.
+function initLiveUpdates() {
+    if (!window.EventSource) return;
+    const source = new EventSource('/api/events');
+
+    const onTask = e => {
+        const task = JSON.parse(e.data);
+        if (isMapMode) applyTaskToMap(task);
+        if (isFocusMode && task.id === CURRENT_TASK.id) applyTaskToFocus(task);
+    };
+    source.addEventListener('task', onTask);
+    source.addEventListener('timer', onTask);
+
+    source.addEventListener('subtask', e => {
+        const { task_id, subtask } = JSON.parse(e.data);
+        const tasks = isMapMode ? SERVER_TASKS : [CURRENT_TASK];
+        const task = tasks.find(t => t.id === task_id);
+        if (!task) return;
+        task.subtasks = (task.subtasks || []).map(s => s.id === subtask.id ? subtask : s);
+        if (isFocusMode && task_id === CURRENT_TASK.id) renderChecklist(CURRENT_TASK.subtasks);
+    });
+
+    // We fell too far behind: the page state can't be patched, start over
+    source.addEventListener('resync', () => window.location.reload());
+
+    // Refused (the server is at its stream limit) or closed for good:
+    // poll the task list instead
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) pollLiveUpdates(onTask);
+    };
+}
+
+async function pollLiveUpdates(onTask, seen = {}) {
+    const LIVE_POLL_MS = 15000;
+    try {
+        const res = await fetch('/api/tasks?status=pending,active,paused,completed&limit=100');
+        const { tasks } = await res.json();
+        tasks.forEach(task => {
+            const json = JSON.stringify(task);
+            // First poll only records what the page was rendered with
+            if (seen[task.id] !== undefined && seen[task.id] !== json) onTask({ data: json });
+            seen[task.id] = json;
+        });
+    } catch (e) {
+        console.log("Live update poll failed:", e);
+    }
+    setTimeout(() => pollLiveUpdates(onTask, seen), LIVE_POLL_MS);
+}
+
+function applyTaskToMap(task) {
+    const i = SERVER_TASKS.findIndex(t => t.id === task.id);
+    if (i >= 0) SERVER_TASKS[i] = task;
+    else SERVER_TASKS.push(task);
+    renderMap();
+}
+
+function applyTaskToFocus(task) {
+    const wasActive = CURRENT_TASK.status === 'active';
+    Object.assign(CURRENT_TASK, task);
+    renderChecklist(CURRENT_TASK.subtasks || []);
+
+    if (task.status === 'completed') {
+        clearInterval(currentFocusInterval);
+        showCompletedState();
+        return;
+    }
+
+    const btn = document.getElementById('focus-toggle-btn');
+    if (task.status === 'active' && !wasActive) {
+        if (btn) btn.textContent = 'PAUSE';
+        startFocusTimer(CURRENT_TASK);
+    } else if (task.status !== 'active' && wasActive) {
+        // Paused elsewhere (or another task was started)
+        if (btn) btn.textContent = 'RESUME';
+        clearInterval(currentFocusInterval);
+        renderTimer(CURRENT_TASK.accumulated || 0);
+    }
+}
+
 /* =========================================
    PART A: MAP MODE LOGIC (temp.html)
    ========================================= */
@@ -36,8 +155,14 @@ document.addEventListener('DOMContentLoaded', () => {
 function initMap() {
     if (!isMapMode) return;
 
+    renderMap();
+    initReservePaging();
+}
+
+function renderMap() {
     const armContainer = document.getElementById('octopus-arms-container');
     const reserveList = document.getElementById('reserve-list');
+    armContainer.innerHTML = '';
 
     // 1. Sort & Filter Tasks
     // Sort logic: Active first, then by priority
@@ -78,23 +203,71 @@ function initMap() {
     // 3. Render Reserve
     if (reserveList) {
         reserveList.innerHTML = ''; // Clear existing content
-        reserve.forEach(task => {
-            const li = document.createElement('li');
-            li.innerHTML = `<span>${task.title}</span> <span class="status-tag">${task.status}</span>`;
+        reserve.forEach(appendReserveItem);
+    }
+}
 
-            // FIX: Make reserve items clickable
-            li.style.cursor = 'pointer';
-            li.onclick = () => window.location.href = `/focus/${task.id}`;
+function appendReserveItem(task) {
+    const reserveList = document.getElementById('reserve-list');
+    const li = document.createElement('li');
+    li.innerHTML = `<span>${task.title}</span> <span class="status-tag">${task.status}</span>`;
 
-            // Hover effect logic handled in CSS usually, but added inline for safety
-            li.onmouseover = () => li.style.color = '#fff';
-            li.onmouseout = () => li.style.color = '#aaa';
+    // FIX: Make reserve items clickable
+    li.style.cursor = 'pointer';
+    li.onclick = () => window.location.href = `/focus/${task.id}`;
 
-            reserveList.appendChild(li);
-        });
-    }
+    // Hover effect logic handled in CSS usually, but added inline for safety
+    li.onmouseover = () => li.style.color = '#fff';
+    li.onmouseout = () => li.style.color = '#aaa';
+
+    reserveList.appendChild(li);
 }
 
+// The server only renders the first page of open tasks. The rest (then
+// completed tasks) are pulled from /api/tasks as the reserve tank scrolls.
+function initReservePaging() {
+    const tank = document.querySelector('.reserve-tank');
+    if (!tank) return;
+
+    const phases = ['pending,active,paused', 'completed'];
+    let phase = 0;
+    let cursor = typeof NEXT_CURSOR !== 'undefined' ? NEXT_CURSOR : null;
+    let loading = false;
+    if (!cursor) phase = 1; // first page already held every open task
+
+    async function loadMore() {
+        if (loading || phase >= phases.length) return;
+        loading = true;
+        try {
+            const params = new URLSearchParams({ status: phases[phase] });
+            if (cursor) params.set('after', cursor);
+            const res = await fetch(`/api/tasks?${params}`);
+            if (!res.ok) return;
+            const data = await res.json();
+
+            data.tasks.forEach(task => {
+                if (!SERVER_TASKS.some(t => t.id === task.id)) {
+                    SERVER_TASKS.push(task);
+                    appendReserveItem(task);
+                }
+            });
+            cursor = data.next_cursor;
+            if (!cursor) phase++;
+        } catch (e) {
+            console.error('Task paging error', e);
+            return;
+        } finally {
+            loading = false;
+        }
+        // Keep going until the tank can actually scroll
+        if (tank.scrollHeight <= tank.clientHeight) loadMore();
+    }
+
+    tank.addEventListener('scroll', () => {
+        if (tank.scrollTop + tank.clientHeight >= tank.scrollHeight - 40) loadMore();
+    });
+    if (tank.scrollHeight <= tank.clientHeight) loadMore();
+}
 
 function enterDeepDive() {
     if (!isMapMode) return;
@@ -235,27 +408,7 @@ function initFocusMode() {
 
     // --- FIX: Logic for COMPLETED vs ACTIVE tasks ---
     if (CURRENT_TASK.status === 'completed') {
-        // 1. Show static final time (greyed out)
-        const total = CURRENT_TASK.accumulated || 0;
-        const m = Math.floor(total / 60).toString().padStart(2, '0');
-        const s = (total % 60).toString().padStart(2, '0');
-
-        const display = document.getElementById('focus-timer');
-        if (display) {
-            display.textContent = `${m}:${s}`;
-            display.style.color = '#555'; // Dimmed color
-            display.style.textShadow = 'none';
-        }
-
-        // 2. Hide control buttons (Pause / Complete)
-        const controls = document.querySelector('.focus-controls');
-        if (controls) controls.style.display = 'none';
-
-        // 3. Mark title as complete
-        if (titleEl) {
-            titleEl.innerHTML += ' <span style="font-size:0.5em; color:var(--neon-green)">[COMPLETED]</span>';
-        }
-
+        showCompletedState();
     } else {
         // --- NORMAL FLOW for Active/Pending ---
         startFocusTimer(CURRENT_TASK);
@@ -267,6 +420,71 @@ function initFocusMode() {
     }
 
     renderChecklist(CURRENT_TASK.subtasks || []);
+
+    // AI breakdown not ready yet? Stream the steps in (or poll as a fallback).
+    if (CURRENT_TASK.breakdown === 'pending' || CURRENT_TASK.breakdown === 'running') {
+        if (window.EventSource) {
+            streamBreakdown(CURRENT_TASK.id);
+        } else {
+            pollBreakdown(CURRENT_TASK.id);
+        }
+    }
+}
+
+function streamBreakdown(taskId) {
+    const source = new EventSource(`/api/tasks/${taskId}/breakdown/stream`);
+    CURRENT_TASK.subtasks = CURRENT_TASK.subtasks || [];
+
+    // Each step shows up the moment the server has parsed and saved it
+    source.addEventListener('subtask', (e) => {
+        CURRENT_TASK.subtasks.push(JSON.parse(e.data));
+        renderChecklist(CURRENT_TASK.subtasks);
+    });
+
+    source.addEventListener('done', (e) => {
+        source.close();
+        const data = JSON.parse(e.data);
+        CURRENT_TASK.breakdown = data.status;
+        if (data.difficulty) CURRENT_TASK.diff = data.difficulty;
+        // The AI failed mid-way: the server dropped the partial steps
+        if (data.status === 'failed') {
+            CURRENT_TASK.subtasks = [];
+            renderChecklist(CURRENT_TASK.subtasks);
+        }
+    });
+
+    // Already being generated elsewhere (background job / another tab)
+    source.addEventListener('status', () => {
+        source.close();
+        pollBreakdown(taskId);
+    });
+
+    source.onerror = () => {
+        source.close();
+        pollBreakdown(taskId);
+    };
+}
+
+async function pollBreakdown(taskId, attempt = 0) {
+    const MAX_ATTEMPTS = 40; // ~1 minute at 1.5s
+    if (attempt >= MAX_ATTEMPTS) return;
+
+    try {
+        const res = await fetch(`/api/tasks/${taskId}/breakdown`);
+        const data = await res.json();
+
+        if (data.status === 'done' || data.status === 'failed') {
+            CURRENT_TASK.subtasks = data.subtasks;
+            CURRENT_TASK.diff = data.difficulty;
+            CURRENT_TASK.breakdown = data.status;
+            renderChecklist(data.subtasks);
+            return;
+        }
+    } catch (e) {
+        console.log("Breakdown poll failed:", e);
+    }
+
+    setTimeout(() => pollBreakdown(taskId, attempt + 1), 1500);
 }
 
 function renderChecklist(subtasks) {
@@ -303,6 +521,35 @@ async function toggleSubtask(rowEl, subId) {
     }
 }
 
+function showCompletedState() {
+    // 1. Show static final time (greyed out)
+    renderTimer(CURRENT_TASK.accumulated || 0);
+    const display = document.getElementById('focus-timer');
+    if (display) {
+        display.style.color = '#555'; // Dimmed color
+        display.style.textShadow = 'none';
+    }
+
+    // 2. Hide control buttons (Pause / Complete)
+    const controls = document.querySelector('.focus-controls');
+    if (controls) controls.style.display = 'none';
+
+    // 3. Mark title as complete (once, live updates may call this again)
+    const titleEl = document.getElementById('focus-title');
+    if (titleEl && !titleEl.dataset.completed) {
+        titleEl.dataset.completed = '1';
+        titleEl.innerHTML += ' <span style="font-size:0.5em; color:var(--neon-green)">[COMPLETED]</span>';
+    }
+}
+
+function renderTimer(total) {
+    const display = document.getElementById('focus-timer');
+    if (!display) return;
+    const m = Math.floor(total / 60).toString().padStart(2, '0');
+    const s = (total % 60).toString().padStart(2, '0');
+    display.textContent = `${m}:${s}`;
+}
+
 function startFocusTimer(task) {
     if (currentFocusInterval) clearInterval(currentFocusInterval);
 
@@ -315,11 +562,7 @@ function startFocusTimer(task) {
     currentFocusInterval = setInterval(() => {
         const now = new Date();
         const delta = Math.floor((now - startTime) / 1000);
-        const total = accumulated + delta;
-
-        const m = Math.floor(total / 60).toString().padStart(2, '0');
-        const s = (total % 60).toString().padStart(2, '0');
-        display.textContent = `${m}:${s}`;
+        renderTimer(accumulated + delta);
     }, 1000);
 }
 
@@ -334,6 +577,7 @@ async function toggleFocusState() {
 
         btn.textContent = 'RESUME';
         clearInterval(currentFocusInterval);
+        CURRENT_TASK.status = 'paused';
 
         // Save state so we don't lose time if we resume later without reload
         if (data.time_spent) {
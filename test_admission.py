@@ -0,0 +1,217 @@
+"""
+NLP admission control: bounded queue, deadline shedding, 429 / degraded answers.
+Run: python -m pytest test_admission.py
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app import app
+from services.admission import AdmissionController, Overloaded
+from services.nlp_services import VectorScorer, nlp_engine
+
+
+def hold_slot(controller, titles=1):
+    """Occupies one slot from another thread until the returned event is set."""
+    entered, release = threading.Event(), threading.Event()
+
+    def run():
+        with controller.slot(titles=titles):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert entered.wait(5)
+    return release, thread
+
+
+def test_queue_full_is_shed_immediately():
+    controller = AdmissionController(concurrency=1, max_queue=1, deadline_ms=2000)
+    release, holder = hold_slot(controller)
+
+    def wait_in_queue():
+        with controller.slot():
+            pass
+
+    queued = threading.Thread(target=wait_in_queue, daemon=True)
+    queued.start()
+    while controller.stats()["queued"] < 1:
+        time.sleep(0.001)
+
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as shed:
+        with controller.slot():
+            pass
+    assert time.monotonic() - started < 0.1
+    assert shed.value.reason == "queue_full" and shed.value.retry_after >= 1
+    release.set()
+    holder.join()
+    queued.join()
+
+
+def test_waiters_are_shed_at_their_deadline():
+    controller = AdmissionController(concurrency=1, max_queue=4, deadline_ms=50)
+    release, holder = hold_slot(controller)
+
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as shed:
+        with controller.slot():
+            pass
+    assert 0.04 < time.monotonic() - started < 1
+    assert shed.value.reason == "deadline"
+    release.set()
+    holder.join()
+
+    # The slot is free again and the queue is empty
+    with controller.slot():
+        pass
+    stats = controller.stats()
+    assert (stats["running"], stats["queued"]) == (0, 0)
+    assert stats["shed"]["deadline"] == 1 and stats["admitted"] == 2
+
+
+def test_known_slow_calls_are_shed_without_waiting():
+    controller = AdmissionController(concurrency=1, max_queue=4, deadline_ms=100)
+    controller.title_ms = 5.0
+    release, holder = hold_slot(controller, titles=100)
+
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as shed:
+        with controller.slot():
+            pass
+    assert time.monotonic() - started < 0.05
+    assert shed.value.reason == "predicted_wait"
+    release.set()
+    holder.join()
+
+
+def test_a_batch_is_weighed_by_its_titles():
+    controller = AdmissionController(concurrency=1, max_queue=8, deadline_ms=300)
+    # One bulk call: slower than the deadline, but ~0.4ms per title
+    with controller.slot(titles=1000):
+        time.sleep(0.4)
+    assert controller.stats()["title_ms"] < 1
+
+    # Single-title predicts queued behind another one are still admitted
+    release, holder = hold_slot(controller)
+    admitted = []
+
+    def predict():
+        with controller.slot():
+            admitted.append(True)
+
+    singles = [threading.Thread(target=predict, daemon=True) for _ in range(3)]
+    for t in singles:
+        t.start()
+    while controller.stats()["queued"] < 3:
+        time.sleep(0.001)
+    release.set()
+    holder.join()
+    for t in singles:
+        t.join()
+    assert len(admitted) == 3
+    assert sum(controller.stats()["shed"].values()) == 0
+
+    # ...while a single behind a running batch is shed: it would wait it out
+    controller.title_ms = 1.0
+    release, holder = hold_slot(controller, titles=1000)
+    assert controller.stats()["running_titles"] == 1000
+    with pytest.raises(Overloaded) as shed:
+        with controller.slot():
+            pass
+    assert shed.value.reason == "predicted_wait" and shed.value.retry_after == 2
+    release.set()
+    holder.join()
+
+
+def test_concurrency_limit_holds_under_load():
+    controller = AdmissionController(concurrency=2, max_queue=64, deadline_ms=5000)
+    peak, lock, running = [0], threading.Lock(), [0]
+
+    def call():
+        with controller.slot():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.005)
+            with lock:
+                running[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+    assert controller.stats()["admitted"] == 20
+
+
+@pytest.fixture
+def ready_engine(monkeypatch):
+    # A model that just returns random unit vectors: only the slot matters here
+    class Model:
+        def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+            vectors = np.random.default_rng(0).normal(size=(len(texts), 8))
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    names = list(VectorScorer.RAW_ANCHORS)
+    matrix = Model().encode(names)
+    monkeypatch.setattr(nlp_engine, "model", Model())
+    monkeypatch.setattr(nlp_engine, "anchor_matrix", matrix, raising=False)
+    monkeypatch.setattr(
+        nlp_engine, "anchor_index", {k: i for i, k in enumerate(names)}, raising=False
+    )
+    monkeypatch.setattr(VectorScorer, "is_ready", property(lambda self: True))
+    # Always a cache miss, and nothing written to the real cache
+    monkeypatch.setattr(nlp_engine.cache, "get", lambda text: None)
+    monkeypatch.setattr(nlp_engine.cache, "put", lambda text, vec: None)
+
+
+@pytest.fixture
+def client():
+    # /api/predict only needs a logged-in session
+    test_client = app.test_client()
+    with test_client.session_transaction() as s:
+        s["user_id"] = 1
+    return test_client
+
+
+@pytest.mark.parametrize("mode", ["degrade", "reject"])
+def test_predict_sheds_when_busy(ready_engine, client, monkeypatch, mode):
+    controller = AdmissionController(
+        concurrency=1, max_queue=0, deadline_ms=1000, shed_mode=mode
+    )
+    monkeypatch.setattr("app.nlp_admission", controller)
+
+    ok = client.post("/api/predict", json={"title": "Write the report"})
+    assert ok.status_code == 200 and "shed" not in ok.get_json()
+
+    release, holder = hold_slot(controller)
+    busy = client.post("/api/predict", json={"title": "Write the report"})
+    if mode == "degrade":
+        assert busy.status_code == 200
+        assert busy.get_json()["shed"] and busy.get_json()["degraded"]
+    else:
+        assert busy.status_code == 429
+        assert int(busy.headers["Retry-After"]) >= 1
+    assert controller.stats()["shed"]["queue_full"] == 1
+    release.set()
+    holder.join()
+
+
+def test_encode_takes_one_slot_sized_by_its_misses(ready_engine, monkeypatch):
+    controller = AdmissionController(concurrency=1, max_queue=0, deadline_ms=1000)
+    model, seen = nlp_engine.model, []
+
+    class Model:
+        def encode(self, texts, **kwargs):
+            seen.append((len(texts), controller.stats()["running_titles"]))
+            return model.encode(texts, **kwargs)
+
+    monkeypatch.setattr(nlp_engine, "model", Model())
+    nlp_engine.encode([f"Task {i}" for i in range(50)] + ["Task 0"], controller)
+    assert seen == [(50, 50)]  # duplicates are encoded once
+    assert controller.stats()["admitted"] == 1
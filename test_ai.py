@@ -1,5 +1,8 @@
+from services.nlp_services import nlp_engine
 from services.scoring_service import predict_task_metrics
 
+nlp_engine.load()
+
 test_tasks = [
     # High urgency + fear
     "Finish my final year thesis dissertation",
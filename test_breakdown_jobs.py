@@ -0,0 +1,205 @@
+"""
+AI breakdown pipeline: claiming, orphaned-job recovery, the LLM provider,
+streaming (mid-stream failures, disconnects).
+Run: python -m pytest test_breakdown_jobs.py
+Uses the fake LLM provider (LLM_PROVIDER=fake, see conftest.py).
+"""
+import json
+import time
+from datetime import timedelta
+
+import ai_service
+from app import app
+from extensions import db
+import models
+from services import breakdown_jobs
+from services.breakdown_jobs import BreakdownPipeline, breakdown_pipeline
+from services.llm_client import FakeLLMProvider, LLMClient
+from services.task_factory import create_task
+
+_users = iter(range(10**6))
+
+
+def setup_module():
+    with app.app_context():
+        db.create_all()
+
+
+def make_task(title="Write the quarterly report", **fields):
+    with app.app_context():
+        user = models.User(username=f"breakdown_{next(_users)}")
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.commit()
+        task_id = create_task(
+            user.id, title=title, priority_score=5.0, urgency=5, fear=4, interest=5
+        )
+        if fields:
+            models.Task.query.filter_by(id=task_id).update(fields)
+            db.session.commit()
+        return user.id, task_id
+
+
+def task_state(task_id):
+    with app.app_context():
+        task = db.session.get(models.Task, task_id)
+        return task.breakdown_status, [s.title for s in task.subtasks]
+
+
+def logged_in_client(user_id):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = user_id
+    return client
+
+
+def wait_for(task_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if task_state(task_id)[0] == status:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def counting_pipeline():
+    calls = []
+
+    def provider(title):
+        calls.append(title)
+        return {"breakdown": ["First", "Second"], "difficulty": 6}
+
+    pipeline = BreakdownPipeline(provider=provider)
+    pipeline.init_app(app)
+    return pipeline, calls
+
+
+def test_a_task_is_broken_down_once():
+    user_id, task_id = make_task()
+    pipeline, calls = counting_pipeline()
+
+    assert pipeline._run(task_id, "Write the quarterly report", user_id) == "done"
+    # A resubmission (another worker, a poll) finds nothing left to claim
+    assert pipeline._run(task_id, "Write the quarterly report", user_id) is None
+    assert len(calls) == 1
+    assert task_state(task_id) == ("done", ["First", "Second"])
+    with app.app_context():
+        assert db.session.get(models.Task, task_id).analysis.difficulty_score == 6
+
+
+def test_orphaned_running_job_is_reclaimed():
+    # The worker that claimed it died: still "running" long after the timeout
+    claimed_at = breakdown_jobs._utcnow() - timedelta(hours=1)
+    user_id, task_id = make_task(
+        breakdown_status="running", breakdown_claimed_at=claimed_at
+    )
+
+    data = logged_in_client(user_id).get(f"/api/tasks/{task_id}/breakdown").get_json()
+    assert data["status"] == "running"
+    assert wait_for(task_id, "done")
+    # Through ai_service and the shared LLM client, like production
+    expected = json.loads(FakeLLMProvider.DEFAULT_RESPONSE)["breakdown"]
+    assert task_state(task_id)[1] == expected
+
+
+def test_live_running_job_is_left_alone():
+    pipeline, calls = counting_pipeline()
+    user_id, task_id = make_task(
+        breakdown_status="running", breakdown_claimed_at=breakdown_jobs._utcnow()
+    )
+
+    assert pipeline._run(task_id, "Write the quarterly report", user_id) is None
+    assert calls == []
+    with app.app_context():
+        assert not breakdown_pipeline.is_claimable(db.session.get(models.Task, task_id))
+
+
+def test_jobs_claimed_before_the_timestamp_existed_are_recoverable():
+    pipeline, calls = counting_pipeline()
+    user_id, task_id = make_task(breakdown_status="running")
+
+    assert pipeline._run(task_id, "Write the quarterly report", user_id) == "done"
+    assert len(calls) == 1
+
+
+def test_malformed_provider_output_fails_the_task():
+    # A bad JSON parse can hand back None or a bare list instead of a dict
+    for output in (None, ["First", "Second"]):
+        user_id, task_id = make_task()
+        pipeline = BreakdownPipeline(provider=lambda title: output)
+        pipeline.init_app(app)
+
+        assert pipeline._run(task_id, "Write the quarterly report", user_id) == "failed"
+        assert task_state(task_id) == ("failed", [])
+        assert pipeline.stats()["failed"] == 1
+
+
+# --- STREAMING MODE ---
+
+
+def streaming_pipeline(monkeypatch, **fake):
+    # Through ai_service.stream_breakdown and a client on the fake provider
+    monkeypatch.setattr(ai_service, "_client", LLMClient(FakeLLMProvider(**fake)))
+    pipeline = BreakdownPipeline()
+    pipeline.init_app(app)
+    return pipeline
+
+
+def test_stream_saves_steps_as_they_arrive(monkeypatch):
+    pipeline = streaming_pipeline(monkeypatch)
+    user_id, task_id = make_task()
+
+    with app.app_context():
+        events = list(pipeline.stream_events(task_id, "Write the report", user_id))
+
+    expected = json.loads(FakeLLMProvider.DEFAULT_RESPONSE)["breakdown"]
+    assert [data["title"] for kind, data in events if kind == "subtask"] == expected
+    assert events[-1] == ("done", {"status": "done", "difficulty": 4})
+    assert task_state(task_id) == ("done", expected)
+    with app.app_context():
+        assert db.session.get(models.Task, task_id).breakdown_difficulty == 4
+
+
+def test_stream_failure_ends_failed_and_is_retried(monkeypatch):
+    # Dies after the first STEP line made it through
+    pipeline = streaming_pipeline(monkeypatch, fail_after_chunks=6)
+    user_id, task_id = make_task()
+
+    with app.app_context():
+        events = list(pipeline.stream_events(task_id, "Write the report", user_id))
+
+    assert [kind for kind, _ in events] == ["subtask", "done"]
+    assert events[-1][1]["status"] == "failed"
+    assert task_state(task_id) == ("failed", [])  # the partial step is dropped
+
+    with app.app_context():
+        task = db.session.get(models.Task, task_id)
+        assert not pipeline.is_claimable(task)
+        later = breakdown_jobs._utcnow() + pipeline.claim_timeout * 2
+        assert pipeline.is_claimable(task, now=later)
+
+    # Due for a retry: the poll endpoint queues it again
+    claimed_at = breakdown_jobs._utcnow() - timedelta(hours=1)
+    with app.app_context():
+        models.Task.query.filter_by(id=task_id).update(
+            {"breakdown_claimed_at": claimed_at}
+        )
+        db.session.commit()
+    data = logged_in_client(user_id).get(f"/api/tasks/{task_id}/breakdown").get_json()
+    assert data["status"] == "pending"
+    assert wait_for(task_id, "done")
+
+
+def test_disconnect_hands_the_rest_of_the_stream_to_the_pool(monkeypatch):
+    pipeline = streaming_pipeline(monkeypatch, chunk_delay=0.05)
+    user_id, task_id = make_task()
+
+    with app.app_context():
+        events = pipeline.stream_events(task_id, "Write the report", user_id)
+        assert next(events)[0] == "subtask"
+        started = time.monotonic()
+        events.close()  # the browser went away
+        assert time.monotonic() - started < 0.1
+
+    assert wait_for(task_id, "done")
+    assert len(task_state(task_id)[1]) == 3
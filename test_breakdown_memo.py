@@ -0,0 +1,129 @@
+"""
+Breakdown memo: near-duplicate reuse, the similarity threshold, per-user
+scoping and the bounded index cache.
+Run: python -m pytest test_breakdown_memo.py
+"""
+import numpy as np
+import pytest
+
+from app import app
+from extensions import db
+import models
+from services.breakdown_memo import BreakdownMemo
+from services.nlp_services import VectorScorer, nlp_engine
+from services.task_factory import create_task
+
+_users = iter(range(10**6))
+
+
+def setup_module():
+    with app.app_context():
+        db.create_all()
+
+
+def bag_of_words(texts, admission=None):
+    # Deterministic "embedding": shared words -> similar vectors
+    vectors = np.zeros((len(texts), 64), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, sum(map(ord, word)) % 64] += 1.0
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(autouse=True)
+def ready_engine(monkeypatch):
+    monkeypatch.setattr(VectorScorer, "is_ready", property(lambda self: True))
+    monkeypatch.setattr(nlp_engine, "encode", bag_of_words)
+
+
+def make_user():
+    with app.app_context():
+        user = models.User(username=f"memo_{next(_users)}")
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def broken_down(user_id, title, steps, difficulty=None, status="done"):
+    """A task whose AI breakdown finished (or not) with these steps."""
+    with app.app_context():
+        task_id = create_task(
+            user_id, title=title, priority_score=5.0, urgency=5, fear=9, interest=5
+        )
+        models.Task.query.filter_by(id=task_id).update(
+            {"breakdown_status": status, "breakdown_difficulty": difficulty}
+        )
+        for index, step in enumerate(steps):
+            db.session.add(
+                models.Subtask(
+                    task_id=task_id,
+                    title=step,
+                    order_index=index,
+                    status="pending",
+                    created_by="gemini",
+                )
+            )
+        db.session.commit()
+        return task_id
+
+
+def lookup(memo, user_id, title):
+    with app.app_context():
+        return memo.lookup(user_id, title)
+
+
+def test_near_duplicate_reuses_the_breakdown():
+    user_id = make_user()
+    broken_down(user_id, "Do the laundry", ["Sort", "Wash", "Dry"], difficulty=3)
+    memo = BreakdownMemo(threshold=0.8)
+
+    hit = lookup(memo, user_id, "do the laundry")
+    assert hit["breakdown"] == ["Sort", "Wash", "Dry"]
+    assert hit["difficulty"] == 3 and hit["source_title"] == "Do the laundry"
+    assert lookup(memo, user_id, "File my taxes") is None
+    assert (memo.lookups, memo.hits) == (2, 1)
+
+
+def test_threshold_decides_reuse():
+    user_id = make_user()
+    broken_down(user_id, "Clean the kitchen", ["Dishes", "Counters"], difficulty=4)
+
+    # Two of three words shared: cosine ~0.67
+    assert lookup(BreakdownMemo(threshold=0.6), user_id, "Clean the garage")
+    assert lookup(BreakdownMemo(threshold=0.9), user_id, "Clean the garage") is None
+
+
+def test_breakdowns_are_scoped_per_user():
+    owner, other = make_user(), make_user()
+    broken_down(owner, "Renew my passport", ["Photos", "Form"], difficulty=5)
+    memo = BreakdownMemo(threshold=0.8, use_global=False)
+
+    assert lookup(memo, owner, "Renew my passport")
+    assert lookup(memo, other, "Renew my passport") is None
+    assert lookup(BreakdownMemo(threshold=0.8, use_global=True), other, "Renew my passport")
+
+
+def test_only_completed_ai_difficulty_is_reused():
+    user_id = make_user()
+    # The AI gave no difficulty: the Fear fallback (9) must not be copied
+    broken_down(user_id, "Call the dentist", ["Find number", "Call"])
+    # Still running: not reusable yet
+    broken_down(user_id, "Book the flights", ["Search"], status="running")
+    memo = BreakdownMemo(threshold=0.8)
+
+    assert lookup(memo, user_id, "Call the dentist")["difficulty"] == 0
+    assert lookup(memo, user_id, "Book the flights") is None
+
+
+def test_indexes_are_evicted_least_recently_used():
+    users = [make_user() for _ in range(3)]
+    memo = BreakdownMemo(threshold=0.8, max_scopes=2)
+
+    lookup(memo, users[0], "Anything")
+    lookup(memo, users[1], "Anything")
+    lookup(memo, users[0], "Anything")  # users[0] is now the most recent
+    lookup(memo, users[2], "Anything")
+
+    assert list(memo._indexes) == [users[0], users[2]]
+    assert memo.stats()["evictions"] == 1
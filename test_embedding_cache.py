@@ -0,0 +1,132 @@
+"""
+Embedding cache: in-process LRU, the shared SQLite tier, counters; the
+memory-mapped anchor matrix file.
+Run: python -m pytest test_embedding_cache.py
+"""
+import os
+
+import numpy as np
+
+from services import embedding_cache
+from services.embedding_cache import (
+    EmbeddingCache,
+    anchor_cache_path,
+    load_anchor_matrix,
+)
+
+
+def vec(seed):
+    return np.random.default_rng(seed).normal(size=8).astype(np.float32)
+
+
+def test_counters_and_normalized_keys(tmp_path):
+    cache = EmbeddingCache("model-a", max_entries=8, cache_dir=str(tmp_path))
+    assert cache.get("Buy milk") is None
+    cache.put("Buy milk", vec(1))
+
+    # Case and runs of whitespace don't change the key
+    np.testing.assert_array_equal(cache.get("buy   MILK"), vec(1))
+    stats = cache.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (1, 0, 1)
+    assert stats["hit_rate"] == 0.5 and stats["disk_enabled"]
+
+
+def test_memory_tier_is_a_bounded_lru(tmp_path):
+    cache = EmbeddingCache("model-a", max_entries=2, cache_dir=str(tmp_path))
+    cache.put("one", vec(1))
+    cache.put("two", vec(2))
+    cache.get("one")  # now the most recently used
+    cache.put("three", vec(3))  # evicts "two"
+
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"]) == (2, 1)
+    assert list(cache._memory) == [cache._key("one"), cache._key("three")]
+
+    # Evicted from memory, still on disk
+    np.testing.assert_array_equal(cache.get("two"), vec(2))
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_is_shared_across_instances(tmp_path):
+    EmbeddingCache("model-a", cache_dir=str(tmp_path)).put("Write the report", vec(4))
+
+    # Another worker / a restart: served from disk, then from memory
+    other = EmbeddingCache("model-a", cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(other.get("Write the report"), vec(4))
+    np.testing.assert_array_equal(other.get("Write the report"), vec(4))
+    stats = other.stats()
+    assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 0)
+
+    # Vectors from another model never leak across
+    assert EmbeddingCache("model-b", cache_dir=str(tmp_path)).get("Write the report") is None
+
+
+def test_connections_are_lazy_and_never_cross_a_fork(tmp_path):
+    cache = EmbeddingCache("model-a", cache_dir=str(tmp_path))
+    assert not os.path.exists(cache.db_path)  # nothing opened at import time
+
+    cache.put("Buy milk", vec(1))
+    inherited = cache._connect()
+    cache.reset_after_fork()  # what a gunicorn worker runs after fork
+
+    assert cache._connect() is not inherited
+    inherited.execute("SELECT 1")  # left open: closing it could touch the parent's WAL
+    cache._memory.clear()
+    np.testing.assert_array_equal(cache.get("Buy milk"), vec(1))
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_keeps_the_newest_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "DISK_PRUNE_EVERY", 3)
+    cache = EmbeddingCache("model-a", cache_dir=str(tmp_path), max_disk_entries=5)
+    for i in range(8):
+        cache.put(f"task {i}", vec(i))
+    cache.put("task 0", vec(0))  # rewritten: newest again
+
+    count = cache._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    assert count == 5 and cache.stats()["disk_evictions"] == 4
+    reader = EmbeddingCache("model-a", cache_dir=str(tmp_path))
+    kept = [i for i in range(8) if reader.get(f"task {i}") is not None]
+    assert kept == [0, 4, 5, 6, 7]
+
+
+# --- ANCHOR MATRIX ---
+
+ANCHORS = {"fear": "I am scared this will go badly", "comfort": "This feels safe"}
+
+
+def test_anchor_matrix_is_keyed_by_model_and_anchor_text(tmp_path):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.stack([vec(len(text)) for text in texts])
+
+    def load(model_id, anchors):
+        return load_anchor_matrix(model_id, anchors, encode, cache_dir=str(tmp_path))
+
+    first = load("model-a", ANCHORS)
+    assert calls == [list(ANCHORS.values())]
+    assert isinstance(first, np.memmap) and not first.flags.writeable
+
+    # Same key (another worker, a restart): memory-mapped, never encoded
+    again = load("model-a", dict(ANCHORS))
+    assert len(calls) == 1 and isinstance(again, np.memmap)
+    np.testing.assert_array_equal(again, first)
+
+    # One anchor sentence edited, or another model: a new file
+    edited = dict(ANCHORS, fear="I am terrified of this")
+    load("model-a", edited)
+    assert calls[-1] == list(edited.values())
+    load("model-b", ANCHORS)
+    assert len(calls) == 3
+    keys = [("model-a", ANCHORS), ("model-a", edited), ("model-b", ANCHORS)]
+    assert len({anchor_cache_path(m, a, str(tmp_path)) for m, a in keys}) == 3
+
+    # A corrupt file is rebuilt (written in place: drop our maps of it first)
+    expected = np.array(first)
+    del first, again
+    with open(anchor_cache_path("model-a", ANCHORS, str(tmp_path)), "wb") as f:
+        f.write(b"not an array")
+    np.testing.assert_array_equal(load("model-a", ANCHORS), expected)
+    assert len(calls) == 4
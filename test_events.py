@@ -0,0 +1,56 @@
+"""
+Live updates (SSE): per-process and per-user caps on open streams.
+Run: python -m pytest test_events.py
+"""
+import pytest
+
+from app import app
+from services.event_broker import EventBroker
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    test_broker = EventBroker(max_streams=3, max_per_user=2)
+    monkeypatch.setattr("app.event_broker", test_broker)
+    return test_broker
+
+
+def client_for(user_id):
+    test_client = app.test_client()
+    with test_client.session_transaction() as s:
+        s["user_id"] = user_id
+    return test_client
+
+
+def test_streams_are_capped_per_user_and_per_process(broker):
+    first, second = broker.subscribe(1), broker.subscribe(1)
+    assert first and second
+    assert broker.subscribe(1) is None  # user cap
+    assert broker.subscribe(2)
+    assert broker.subscribe(3) is None  # process cap
+
+    broker.unsubscribe(1, first)
+    broker.unsubscribe(1, first)  # twice is harmless
+    assert broker.subscribe(3)
+    stats = broker.stats()
+    assert (stats["streams"], stats["refused_streams"]) == (3, 2)
+
+
+def test_capped_stream_is_refused_and_the_slot_comes_back(broker):
+    client = client_for(7)
+    held = broker.subscribe(7)
+
+    opened = client.get("/api/events", buffered=False)
+    assert opened.status_code == 200
+    assert next(opened.response) == b"retry: 3000\n\n"
+
+    refused = client.get("/api/events")
+    assert refused.status_code == 204 and refused.data == b""
+
+    # Closing the tab's response frees its slot
+    opened.close()
+    assert broker.stats()["streams"] == 1
+    broker.unsubscribe(7, held)
+    reopened = client.get("/api/events", buffered=False)
+    assert reopened.status_code == 200
+    reopened.close()
@@ -0,0 +1,113 @@
+"""
+Distilled fast-path scorer: training, the confidence gate, the artifact.
+Run: python -m pytest test_fast_scorer.py
+The teacher here is a fixed word-weight function standing in for MiniLM,
+so the suite runs without the model.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from services import fast_scorer as fs
+from services import scoring_service
+from services.embedding_cache import normalize_text
+from services.nlp_services import nlp_engine
+
+
+def teacher(title):
+    # Deterministic per-word weights, then the real bounds + regex overrides
+    scores = {"urgency": 4.0, "fear": 4.0, "interest": 4.0}
+    for word in normalize_text(title).split():
+        rng = random.Random(word)
+        for axis in scores:
+            scores[axis] += rng.uniform(-0.6, 0.6)
+    urgency, fear, interest = (min(10, max(1, scores[a])) for a in fs.SCORE_AXES)
+    urgency, fear = nlp_engine._apply_regex_modifiers(title, urgency, fear)
+    return {
+        "urgency": round(urgency, 1),
+        "interest": round(interest, 1),
+        "fear": round(fear, 1),
+        "triviality": 0.3,
+    }
+
+
+@pytest.fixture(scope="module")
+def trained():
+    titles = fs.synthetic_titles(6000, seed=1)
+    return fs.train(titles, [teacher(t) for t in titles], seed=1)
+
+
+def test_gate_meets_target_on_held_out_titles(trained):
+    report = trained.meta["report"]
+    assert report["fast_path"]["share"] > 0.5
+    assert report["fast_path"]["p95_error"] <= fs.TARGET_ERROR
+
+    # Fresh titles from the same vocabulary: what passes the gate is close
+    seen = set(fs.synthetic_titles(6000, seed=1))
+    fresh = [t for t in fs.synthetic_titles(7000, seed=2) if t not in seen]
+    errors = []
+    for title in fresh[:500]:
+        result = trained.score(title)
+        if result is not None:
+            expected = teacher(title)
+            errors.append(max(abs(result[a] - expected[a]) for a in fs.SCORE_AXES))
+    assert len(errors) > 250
+    assert np.percentile(errors, 95) <= fs.TARGET_ERROR * 1.25
+
+
+def test_unfamiliar_titles_escalate(trained):
+    assert trained.score("Quarterly zxqv wplkj reconciliation") is None
+    assert trained.score("") is None
+
+
+def test_regex_overrides_still_apply(trained):
+    result = trained.score("Write the report today")
+    assert result is not None and result["distilled"]
+    assert result["urgency"] >= nlp_engine.OVERRIDE_URGENCY_IMMEDIATE
+
+
+def test_artifact_round_trip(trained, tmp_path):
+    path = str(tmp_path / "fast_scorer.npz")
+    fs.save_artifact(path, trained.W, trained.b, trained.seen, trained.meta)
+
+    loaded = fs.FastScorer(path, enabled=True)
+    assert loaded.is_ready
+    for title in fs.synthetic_titles(200, seed=3):
+        ours, theirs = trained.score(title), loaded.score(title)
+        assert (ours is None) == (theirs is None)
+        if ours is not None:
+            for axis in fs.SCORE_AXES:
+                # float32 on disk: at most one rounding step apart
+                assert abs(ours[axis] - theirs[axis]) <= 0.1 + 1e-9
+
+
+def test_stale_artifacts_are_refused(trained, tmp_path, monkeypatch):
+    path = str(tmp_path / "fast_scorer.npz")
+    fs.save_artifact(path, trained.W, trained.b, trained.seen, dict(trained.meta, teacher="0" * 16))
+    stale = fs.FastScorer(path, enabled=True)
+    assert not stale.is_ready and "different teacher" in stale.error
+    assert stale.score("Buy milk") is None
+
+    monkeypatch.setattr(fs, "FORMAT_VERSION", fs.FORMAT_VERSION + 1)
+    with pytest.raises(ValueError):
+        fs.load_artifact(path)
+
+
+def test_batch_sends_only_unsure_titles_to_the_model(trained, monkeypatch):
+    sent = []
+
+    def analyze(texts, admission=None):
+        sent.append(list(texts))
+        return [dict(teacher(t), model=True) for t in texts]
+
+    monkeypatch.setattr(scoring_service, "fast_scorer", trained)
+    monkeypatch.setattr(scoring_service, "_analyze", analyze)
+
+    titles = ["Write the report today", "Quarterly zxqv wplkj reconciliation", "Buy milk"]
+    results = scoring_service.predict_task_metrics_batch(titles)
+
+    assert sent == [["Quarterly zxqv wplkj reconciliation"]]  # one call, unsure only
+    assert results[0]["distilled"] and results[1]["model"]
+    assert results[1]["urgency"] == teacher(titles[1])["urgency"]
+    assert all("priority_score" in r for r in results)
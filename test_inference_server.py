@@ -0,0 +1,87 @@
+"""
+Micro-batching inference server: batching, per-caller results, failure mode.
+Run: python -m pytest test_inference_server.py
+"""
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+
+from services.inference_server import (
+    InferenceServer,
+    InferenceUnavailable,
+    MicroBatcher,
+    RemoteEncoder,
+)
+
+
+def fake_vector(text):
+    vec = np.zeros(8, dtype=np.float32)
+    vec[len(text) % 8] = 1.0
+    vec[-1] = len(text)
+    return vec
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        return np.stack([fake_vector(t) for t in texts])
+
+
+@pytest.fixture
+def server():
+    encode = CountingEncoder()
+    path = os.path.join(tempfile.mkdtemp(), "nlp.sock")
+    srv = InferenceServer(path, MicroBatcher(encode, max_batch=64, wait_ms=20))
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield path, encode, srv.batcher
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_concurrent_requests_share_forward_passes(server):
+    path, encode, batcher = server
+    remote = RemoteEncoder(path)
+    start = threading.Barrier(16)
+    results, errors = {}, []
+
+    def worker(n):
+        try:
+            start.wait()
+            texts = [f"task {n}", "shared title"]
+            results[n] = (texts, remote.encode(texts))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    for texts, vectors in results.values():
+        assert vectors.shape == (2, 8)
+        for text, vec in zip(texts, vectors):
+            assert np.array_equal(vec, fake_vector(text))
+
+    # 16 requests, far fewer forward passes; duplicates encoded once
+    assert len(encode.calls) < 16
+    assert sum(encode.calls) == 17
+    stats = remote.stats()["server"]
+    assert stats["requests"] == 16
+    assert stats["batch_size"]["count"] == len(encode.calls)
+    assert stats["latency_ms"]["p99"] is not None
+
+
+def test_unreachable_server_raises_inference_unavailable():
+    remote = RemoteEncoder(os.path.join(tempfile.mkdtemp(), "missing.sock"))
+    with pytest.raises(InferenceUnavailable):
+        remote.encode(["anything"])
+    assert remote.stats()["failures"] == 2
@@ -0,0 +1,146 @@
+"""
+Shared LLM client: circuit breaker, jittered retries inside the latency
+budget, and the in-flight limit. Drives FakeLLMProvider failures/timeouts.
+Run: python -m pytest test_llm_client.py
+"""
+import threading
+import time
+
+import pytest
+
+from services import llm_client
+from services.llm_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    FakeLLMProvider,
+    LLMBusyError,
+    LLMClient,
+    LLMError,
+    LLMTimeoutError,
+)
+
+
+def make_client(provider, **kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=100, reset_timeout=60))
+    kwargs.setdefault("max_retries", 0)
+    return LLMClient(provider, timeout=2, **kwargs)
+
+
+def test_breaker_opens_probes_and_closes():
+    provider = FakeLLMProvider(error_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    client = make_client(provider, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            client.generate("prompt")
+    assert breaker.state == "open"
+
+    # Open: fails fast without touching the provider
+    with pytest.raises(CircuitOpenError):
+        client.generate("prompt")
+    assert provider.calls == 2
+
+    # After the reset timeout a single probe goes through; failing re-opens
+    time.sleep(0.06)
+    with pytest.raises(LLMError):
+        client.generate("prompt")
+    assert provider.calls == 3 and breaker.state == "open"
+
+    # A successful probe closes it again
+    time.sleep(0.06)
+    provider.error_rate = 0.0
+    assert client.generate("prompt") == FakeLLMProvider.DEFAULT_RESPONSE
+    assert breaker.state == "closed" and breaker.failures == 0
+    assert client.stats()["breaker_opened"] == 2
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # probe still in flight
+    breaker.release_probe()
+    assert breaker.allow()
+
+
+def test_retries_use_growing_jittered_backoff(monkeypatch):
+    windows = []
+
+    def uniform(low, high):
+        windows.append(high)
+        return high / 2
+
+    monkeypatch.setattr(llm_client, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(llm_client.random, "uniform", uniform)
+    provider = FakeLLMProvider(error_rate=1.0)
+    client = make_client(provider, max_retries=3)
+
+    with pytest.raises(LLMError):
+        client.generate("prompt")
+    assert provider.calls == 4
+    assert windows == [0.01, 0.02, 0.04]  # no sleep after the last attempt
+    stats = client.stats()
+    assert (stats["retries"], stats["failures"], stats["successes"]) == (3, 1, 0)
+
+
+def test_retries_stop_at_the_latency_budget():
+    provider = FakeLLMProvider(error_rate=1.0, delay=0.05)
+    client = make_client(provider, max_retries=50)
+
+    started = time.monotonic()
+    with pytest.raises(LLMError):
+        client.generate("prompt", budget=0.3)
+    assert time.monotonic() - started < 0.45
+    assert 1 < provider.calls < 51
+
+
+def test_slow_provider_times_out_within_budget():
+    provider = FakeLLMProvider(delay=5.0)
+    client = make_client(provider, max_retries=2)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        client.generate("prompt", budget=0.1)
+    assert time.monotonic() - started < 0.3
+
+
+def test_in_flight_limit_refuses_when_every_slot_stays_taken():
+    provider = FakeLLMProvider(delay=0.3)
+    client = make_client(provider, max_in_flight=2, queue_timeout=0.05)
+
+    threads = [
+        threading.Thread(target=client.generate, args=("prompt",)) for _ in range(2)
+    ]
+    for t in threads:
+        t.start()
+    while client.stats()["in_flight"] < 2:
+        time.sleep(0.001)
+
+    started = time.monotonic()
+    with pytest.raises(LLMBusyError):
+        client.generate("prompt")
+    assert time.monotonic() - started < 0.2
+    for t in threads:
+        t.join()
+
+    stats = client.stats()
+    assert provider.calls == 2
+    assert (stats["rejected_busy"], stats["successes"], stats["in_flight"]) == (1, 2, 0)
+    # Being busy is not a provider failure
+    assert client.breaker.failures == 0
+
+
+def test_stream_failure_counts_against_the_breaker():
+    provider = FakeLLMProvider(error_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = make_client(provider, breaker=breaker)
+
+    with pytest.raises(LLMError):
+        list(client.stream("prompt"))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        list(client.stream("prompt"))
@@ -0,0 +1,185 @@
+"""
+ONNX / int8 encoder backends vs the sentence-transformers reference.
+Run: python -m pytest test_nlp_backends.py
+Needs sentence-transformers and onnxruntime; the MiniLM comparison also
+needs the model files (downloaded from the Hugging Face Hub on first run),
+the offline one a tiny random BERT exported with torch + onnx.
+Skipped otherwise.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+
+from services.nlp_services import VectorScorer
+from services.onnx_encoder import OnnxEncoder
+
+TITLES = [
+    "Finish the tax report today",
+    "Buy milk",
+    "Prepare slides for tomorrow's board meeting",
+    "Call the dentist to reschedule",
+    "Build a side project game in Godot",
+    "Write thesis chapter 3 - deadline in 2 hours",
+    "Clean room",
+    "Reply to angry client email ASAP",
+    "Learn the piano piece for fun",
+    "Renew passport before the trip",
+    "Fix the production outage",
+    "Organize the garage someday",
+]
+
+# Max allowed |score difference| on the 1-10 scales, and min cosine similarity
+TOLERANCE = {"onnx": (0.1, 0.9999), "onnx-int8": (0.5, 0.98)}
+
+
+def load(backend):
+    scorer = VectorScorer(backend)
+    scorer.load()
+    if not scorer.is_ready:
+        pytest.skip(f"{backend} backend unavailable: {scorer.error}")
+    return scorer
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return load("torch")
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_backend_scores_match_reference(reference, backend):
+    max_diff, min_cosine = TOLERANCE[backend]
+    scorer = load(backend)
+
+    expected = reference.model.encode(TITLES, convert_to_numpy=True, normalize_embeddings=True)
+    actual = scorer.model.encode(TITLES, convert_to_numpy=True, normalize_embeddings=True)
+    assert actual.shape == expected.shape
+    assert np.min(np.sum(actual * expected, axis=1)) >= min_cosine
+
+    for ref, got in zip(reference.analyze_batch(TITLES), scorer.analyze_batch(TITLES)):
+        for axis in ("urgency", "fear", "interest"):
+            assert abs(ref[axis] - got[axis]) <= max_diff, (axis, ref, got)
+
+
+# --- OFFLINE PIPELINE PARITY ---
+# A tiny random BERT built locally, run through SentenceTransformer (torch)
+# and through OnnxEncoder on its ONNX export: checks our tokenization,
+# truncation, mean pooling and normalization without the Hub.
+
+WORDS = (
+    "the a to for of and finish tax report today buy milk prepare slides board "
+    "meeting call dentist write thesis chapter deadline clean room"
+).split()
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("onnx")  # torch.onnx.export
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+    from transformers import BertConfig, BertModel, PreTrainedTokenizerFast
+
+    path = str(tmp_path_factory.mktemp("tiny_bert"))
+    special = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    letters = list("abcdefghijklmnopqrstuvwxyz0123456789-'")
+    tokens = list(dict.fromkeys(special + WORDS + letters + [f"##{c}" for c in letters]))
+    vocab = {token: i for i, token in enumerate(tokens)}
+    tokenizer = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 2), ("[SEP]", 3)]
+    )
+    tokenizer.save(f"{path}/tokenizer.json")
+    PreTrainedTokenizerFast(
+        tokenizer_file=f"{path}/tokenizer.json",
+        pad_token="[PAD]",
+        unk_token="[UNK]",
+        cls_token="[CLS]",
+        sep_token="[SEP]",
+        mask_token="[MASK]",
+        model_max_length=OnnxEncoder.MAX_SEQ_LENGTH,
+    ).save_pretrained(path)
+
+    torch.manual_seed(0)
+    bert = BertModel(
+        BertConfig(
+            vocab_size=len(tokens),
+            hidden_size=64,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            intermediate_size=128,
+            max_position_embeddings=OnnxEncoder.MAX_SEQ_LENGTH + 8,
+        )
+    ).eval()
+    bert.save_pretrained(path)
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids,
+            ).last_hidden_state
+
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    ids = torch.ones(2, 8, dtype=torch.long)
+    torch.onnx.export(
+        LastHiddenState(bert),
+        (ids, torch.ones_like(ids), torch.zeros_like(ids)),
+        f"{path}/model.onnx",
+        input_names=names,
+        output_names=["last_hidden_state"],
+        dynamic_axes={n: {0: "batch", 1: "tokens"} for n in names + ["last_hidden_state"]},
+        opset_version=17,
+        dynamo=False,
+    )
+    return path
+
+
+def test_onnx_pipeline_matches_torch_offline(tiny_model, monkeypatch):
+    from sentence_transformers import SentenceTransformer, models
+
+    import huggingface_hub
+
+    monkeypatch.setattr(
+        huggingface_hub, "hf_hub_download", lambda repo, name, revision=None: f"{tiny_model}/{name}"
+    )
+    word = models.Transformer(tiny_model, max_seq_length=OnnxEncoder.MAX_SEQ_LENGTH)
+    reference = SentenceTransformer(
+        modules=[
+            word,
+            models.Pooling(word.get_word_embedding_dimension(), "mean"),
+            models.Normalize(),
+        ],
+        device="cpu",
+    )
+    encoder = OnnxEncoder("local", "model.onnx")
+
+    # Mixed lengths (padding) and one title past MAX_SEQ_LENGTH (truncation)
+    titles = TITLES + ["deadline " * 300]
+    expected = reference.encode(titles, convert_to_numpy=True, normalize_embeddings=True)
+    actual = encoder.encode(titles, convert_to_numpy=True, normalize_embeddings=True)
+    assert actual.shape == expected.shape
+    assert np.abs(actual - expected).max() < 1e-5
+    # Batching doesn't change the vectors
+    np.testing.assert_allclose(
+        encoder.encode(titles, batch_size=3, normalize_embeddings=True), actual, atol=1e-6
+    )
+
+    # The int8 file is what NLP_BACKEND=onnx-int8 loads
+    quantization = pytest.importorskip("onnxruntime.quantization")
+    quantization.quantize_dynamic(
+        f"{tiny_model}/model.onnx",
+        f"{tiny_model}/model_int8.onnx",
+        weight_type=quantization.QuantType.QInt8,
+    )
+    quantized = OnnxEncoder("local", "model_int8.onnx").encode(
+        titles, normalize_embeddings=True
+    )
+    assert (quantized * expected).sum(axis=1).min() > TOLERANCE["onnx-int8"][1]
@@ -0,0 +1,179 @@
+"""
+/api/predict, /api/predict/batch and the readiness probes against a fake
+encoder (and a fake model load: idle -> loading -> ready | failed); the
+/metrics token.
+Run: python -m pytest test_predict.py
+"""
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from app import app
+from services.embedding_cache import EmbeddingCache, normalize_text
+from services.nlp_services import VectorScorer
+
+
+def text_vector(text):
+    # Fixed per title (like MiniLM, and unlike the batch it arrives in)
+    rng = np.random.default_rng(zlib.crc32(normalize_text(text).encode("utf-8")))
+    vec = rng.normal(size=16)
+    return vec / np.linalg.norm(vec)
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        self.calls.append(list(texts))
+        return np.stack([text_vector(t) for t in texts])
+
+
+class FakeScorer(VectorScorer):
+    # Own cache keys: never mixed up with the real model's vectors
+    model_id = "fake-encoder"
+
+    def __init__(self):
+        super().__init__("torch")
+        self.fake = FakeModel()
+        self.fail = False
+        self.release = threading.Event()  # tests clear it to hold the load
+        self.release.set()
+
+    def load_model(self):
+        assert self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("model weights not found")
+        return self.fake
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    scorer = FakeScorer()
+    scorer.cache = EmbeddingCache(scorer.model_id, cache_dir=str(tmp_path))
+    monkeypatch.setattr("app.nlp_engine", scorer)
+    monkeypatch.setattr("services.scoring_service.nlp_engine", scorer)
+    return scorer
+
+
+@pytest.fixture
+def client():
+    # The predict endpoints only need a logged-in session
+    test_client = app.test_client()
+    with test_client.session_transaction() as s:
+        s["user_id"] = 1
+    return test_client
+
+
+TITLES = [
+    "Finish the tax report today",
+    "Buy milk",
+    "Prepare slides for tomorrow's board meeting",
+    "Build a side project game in Godot",
+    "Reply to angry client email ASAP",
+    "buy   MILK",
+]
+
+
+def test_batch_results_equal_single_predicts(engine, client):
+    engine.load()
+    # A few titles already cached by single predicts, the rest encoded together
+    singles = {
+        title: client.post("/api/predict", json={"title": title}).get_json()
+        for title in TITLES[:2]
+    }
+    engine.fake.calls.clear()
+
+    response = client.post("/api/predict/batch", json={"titles": TITLES})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert engine.fake.calls == [TITLES[2:5]]  # misses only, once each
+
+    for title in TITLES[2:]:
+        singles[title] = client.post("/api/predict", json={"title": title}).get_json()
+    assert results == [singles[title] for title in TITLES]
+    assert "degraded" not in results[0] and results[0]["priority_score"] > 0
+
+
+def test_batch_validation(engine, client, monkeypatch):
+    monkeypatch.setattr("app.PREDICT_BATCH_MAX", 3)
+    cases = [
+        ({}, 400),
+        ({"titles": []}, 400),
+        ({"titles": "Buy milk"}, 400),
+        ({"titles": ["Buy milk", ""]}, 400),
+        ({"titles": ["Buy milk", 7]}, 400),
+        ({"titles": ["a", "b", "c", "d"]}, 413),
+    ]
+    for body, status in cases:
+        response = client.post("/api/predict/batch", json=body)
+        assert response.status_code == status, body
+        assert response.get_json()["error"]
+    assert client.post("/api/predict/batch", data="not json").status_code == 400
+    assert engine.fake.calls == []
+
+
+# --- MODEL LIFECYCLE ---
+
+
+def test_readiness_follows_the_model_load(engine, client):
+    engine.release.clear()
+    idle = client.get("/readyz")
+    assert idle.status_code == 503 and idle.get_json()["nlp"]["state"] == "idle"
+
+    engine.start_background_load()
+    loading = client.get("/readyz")
+    assert loading.status_code == 503
+    assert loading.get_json() == {"ready": False, "nlp": engine.status()}
+    assert engine.status()["state"] == "loading"
+    assert client.get("/healthz").status_code == 200
+
+    # Meanwhile predicts are answered right away: regex-only, flagged
+    degraded = client.post("/api/predict", json={"title": "Send the invoice ASAP"})
+    assert degraded.status_code == 200
+    metrics = degraded.get_json()
+    assert metrics["degraded"] and metrics["interest"] == VectorScorer.NEUTRAL_SCORE
+    assert metrics["urgency"] == VectorScorer.OVERRIDE_URGENCY_IMMEDIATE
+    assert engine.fake.calls == []
+
+    engine.release.set()
+    assert engine.wait_until_ready(5)
+    ready = client.get("/readyz")
+    assert ready.status_code == 200 and ready.get_json()["nlp"]["state"] == "ready"
+    scored = client.post("/api/predict", json={"title": "Send the invoice ASAP"}).get_json()
+    assert "degraded" not in scored
+    assert engine.fake.calls[-1] == ["Send the invoice ASAP"]
+
+
+def test_failed_load_stays_unready(engine, client):
+    engine.fail = True
+    engine.load()
+
+    failed = client.get("/readyz")
+    assert failed.status_code == 503
+    assert failed.get_json()["nlp"]["state"] == "failed"
+    assert "weights not found" in failed.get_json()["nlp"]["error"]
+    assert client.get("/healthz").status_code == 200
+    # Still degraded, not an error
+    assert client.post("/api/predict", json={"title": "Buy milk"}).get_json()["degraded"]
+
+
+# --- OPS ENDPOINTS ---
+
+
+def test_metrics_needs_the_token(client, monkeypatch):
+    monkeypatch.setattr("app.METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 404  # off unless configured
+
+    monkeypatch.setattr("app.METRICS_TOKEN", "s3cret")
+    anonymous = app.test_client()
+    for headers in ({}, {"Authorization": "Bearer wrong"}, {"Authorization": "s3cret"}):
+        response = anonymous.get("/metrics", headers=headers)
+        assert response.status_code == 401 and "llm_client" not in response.get_json()
+    # A logged-in session is not enough either
+    assert client.get("/metrics").status_code == 401
+
+    scraper = anonymous.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert scraper.status_code == 200 and "admission" in scraper.get_json()
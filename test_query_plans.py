@@ -0,0 +1,227 @@
+"""
+Query-plan regression suite for the hot task queries.
+Run: python -m pytest test_query_plans.py
+Seeds a large local SQLite database, replays the hot routes, and fails if
+any SELECT falls back to a full table scan or blows its latency budget.
+"""
+if __name__ == "__main__":
+    # Run as a script: go through pytest so conftest.py sets up the test
+    # environment before the app is imported
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
+
+import os
+import re
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+import models
+
+# Seed size: enough rows that a table scan is visibly slower than a lookup
+N_USERS = int(os.getenv("PLAN_TEST_USERS", 200))
+TASKS_PER_USER = int(os.getenv("PLAN_TEST_TASKS", 100))
+SUBTASKS_PER_TASK = 3
+
+# Per-request budget (median of REPEATS runs), in milliseconds
+LATENCY_BUDGET_MS = float(os.getenv("PLAN_TEST_BUDGET_MS", 50))
+REPEATS = 20
+
+STATUSES = ("pending", "paused", "completed", "completed")
+
+# A selectinload batch: "... FROM subtasks WHERE subtasks.task_id IN (?, ...)"
+SELECTIN_LOAD = re.compile(r"FROM (\w+)\s+WHERE \1\.task_id IN \(")
+
+_user_ids = []
+
+
+def seed():
+    users = [
+        {"username": f"plan_user_{u}", "password_hash": "x"} for u in range(N_USERS)
+    ]
+    db.session.execute(db.insert(models.User), users)
+    first_user = db.session.execute(
+        db.select(db.func.min(models.User.id)).where(
+            models.User.username.like("plan_user_%")
+        )
+    ).scalar()
+    _user_ids.extend(range(first_user, first_user + N_USERS))
+
+    tasks = [
+        {
+            "user_id": user_id,
+            "title": f"Task {i}",
+            "priority_score": float((i * 37) % 100),
+            "status": STATUSES[i % len(STATUSES)],
+        }
+        for user_id in _user_ids
+        for i in range(TASKS_PER_USER)
+    ]
+    db.session.execute(db.insert(models.Task), tasks)
+    task_ids = [
+        row[0]
+        for row in db.session.execute(
+            db.select(models.Task.id).where(models.Task.user_id.in_(_user_ids))
+        )
+    ]
+
+    db.session.execute(
+        db.insert(models.TaskAnalysis),
+        [
+            {
+                "task_id": task_id,
+                "difficulty_score": task_id % 10 + 1,
+                "interest_score": float(task_id % 7),
+            }
+            for task_id in task_ids
+        ],
+    )
+    db.session.execute(
+        db.insert(models.Subtask),
+        [
+            {"task_id": task_id, "title": f"Step {j}", "order_index": j}
+            for task_id in task_ids
+            for j in range(SUBTASKS_PER_TASK)
+        ],
+    )
+    # One focus session per task, spread over the last ~100 days
+    start = datetime(2026, 1, 1)
+    db.session.execute(
+        db.insert(models.TaskSession),
+        [
+            {
+                "task_id": task_id,
+                "user_id": _user_ids[(task_id - task_ids[0]) // TASKS_PER_USER],
+                "started_at": start + timedelta(hours=task_id % 2400),
+                "ended_at": start + timedelta(hours=task_id % 2400, minutes=25),
+                "active": False,
+            }
+            for task_id in task_ids
+        ],
+    )
+    db.session.commit()
+
+
+class StatementRecorder:
+    """Collects every SELECT / UPDATE / DELETE (and its parameters) sent."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(db.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, "before_cursor_execute", self)
+
+
+def query_plan(statement, parameters):
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[-1] for row in rows]
+
+
+def assert_uses_indexes(method, path):
+    """Returns [(statement, plan steps)] for every statement the request ran."""
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = _user_ids[N_USERS // 2]
+
+    with app.app_context():
+        with StatementRecorder() as recorder:
+            response = getattr(client, method)(path)
+        assert response.status_code == 200, response.status_code
+        assert recorder.statements
+
+        plans = []
+        for statement, parameters in recorder.statements:
+            # selectinload sorts a page-sized batch of children: bounded, so allowed
+            bounded = SELECTIN_LOAD.search(statement) is not None
+            plan = query_plan(statement, parameters)
+            plans.append((statement, plan))
+            for step in plan:
+                # "SCAN tasks" = full table scan; "SCAN tasks USING INDEX ..." is fine
+                assert not (
+                    step.startswith("SCAN") and "USING" not in step
+                ), f"{path}: full scan ({step}) in\n{statement}"
+                assert bounded or "TEMP B-TREE" not in step, f"{path}: sort ({step}) in\n{statement}"
+        return plans
+
+
+def assert_latency(method, path):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = _user_ids[N_USERS // 2]
+
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        response = getattr(client, method)(path)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    median = statistics.median(timings)
+    assert median < LATENCY_BUDGET_MS, f"{path}: {median:.1f}ms > {LATENCY_BUDGET_MS}ms"
+
+
+def setup_module():
+    with app.app_context():
+        db.create_all()
+        seed()
+
+
+def first_task_id(status):
+    with app.app_context():
+        return (
+            models.Task.query.filter_by(user_id=_user_ids[N_USERS // 2], status=status)
+            .first()
+            .id
+        )
+
+
+def test_dashboard_first_page():
+    assert_uses_indexes("get", "/")
+    assert_latency("get", "/")
+
+
+def test_task_list_keyset_page():
+    plans = assert_uses_indexes("get", "/api/tasks?status=completed&after=50.0:999999999")
+    # The cursor is a range seek into the index, not a filter over every row
+    [page] = [plan for statement, plan in plans if "FROM tasks" in statement]
+    assert len(page) == 1, page
+    assert page[0].startswith("SEARCH tasks USING INDEX ix_tasks_user_priority"), page
+    assert "priority_score<?" in page[0], page
+    assert_latency("get", "/api/tasks?status=completed&after=50.0:999999999")
+
+
+def test_start_task_active_lookup():
+    path = f"/start_task/{first_task_id('pending')}"
+    assert_uses_indexes("post", path)
+    assert_latency("post", path)
+
+
+def test_recommend_switch():
+    path = f"/recommend_switch/{first_task_id('pending')}"
+    assert_uses_indexes("get", path)
+    assert_latency("get", path)
+
+
+def test_session_range_query():
+    path = "/api/sessions?from=2026-02-01T00:00:00&to=2026-02-08T00:00:00"
+    assert_uses_indexes("get", path)
+    assert_latency("get", path)
+
+
+def test_focus_view():
+    path = f"/focus/{first_task_id('pending')}"
+    assert_uses_indexes("get", path)
+    assert_latency("get", path)
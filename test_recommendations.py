@@ -0,0 +1,111 @@
+"""
+"I'm Stuck" ranking index: ordering, incremental refreshes, the LRU bound.
+Run: python -m pytest test_recommendations.py
+"""
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+import models
+from services.recommendations import RecommendationIndex
+from services.task_factory import create_task
+
+_users = iter(range(10**6))
+
+
+def setup_module():
+    with app.app_context():
+        db.create_all()
+
+
+def make_user(*tasks):
+    """A user with (title, interest, difficulty) tasks; returns (id, task ids)."""
+    with app.app_context():
+        user = models.User(username=f"recommend_{next(_users)}")
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.commit()
+        task_ids = [
+            create_task(
+                user.id,
+                title=title,
+                priority_score=5.0,
+                urgency=5,
+                fear=5,
+                interest=interest,
+                difficulty=difficulty,
+                breakdown_status="done",
+            )
+            for title, interest, difficulty in tasks
+        ]
+        return user.id, task_ids
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(db.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, "before_cursor_execute", self)
+
+
+def titles(index, user_id, **kwargs):
+    with app.app_context():
+        return [c["title"] for c in index.recommend(user_id, k=10, **kwargs)]
+
+
+def test_most_interesting_easy_task_first():
+    user_id, (boring, fun, hard) = make_user(
+        ("Boring", 2, 3), ("Fun", 9, 3), ("Hard", 10, 9)
+    )
+    index = RecommendationIndex(max_difficulty=6)
+
+    assert titles(index, user_id) == ["Fun", "Boring"]
+    assert titles(index, user_id, current_task_id=fun) == ["Boring"]
+
+
+def test_refresh_moves_a_changed_task():
+    user_id, (first, second) = make_user(("First", 8, 3), ("Second", 4, 3))
+    index = RecommendationIndex(max_difficulty=6)
+    assert titles(index, user_id) == ["First", "Second"]
+
+    with app.app_context():
+        models.Task.query.filter_by(id=first).update({"status": "completed"})
+        db.session.commit()
+        with QueryCounter() as queries:
+            index.refresh_task(user_id, first)
+        assert queries.count == 1
+    assert titles(index, user_id) == ["Second"]
+
+
+def test_refresh_for_an_uncached_user_skips_the_database():
+    user_id, (task_id,) = make_user(("Only", 5, 3))
+    index = RecommendationIndex(max_difficulty=6)
+
+    with app.app_context():
+        with QueryCounter() as queries:
+            index.refresh_task(user_id, task_id)
+    assert queries.count == 0
+    assert index.stats()["skipped_refreshes"] == 1
+
+
+def test_rankings_are_evicted_least_recently_used():
+    users = [make_user((f"Task {n}", 5, 3))[0] for n in range(3)]
+    index = RecommendationIndex(max_difficulty=6, max_users=2)
+
+    titles(index, users[0])
+    titles(index, users[1])
+    titles(index, users[0])  # users[0] is now the most recent
+    titles(index, users[2])
+
+    assert list(index._rankings) == [users[0], users[2]]
+    assert index.stats()["evictions"] == 1
+    # Evicted users are simply rebuilt on their next lookup
+    assert titles(index, users[1]) == ["Task 1"]
@@ -0,0 +1,87 @@
+"""
+Vectorized scoring parity + the re-prioritization command.
+Run: python -m pytest test_scoring.py
+"""
+import random
+
+import numpy as np
+
+from app import app
+from extensions import db
+import models
+from services import reprioritize, scoring_service
+from services.scoring_service import (
+    calculate_tmt_score,
+    calculate_tmt_scores,
+    compute_final_priorities,
+    compute_final_priority,
+)
+
+
+def slider_grid():
+    rng = random.Random(7)
+    # Every slider step the UI can send, plus out-of-range and random floats
+    steps = [x / 2 for x in range(0, 23)] + [-3, 0.1, 10.01, 15]
+    rows = [(u, f, i) for u in steps[::3] for f in steps for i in steps[::4]]
+    rows += [tuple(rng.uniform(0, 11) for _ in range(3)) for _ in range(20000)]
+    return [np.array(col) for col in zip(*rows)]
+
+
+def test_vectorized_scores_match_scalar_bit_for_bit():
+    urgency, fear, interest = slider_grid()
+    for impulsiveness in (None, 0.5, 2.0):
+        tmt = calculate_tmt_scores(urgency, fear, interest, impulsiveness)
+        priority = compute_final_priorities(urgency, fear, interest, impulsiveness)
+        for k, (u, f, i) in enumerate(zip(urgency.tolist(), fear.tolist(), interest.tolist())):
+            assert tmt[k] == calculate_tmt_score(u, f, i, impulsiveness)
+            assert priority[k] == compute_final_priority(u, f, i, impulsiveness)
+
+
+def test_round2_matches_python_round_on_ties():
+    values = np.array([k / 1000 for k in range(0, 100000, 5)])
+    expected = [round(v, 2) for v in values.tolist()]
+    assert scoring_service._round2(values).tolist() == expected
+
+
+def test_reprioritize_rewrites_stale_open_tasks(monkeypatch):
+    with app.app_context():
+        db.create_all()
+        user = models.User(username="rescore")
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.flush()
+        for n, status in enumerate(["pending", "paused", "completed"] * 5):
+            task = models.Task(
+                user_id=user.id, title=f"T{n}", status=status, priority_score=1.0
+            )
+            db.session.add(task)
+            db.session.flush()
+            db.session.add(
+                models.TaskAnalysis(
+                    task_id=task.id,
+                    urgency_score=n % 10,
+                    fear_score=3.5,
+                    interest_score=7.0,
+                )
+            )
+        db.session.commit()
+        version = user.data_version
+
+        monkeypatch.setattr(scoring_service, "TMT_WEIGHT", 0.5)
+        stats = reprioritize.reprioritize(user.id, chunk_size=4, log=lambda msg: None)
+        assert stats["scanned"] == stats["updated"] == 10
+
+        for task in models.Task.query.filter_by(user_id=user.id):
+            if task.status == "completed":
+                assert task.priority_score == 1.0
+            else:
+                a = task.analysis
+                assert task.priority_score == compute_final_priority(
+                    a.urgency_score, a.fear_score, a.interest_score
+                )
+        db.session.refresh(user)
+        assert user.data_version > version
+
+        # Nothing left to change
+        again = reprioritize.reprioritize(user.id, log=lambda msg: None)
+        assert again["updated"] == 0
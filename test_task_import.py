@@ -0,0 +1,206 @@
+"""
+Bulk task import: CSV and NDJSON uploads, bad rows, the size cap, and
+refusing to import without the scoring model.
+Run: python -m pytest test_task_import.py
+Uses a stand-in for a loaded MiniLM (a fixed vector per title).
+"""
+import io
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from app import app
+from extensions import db
+import models
+from services import fast_scorer, task_import
+from services.inference_server import InferenceUnavailable
+from services.nlp_services import VectorScorer, nlp_engine
+
+_users = iter(range(10**6))
+
+
+def setup_module():
+    with app.app_context():
+        db.create_all()
+
+
+class Model:
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        vectors = [
+            np.random.default_rng(zlib.crc32(t.encode("utf-8"))).normal(size=16)
+            for t in texts
+        ]
+        return np.stack([v / np.linalg.norm(v) for v in vectors])
+
+
+@pytest.fixture(autouse=True)
+def ready_engine(monkeypatch):
+    ready = threading.Event()
+    ready.set()
+    names = list(VectorScorer.RAW_ANCHORS)
+    anchors = Model().encode(list(VectorScorer.RAW_ANCHORS.values()))
+    monkeypatch.setattr(nlp_engine, "model", Model())
+    monkeypatch.setattr(nlp_engine, "anchor_matrix", anchors, raising=False)
+    monkeypatch.setattr(
+        nlp_engine, "anchor_index", {k: i for i, k in enumerate(names)}, raising=False
+    )
+    monkeypatch.setattr(nlp_engine, "_ready", ready)
+    monkeypatch.setattr(nlp_engine, "state", "ready")
+    # Always a cache miss, and nothing written to the real cache
+    monkeypatch.setattr(nlp_engine.cache, "get", lambda text: None)
+    monkeypatch.setattr(nlp_engine.cache, "put", lambda text, vec: None)
+
+
+def model_not_ready(monkeypatch, state):
+    monkeypatch.setattr(nlp_engine, "_ready", threading.Event())
+    monkeypatch.setattr(nlp_engine, "state", state)
+
+
+@pytest.fixture
+def user_id():
+    with app.app_context():
+        user = models.User(username=f"import_{next(_users)}")
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def upload(user_id, body, filename="tasks.csv", **query):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = user_id
+    return client.post(
+        "/api/tasks/import",
+        query_string=query,
+        data={"file": (io.BytesIO(body), filename)},
+        content_type="multipart/form-data",
+    )
+
+
+def imported(user_id):
+    with app.app_context():
+        tasks = models.Task.query.filter_by(user_id=user_id).order_by(models.Task.id)
+        return [
+            (t.title, t.analysis.urgency_score, [s.title for s in t.subtasks])
+            for t in tasks
+        ]
+
+
+def test_csv_import(user_id):
+    body = "\ufefftitle,urgency,fear,interest\nPay rent,9,2,3\nRead a book,,,\n".encode()
+    response = upload(user_id, body)
+
+    assert response.status_code == 201
+    assert response.get_json()["imported"] == 2
+    tasks = imported(user_id)
+    assert [title for title, _, _ in tasks] == ["Pay rent", "Read a book"]
+    assert tasks[0][1] == 9  # the file's value wins over the model's guess
+
+
+def test_ndjson_import_keeps_its_steps(user_id):
+    body = b'{"title": "Move house", "subtasks": ["Boxes", "Van"]}\n\n"Call mom"\n'
+    response = upload(user_id, body, filename="tasks.ndjson")
+
+    assert response.status_code == 201
+    title, _, steps = imported(user_id)[0]
+    assert (title, steps) == ("Move house", ["Boxes", "Van"])
+    with app.app_context():
+        statuses = [t.breakdown_status for t in models.Task.query.filter_by(user_id=user_id)]
+    assert sorted(statuses) == ["done", "pending"]
+
+
+def test_bad_rows_are_skipped(user_id):
+    body = b"title,urgency\n,5\n   ,5\nValid,not-a-number\n"
+    stats = upload(user_id, body).get_json()
+
+    assert (stats["imported"], stats["skipped"]) == (1, 2)
+    assert [title for title, _, _ in imported(user_id)] == ["Valid"]
+
+
+@pytest.mark.parametrize(
+    "body, filename, error",
+    [
+        (b"name,urgency\nPay rent,5\n", "tasks.csv", "title"),
+        (b'{"title": "ok"}\n{broken\n', "tasks.ndjson", "Line 2"),
+        ("title\nCaf\xe9\n".encode("latin-1"), "tasks.csv", "UTF-8"),
+    ],
+)
+def test_malformed_uploads_are_rejected(user_id, body, filename, error):
+    response = upload(user_id, body, filename=filename)
+    assert response.status_code == 400
+    assert error in response.get_json()["error"]
+
+
+def test_size_cap(user_id, monkeypatch):
+    monkeypatch.setattr(task_import, "IMPORT_MAX_ROWS", 3)
+    monkeypatch.setattr(task_import, "IMPORT_CHUNK", 2)
+    body = "title\n" + "".join(f"Task {n}\n" for n in range(5))
+
+    response = upload(user_id, body.encode())
+    assert response.status_code == 400
+    assert "Max 3" in response.get_json()["error"]
+    # Chunks committed before the cap stay imported
+    assert len(imported(user_id)) == 2
+
+
+def test_streams_without_readable_are_decoded():
+    # SpooledTemporaryFile before Python 3.11: read() but no readable()
+    class ReadOnly:
+        def __init__(self, data):
+            self._data = io.BytesIO(data)
+
+        def read(self, n=-1):
+            return self._data.read(n)
+
+    records = task_import.iter_records(ReadOnly("title\nCafé\n".encode()), "csv")
+    assert [r["title"] for r in records] == ["Café"]
+
+
+def test_imports_are_scored_by_minilm_itself(user_id, monkeypatch):
+    # Scores stored for good never come from the distilled fast path
+    def not_sure_enough(title):
+        raise AssertionError("import consulted the fast scorer")
+
+    monkeypatch.setattr(fast_scorer.fast_scorer, "score", not_sure_enough)
+    response = upload(user_id, b"title\nRenew passport\n")
+
+    assert response.status_code == 201
+    [(title, urgency, _)] = imported(user_id)
+    assert urgency == nlp_engine.analyze_task(title)["urgency"]
+
+
+def test_import_waits_for_the_model(user_id, monkeypatch):
+    model_not_ready(monkeypatch, "loading")
+    response = upload(user_id, b"title\nPay rent\n")
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) > 0
+    assert imported(user_id) == []
+
+
+@pytest.mark.parametrize("state", ["idle", "failed"])
+def test_import_refuses_without_a_model(user_id, monkeypatch, state):
+    # NLP_PRELOAD=0 with nothing loading it, or a failed load: no placeholders
+    model_not_ready(monkeypatch, state)
+    response = upload(user_id, b"title\nPay rent\n")
+
+    assert response.status_code == 503
+    assert "Retry-After" not in response.headers
+    assert state in response.get_json()["error"]
+    assert imported(user_id) == []
+
+
+def test_import_stops_when_inference_is_unavailable(user_id, monkeypatch):
+    class Down:
+        def encode(self, texts, **kwargs):
+            raise InferenceUnavailable("inference server: connection refused")
+
+    monkeypatch.setattr(nlp_engine, "model", Down())
+    response = upload(user_id, b"title\nPay rent\n")
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) > 0
+    assert imported(user_id) == []
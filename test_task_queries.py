@@ -0,0 +1,250 @@
+"""
+Query-count guard for the task serializers (index + focus view).
+Run: python -m pytest test_task_queries.py
+Fails if per-task lazy loads (N+1 queries) come back.
+"""
+if __name__ == "__main__":
+    # Run as a script: go through pytest so conftest.py sets up the test
+    # environment before the app is imported
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+import models
+from services.event_broker import event_broker
+
+
+def make_user(username, n_tasks, subtasks_per_task=3):
+    user = models.User(username=username)
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.flush()
+
+    for i in range(n_tasks):
+        task = models.Task(
+            user_id=user.id, title=f"Task {i}", priority_score=float(i), status="pending"
+        )
+        db.session.add(task)
+        db.session.flush()
+        db.session.add(models.TaskAnalysis(task_id=task.id, difficulty_score=4))
+        for j in range(subtasks_per_task):
+            db.session.add(
+                models.Subtask(task_id=task.id, title=f"Step {j}", order_index=j)
+            )
+    db.session.commit()
+    return user.id
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(db.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, "before_cursor_execute", self)
+
+
+def logged_in_client(user_id):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = user_id
+    return client
+
+
+def count_queries(user_id, path):
+    client = logged_in_client(user_id)
+    with app.app_context(), QueryCounter() as counter:
+        response = client.get(path)
+    assert response.status_code == 200
+    return counter.count
+
+
+def setup_module():
+    with app.app_context():
+        db.create_all()
+
+
+def test_index_query_count_is_constant():
+    with app.app_context():
+        small = make_user("small_user", 30)
+        large = make_user("large_user", 300)
+
+    small_count = count_queries(small, "/")
+    large_count = count_queries(large, "/")
+
+    # user + first page + analyses + subtasks (+ active task lookup)
+    assert large_count <= 5
+    assert large_count == small_count
+
+
+def test_task_pages_cover_every_task_once():
+    with app.app_context():
+        user_id = make_user("paging_user", 57, subtasks_per_task=0)
+        # Ties on priority must still page cleanly (keyset is priority, id)
+        models.Task.query.filter_by(user_id=user_id).update({"priority_score": 1.0})
+        db.session.commit()
+
+    client = logged_in_client(user_id)
+    seen, cursor = [], None
+    while True:
+        url = "/api/tasks?status=pending&limit=10" + (f"&after={cursor}" if cursor else "")
+        data = client.get(url).get_json()
+        assert len(data["tasks"]) <= 10
+        seen += [t["id"] for t in data["tasks"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen)) == 57
+    assert client.get("/api/tasks?status=bogus").status_code == 400
+
+
+def test_focus_view_query_count_is_constant():
+    with app.app_context():
+        user_id = make_user("focus_user", 1, subtasks_per_task=25)
+        task_id = models.Task.query.filter_by(user_id=user_id).first().id
+
+    # data version + task + analysis + subtasks
+    assert count_queries(user_id, f"/focus/{task_id}") <= 4
+
+
+def test_task_factory_is_one_insert_per_table():
+    from services.task_factory import create_tasks
+
+    with app.app_context():
+        user = models.User(username="factory")
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        specs = [
+            {
+                "title": f"Bulk {i}",
+                "priority_score": float(i),
+                "urgency": 5.0,
+                "fear": 3.6,
+                "interest": 7.0,
+                "subtasks": ["a", "b", "c"] if i % 2 else [],
+            }
+            for i in range(40)
+        ]
+        with QueryCounter() as counter:
+            task_ids = create_tasks(user_id, specs)
+        # tasks, analyses, subtasks, data version (commit isn't a cursor execute)
+        assert counter.count <= 4
+
+        assert len(task_ids) == 40
+        tasks = {t.id: t for t in models.Task.query.filter(models.Task.id.in_(task_ids))}
+        for task_id, spec in zip(task_ids, specs):
+            task = tasks[task_id]
+            assert task.title == spec["title"]
+            assert task.analysis.difficulty_score == 4
+            assert [s.title for s in sorted(task.subtasks, key=lambda s: s.order_index)] == spec["subtasks"]
+            assert task.breakdown_status == ("done" if spec["subtasks"] else "pending")
+
+
+def test_unchanged_reload_skips_task_queries():
+    with app.app_context():
+        user_id = make_user("etag_user", 40)
+        task_id = models.Task.query.filter_by(user_id=user_id).first().id
+
+    client = logged_in_client(user_id)
+    for path in ("/", f"/focus/{task_id}"):
+        first = client.get(path)
+        etag = first.headers["ETag"]
+
+        with app.app_context(), QueryCounter() as counter:
+            again = client.get(path, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        # Just the user's header fields + data version (primary key)
+        assert counter.count == 1
+
+        # A new tab (no ETag) gets the cached page
+        with app.app_context(), QueryCounter() as counter:
+            fresh = client.get(path)
+        assert fresh.data == first.data
+        assert counter.count == 1
+
+    # Any write moves the version on: the old ETag no longer matches
+    assert client.post(f"/start_task/{task_id}").status_code == 200
+    after = client.get(f"/focus/{task_id}", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+
+
+def test_another_workers_write_is_seen_at_once():
+    with app.app_context():
+        user_id = make_user("other_worker_user", 2)
+        task_id = models.Task.query.filter_by(user_id=user_id).first().id
+
+    client = logged_in_client(user_id)
+    etag = client.get("/").headers["ETag"]
+    focus_etag = client.get(f"/focus/{task_id}").headers["ETag"]
+
+    # Another process renames the task: straight through the engine, so
+    # nothing in this process's caches is invalidated
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(
+            db.update(models.Task).where(models.Task.id == task_id).values(title="Renamed")
+        )
+        conn.execute(
+            db.update(models.User)
+            .where(models.User.id == user_id)
+            .values(data_version=models.User.data_version + 1)
+        )
+
+    page = client.get("/", headers={"If-None-Match": etag})
+    assert page.status_code == 200 and b"Renamed" in page.data
+    focus = client.get(f"/focus/{task_id}", headers={"If-None-Match": focus_etag})
+    assert focus.status_code == 200 and b"Renamed" in focus.data
+
+
+def test_completing_a_task_updates_the_header():
+    with app.app_context():
+        user_id = make_user("xp_user", 1, subtasks_per_task=0)
+        task_id = models.Task.query.filter_by(user_id=user_id).first().id
+
+    client = logged_in_client(user_id)
+    assert b">0<" in client.get("/").data.replace(b" ", b"")
+
+    result = client.post(f"/complete_task/{task_id}").get_json()
+    assert result["total_xp"] > 0
+    page = client.get("/").data.replace(b" ", b"")
+    assert f">{result['total_xp']}<".encode() in page
+
+
+def test_only_the_owner_can_toggle_a_subtask():
+    with app.app_context():
+        owner_id = make_user("subtask_owner", 1)
+        other_id = make_user("subtask_other", 0)
+        sub = models.Subtask.query.join(models.Task).filter(
+            models.Task.user_id == owner_id
+        ).first()
+        sub_id, task_id = sub.id, sub.task_id
+
+    owner_events = event_broker.subscribe(owner_id)
+    other_events = event_broker.subscribe(other_id)
+    try:
+        assert logged_in_client(other_id).post(f"/toggle_subtask/{sub_id}").status_code == 404
+        with app.app_context():
+            assert db.session.get(models.Subtask, sub_id).status == "pending"
+
+        result = logged_in_client(owner_id).post(f"/toggle_subtask/{sub_id}").get_json()
+        assert result["status"] == "completed"
+        event, data = owner_events.get_nowait()
+        assert event == "subtask" and data["task_id"] == task_id
+        assert other_events.empty()
+    finally:
+        event_broker.unsubscribe(owner_id, owner_events)
+        event_broker.unsubscribe(other_id, other_events)
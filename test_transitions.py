@@ -0,0 +1,188 @@
+"""
+Concurrency stress test for the task state transitions.
+Run: python -m pytest test_transitions.py
+Many threads race start/pause/complete on the same rows; the totals must
+come out exactly as if the calls had run one at a time.
+"""
+if __name__ == "__main__":
+    # Run as a script: go through pytest so conftest.py sets up the test
+    # environment before the app is imported
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
+
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import app
+from extensions import check_dialect, db
+import models
+from services import task_transitions
+from services.session_log import session_log
+
+THREADS = 16
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def make_user(username, tasks):
+    """tasks: list of (status, seconds since started or None, priority)."""
+    with app.app_context():
+        user = models.User(username=username, total_xp=0, level=1)
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.flush()
+        task_ids = []
+        for i, (status, running_for, priority) in enumerate(tasks):
+            task = models.Task(
+                user_id=user.id,
+                title=f"Task {i}",
+                status=status,
+                priority_score=priority,
+                time_spent=0,
+                last_started_at=(
+                    NOW - timedelta(seconds=running_for) if running_for else None
+                ),
+            )
+            db.session.add(task)
+            db.session.flush()
+            task_ids.append(task.id)
+        db.session.commit()
+        return user.id, task_ids
+
+
+def race(fn, args_list):
+    """Runs fn(*args) for every args in parallel, released at the same moment."""
+    barrier = threading.Barrier(len(args_list))
+    results, errors = [], []
+
+    def worker(args):
+        with app.app_context():
+            barrier.wait()
+            try:
+                results.append(fn(*args))
+            except task_transitions.TransitionError as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(a,)) for a in args_list]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def load(model, row_id):
+    with app.app_context():
+        return db.session.get(model, row_id)
+
+
+def setup_module():
+    with app.app_context():
+        db.create_all()
+
+
+def test_concurrent_pauses_bank_the_interval_once():
+    user_id, (task_id,) = make_user("pause_race", [("active", 100, 10.0)])
+
+    results, errors = race(
+        task_transitions.pause_task, [(user_id, task_id, NOW)] * THREADS
+    )
+
+    assert not errors
+    assert load(models.Task, task_id).time_spent == 100
+    assert set(results) == {100}
+
+    # Exactly one focus interval logged, covering the banked time
+    with app.app_context():
+        session_log.flush()
+        logged = models.TaskSession.query.filter_by(task_id=task_id).all()
+        assert len(logged) == 1
+        assert (logged[0].ended_at - logged[0].started_at).total_seconds() == 100
+
+
+def test_concurrent_completions_award_xp_once():
+    user_id, (task_id,) = make_user("complete_race", [("active", 600, 50.0)])
+
+    results, errors = race(
+        task_transitions.complete_task, [(user_id, task_id, NOW)] * THREADS
+    )
+
+    # 10 minutes * 10 XP * 1.5 + 50
+    assert len(results) == 1 and len(errors) == THREADS - 1
+    assert results[0]["xp_gained"] == 200
+    assert load(models.User, user_id).total_xp == 200
+    assert load(models.Task, task_id).time_spent == 600
+
+
+def test_parallel_completions_lose_no_xp():
+    tasks = [("active" if i == 0 else "paused", 60 * i or 30, float(i)) for i in range(THREADS)]
+    user_id, task_ids = make_user("xp_race", tasks)
+    with app.app_context():
+        # Paused tasks carry banked time instead of a running interval
+        for i, task_id in enumerate(task_ids[1:], start=1):
+            models.Task.query.filter_by(id=task_id).update(
+                {"time_spent": 60 * i, "last_started_at": None}
+            )
+        db.session.commit()
+
+    results, errors = race(
+        task_transitions.complete_task, [(user_id, t, NOW) for t in task_ids]
+    )
+
+    assert not errors
+    user = load(models.User, user_id)
+    with app.app_context():
+        earned = [t.xp_earned for t in models.Task.query.filter_by(user_id=user_id)]
+    assert user.total_xp == sum(earned) == sum(r["xp_gained"] for r in results)
+    assert user.level == 1 + user.total_xp // task_transitions.XP_PER_LEVEL
+
+
+def test_concurrent_starts_leave_one_active_task_and_no_lost_seconds():
+    tasks = [("active", 120, 1.0)] + [("paused", None, 1.0)] * (THREADS - 1)
+    user_id, task_ids = make_user("start_race", tasks)
+
+    results, errors = race(
+        task_transitions.start_task, [(user_id, t, NOW) for t in task_ids]
+    )
+
+    assert not errors
+    with app.app_context():
+        rows = models.Task.query.filter_by(user_id=user_id).all()
+        active = [t for t in rows if t.status == "active"]
+        assert len(active) == 1
+        # Every start used the same clock, so the only time banked is the
+        # 120s the first task had already been running
+        banked = sum(t.time_spent or 0 for t in rows)
+        running = (NOW - active[0].last_started_at).total_seconds()
+        assert banked + running == 120
+
+
+def test_transitions_are_scoped_to_the_owner():
+    owner, (task_id,) = make_user("owner", [("pending", None, 1.0)])
+    other, _ = make_user("intruder", [])
+
+    with app.app_context():
+        for fn in (
+            task_transitions.start_task,
+            task_transitions.pause_task,
+            task_transitions.complete_task,
+        ):
+            try:
+                fn(other, task_id, NOW)
+            except task_transitions.TransitionError:
+                continue
+            raise AssertionError(f"{fn.__name__} touched another user's task")
+
+    assert load(models.Task, task_id).status == "pending"
+
+
+def test_unsupported_database_is_rejected_at_startup():
+    with app.app_context():
+        check_dialect(db.engine)
+    with pytest.raises(RuntimeError, match="mysql"):
+        check_dialect(SimpleNamespace(dialect=SimpleNamespace(name="mysql")))